@@ -49,6 +49,8 @@ train_dataloader = dict(
         data_root=data_root,
         data_prefix=dict(
             img_path='img_dir/train', seg_map_path='ann_dir/train'),
+        # packed by tools/dataset_converters/hyundae_patch_cache.py
+        # ann_cache=data_root + 'ann_cache/train',
         pipeline=train_pipeline))
 val_dataloader = dict(
     batch_size=1,
@@ -63,5 +65,5 @@ val_dataloader = dict(
         pipeline=test_pipeline))
 test_dataloader = val_dataloader
 
-val_evaluator = dict(type='IoUMetric', iou_metrics=['mIoU'])
+val_evaluator = dict(type='PatchContaminationMetric')
 test_evaluator = val_evaluator
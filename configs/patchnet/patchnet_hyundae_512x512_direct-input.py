@@ -0,0 +1,15 @@
+_base_ = './patchnet_hyundae_512x512.py'
+crop_size = (512, 512)
+# resize frames straight to the network input instead of (2048, 1024)
+test_pipeline = [
+    dict(type='LoadPatchNetInput', scale=crop_size, interpolation='bilinear'),
+    dict(type='LoadAnnotations'),
+    dict(type='PackSegInputs')
+]
+model = dict(
+    test_cfg=dict(
+        mode='whole',
+        preprocess=dict(
+            size=crop_size, interpolation='bilinear', fused_normalize=True)))
+val_dataloader = dict(dataset=dict(pipeline=test_pipeline))
+test_dataloader = val_dataloader
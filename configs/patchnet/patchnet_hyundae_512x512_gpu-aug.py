@@ -0,0 +1,15 @@
+_base_ = './patchnet_hyundae_512x512_image-cache.py'
+data_root = 'data/hyundae/'
+# data loader workers only load the images, flip and photometric distortion
+# run on the whole batch on the training device
+train_pipeline = [
+    dict(type='LoadImageFromCache', cache_dir=data_root + 'img_cache/train'),
+    dict(type='LoadAnnotations'),
+    dict(type='PackSegInputs')
+]
+model = dict(
+    data_preprocessor=dict(batch_augments=[
+        dict(type='BatchRandomFlip', prob=0.5),
+        dict(type='BatchPhotoMetricDistortion')
+    ]))
+train_dataloader = dict(dataset=dict(pipeline=train_pipeline))
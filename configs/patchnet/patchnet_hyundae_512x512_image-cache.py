@@ -0,0 +1,12 @@
+_base_ = './patchnet_hyundae_512x512.py'
+data_root = 'data/hyundae/'
+# images decoded and resized to 512x512 once by
+# tools/dataset_converters/build_image_cache.py
+train_pipeline = [
+    dict(type='LoadImageFromCache', cache_dir=data_root + 'img_cache/train'),
+    dict(type='LoadAnnotations'),
+    dict(type='RandomFlip', prob=0.5),
+    dict(type='PhotoMetricDistortion'),
+    dict(type='PackSegInputs')
+]
+train_dataloader = dict(dataset=dict(pipeline=train_pipeline))
@@ -1,4 +1,5 @@
 from mmseg.apis import inference_model, init_model
+from mmseg.visualization import PatchOverlayRenderer
 import mmcv
 import cv2
 import os
@@ -16,7 +17,6 @@ img_path = '/mnt/4tb/hyundai/data/wd/wd_sampling/CMR_GT_Frame-N2207413-230113154
 
 # 이미지를 로드하고 리사이즈합니다.
 img = mmcv.imread(img_path)
-original_size = img.shape[:2]  # 원래 이미지 크기 저장 (height, width)
 resized_img = cv2.resize(img, (512, 512))
 
 # 이미지를 세그멘테이션하고 결과를 반환합니다.
@@ -40,37 +40,14 @@ print("Unique values and their counts in the 16x16 result array:")
 for u, c in zip(unique, counts):
     print(f"Value: {u}, Count: {c}")
 
-# 각 패치의 크기 계산
-patch_height = original_size[0] // 16
-patch_width = original_size[1] // 16
-
-# 원본 이미지를 복사하여 시각화용 이미지 생성
-visualized_img = img.copy()
-
 # 색상 및 투명도 설정
-color_map = {
-    1: (0, 0, 255, 128),  # 반투명한 빨간색
-    2: (0, 0, 255)  # 불투명한 빨간색
-}
+renderer = PatchOverlayRenderer(styles={
+    1: ((0, 0, 255), 0.5),  # 반투명한 빨간색
+    2: ((0, 0, 255), 1.0)  # 불투명한 빨간색
+})
 
-# 각 패치를 원본 이미지에 매핑하여 색상 입히기
-for i in range(16):
-    for j in range(16):
-        label = seg_map[i, j]
-        if label in color_map:
-            x_start = j * patch_width
-            y_start = i * patch_height
-            x_end = x_start + patch_width
-            y_end = y_start + patch_height
-            
-            overlay = visualized_img[y_start:y_end, x_start:x_end].copy()
-            overlay[:, :, :3] = color_map[label][:3]
-            
-            if label == 1:
-                alpha = 0.5  # 반투명도 설정
-                cv2.addWeighted(overlay, alpha, visualized_img[y_start:y_end, x_start:x_end], 1 - alpha, 0, visualized_img[y_start:y_end, x_start:x_end])
-            else:
-                visualized_img[y_start:y_end, x_start:x_end] = overlay
+# 16x16 결과를 원본 이미지 크기로 확장하여 한 번에 색상 입히기
+visualized_img = renderer.render(img, seg_map)
 
 # 결과를 저장할 디렉토리 생성
 save_dir = '/mnt/4tb/hyundai/mmseg_hyundai/results'
@@ -0,0 +1,132 @@
+import time
+
+import cv2
+import numpy as np
+from qtpy.QtCore import Qt
+from qtpy.QtGui import QImage, QPixmap
+
+from mmseg.visualization import DisplayResizer
+
+# Qt 5.14 이상은 BGR을 그대로 읽을 수 있어 색 변환이 필요 없음
+HAS_BGR888 = hasattr(QImage, 'Format_BGR888')
+
+
+class FrameDisplay:
+    """numpy 프레임을 QLabel 크기에 맞춰 표시하는 adapter.
+
+    기존 방식 (cvtColor -> QImage -> QPixmap.fromImage -> pixmap.scaled(Smooth))은
+    원본 해상도에서 복사 3번과 Qt rescale을 합니다. 여기서는
+    - OpenCV로 label 크기에 맞춰 먼저 줄이고 (재사용하는 버퍼에 바로 기록)
+    - QImage.Format_BGR888로 감싸 색 변환 없이
+    - QPixmap.fromImage로 한 번만 업로드합니다.
+    표시 크기는 label 크기 또는 프레임 크기가 바뀔 때만 다시 계산합니다.
+
+    Args:
+        label: 프레임을 표시할 QLabel
+        post: 만든 QPixmap을 받아 setPixmap 전에 수정하는 함수 (예: 그리드 그리기)
+    """
+
+    def __init__(self, label, post=None):
+        self.label = label
+        self.post = post
+        self.__key = None
+        self.__size = None
+        self.__resizer = DisplayResizer()
+        self.num_frames = 0
+        self.total_time = 0.0
+
+    def target_size(self, frame_w, frame_h):
+        """KeepAspectRatio로 label에 들어가는 (w, h, device pixel ratio). 크기가 바뀔 때만 계산"""
+        size = self.label.size()
+        dpr = self.label.devicePixelRatioF()
+        key = (size.width(), size.height(), dpr, frame_w, frame_h)
+        if key != self.__key:
+            # HiDPI 화면에서는 물리 픽셀 크기로 줄여야 흐려지지 않음
+            self.__size = DisplayResizer.fit_size(
+                (frame_w, frame_h), (size.width() * dpr, size.height() * dpr)) + (dpr, )
+            self.__key = key
+        return self.__size
+
+    def to_pixmap(self, frame):
+        """BGR 또는 grayscale uint8 프레임을 label 크기의 QPixmap으로 변환"""
+        frame_h, frame_w = frame.shape[:2]
+        w, h, dpr = self.target_size(frame_w, frame_h)
+        # 2배 이상 줄일 때는 빠른 2x2 평균으로 반씩 줄인 뒤 나머지만 bilinear로 줄임
+        img = self.__resizer(frame, (w, h))
+        if img.ndim == 2:
+            fmt = QImage.Format_Grayscale8
+        elif HAS_BGR888:
+            fmt = QImage.Format_BGR888
+        else:
+            cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
+            fmt = QImage.Format_RGB888
+        # QImage는 버퍼를 복사하지 않고, fromImage에서 한 번 복사되므로 버퍼를 재사용해도 됨
+        q_image = QImage(img.data, w, h, img.strides[0], fmt)
+        pixmap = QPixmap.fromImage(q_image)
+        pixmap.setDevicePixelRatio(dpr)
+        return pixmap
+
+    def show(self, frame):
+        start = time.perf_counter()
+        pixmap = self.to_pixmap(frame)
+        if self.post is not None:
+            pixmap = self.post(pixmap)
+        self.label.setPixmap(pixmap)
+        self.total_time += time.perf_counter() - start
+        self.num_frames += 1
+
+    def show_file(self, path):
+        """이미지 파일 표시 (파일 선택 시 한 번 호출되므로 Qt로 읽고 줄임)"""
+        pixmap = QPixmap(path)
+        pixmap = pixmap.scaled(self.label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        if self.post is not None:
+            pixmap = self.post(pixmap)
+        self.label.setPixmap(pixmap)
+
+    def summary(self):
+        ms = self.total_time / self.num_frames * 1000 if self.num_frames else 0
+        return f'display: {self.num_frames} frames, {ms:.2f} ms/frame'
+
+
+def show_legacy(label, frame):
+    """비교용 기존 표시 방식"""
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    h, w, ch = frame_rgb.shape
+    q_image = QImage(frame_rgb.data, w, h, ch * w, QImage.Format_RGB888)
+    pixmap = QPixmap.fromImage(q_image).scaled(label.size(), Qt.KeepAspectRatio,
+                                               Qt.SmoothTransformation)
+    label.setPixmap(pixmap)
+
+
+def benchmark(frame_size=(1920, 1080), label_size=(640, 360), num_frames=200):
+    """기존 방식과 FrameDisplay의 프레임당 표시 시간 (ms) 비교"""
+    from qtpy.QtWidgets import QApplication, QLabel
+    app = QApplication.instance() or QApplication([])
+    label = QLabel()
+    label.resize(*label_size)
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (frame_size[1], frame_size[0], 3), dtype=np.uint8)
+              for _ in range(4)]
+    display = FrameDisplay(label)
+    results = {}
+    for name, fn in (('legacy', lambda f: show_legacy(label, f)), ('FrameDisplay', display.show)):
+        fn(frames[0])  # warm up
+        start = time.perf_counter()
+        for i in range(num_frames):
+            fn(frames[i % len(frames)])
+        results[name] = (time.perf_counter() - start) / num_frames * 1000
+    del app
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='프레임 표시 방식 micro-benchmark')
+    parser.add_argument('--frame-size', type=int, nargs=2, default=[1920, 1080], help='w h')
+    parser.add_argument('--label-size', type=int, nargs=2, default=[640, 360], help='w h')
+    parser.add_argument('--num-frames', type=int, default=200)
+    args = parser.parse_args()
+    results = benchmark(tuple(args.frame_size), tuple(args.label_size), args.num_frames)
+    for name, ms in results.items():
+        print(f'{name}: {ms:.2f} ms/frame')
+    print(f"speedup: {results['legacy'] / results['FrameDisplay']:.2f}x")
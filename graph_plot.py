@@ -0,0 +1,146 @@
+import numpy as np
+import pyqtgraph as pg
+
+ABNORMAL_LEVEL = 0.7
+
+
+def decimate_minmax(x, y, max_points):
+    """구간마다 최솟값과 최댓값만 남겨 점 개수를 max_points 이하로 줄입니다.
+
+    구간 안의 순서대로 (최솟값, 최댓값)을 남기므로 짧은 spike도 그래프에서 사라지지 않습니다.
+    x는 구간마다 해당 점의 x를 사용합니다.
+    """
+    num = len(x)
+    if num <= max_points:
+        return x, y
+    bin_size = -(-num // (max_points // 2))
+    num_bins = num // bin_size
+    end = num_bins * bin_size
+    bins = y[:end].reshape(num_bins, bin_size)
+    rows = np.arange(num_bins)
+    idx = np.stack([bins.argmin(1), bins.argmax(1)], axis=1)
+    idx.sort(axis=1)
+    idx = (idx + (rows * bin_size)[:, None]).reshape(-1)
+    if end < num:
+        # 나머지 점은 그대로 사용
+        idx = np.concatenate([idx, np.arange(end, num)])
+    return x[idx], y[idx]
+
+
+class SeriesRing:
+    """(time, ratio, frame) 시계열을 미리 할당한 numpy 링 버퍼에 저장합니다.
+
+    append는 O(1)이고 capacity를 넘으면 가장 오래된 값부터 덮어씁니다.
+    기본 capacity (2^20)는 30fps에서 약 9.7시간입니다.
+    """
+
+    def __init__(self, capacity=1 << 20):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.ratios = np.zeros(capacity, dtype=np.float32)
+        self.frames = np.zeros(capacity, dtype=np.int64)
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self.head = 0  # 다음에 쓸 위치
+
+    def __len__(self):
+        return self.count
+
+    def append(self, time, ratio, frame):
+        head = self.head
+        self.times[head] = time
+        self.ratios[head] = ratio
+        self.frames[head] = frame
+        self.head = (head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def __order(self, array):
+        if self.count < self.capacity:
+            return array[:self.count]  # 복사 없음
+        return np.concatenate([array[self.head:], array[:self.head]])
+
+    def arrays(self):
+        """오래된 순서의 (times, ratios, frames)"""
+        return self.__order(self.times), self.__order(self.ratios), self.__order(self.frames)
+
+    def index(self, i):
+        """오래된 순서의 i번째 위치 (음수는 뒤에서부터)"""
+        if i < 0:
+            i += self.count
+        return (self.head - self.count + i) % self.capacity
+
+    def nearest(self, time):
+        """time에 가장 가까운 점의 오래된 순서 index. 비어 있으면 None"""
+        if self.count == 0:
+            return None
+        times = self.__order(self.times)
+        i = int(np.searchsorted(times, time))
+        if i == self.count or (i > 0 and time - times[i - 1] <= times[i] - time):
+            i -= 1
+        return i
+
+    def point(self, i):
+        """오래된 순서 i번째 점의 (time, ratio, frame)"""
+        j = self.index(i)
+        return float(self.times[j]), float(self.ratios[j]), int(self.frames[j])
+
+
+class ContaminationPlot:
+    """오염도 그래프. 데이터 추가와 다시 그리기를 분리합니다.
+
+    append는 링 버퍼에만 기록하고, refresh를 고정 주기 (QTimer)로 호출하면 바뀐 것이 있을
+    때만 min/max로 줄인 점들로 곡선을 한 번 다시 그립니다. 추론 속도와 상관없이 다시
+    그리는 횟수가 일정하고, 긴 기록도 잘리지 않습니다.
+    ABNORMAL_LEVEL을 넘는 구간은 같은 점들 위에 빨간 곡선으로 겹쳐 그립니다.
+
+    Args:
+        plot_widget: pg.PlotWidget
+        max_points: 곡선에 그리는 최대 점 개수
+        capacity: 링 버퍼 크기
+    """
+
+    def __init__(self, plot_widget, max_points=4000, capacity=1 << 20):
+        self.plot_widget = plot_widget
+        self.max_points = max_points
+        self.series = SeriesRing(capacity)
+        self.curve = plot_widget.plot(pen='#002c5f')
+        self.curve_abnormal = plot_widget.plot(pen=pg.mkPen(color='red', width=3), connect='finite')
+        self.vertical_line = pg.InfiniteLine(angle=90, movable=False, pen=pg.mkPen('g', width=1))
+        plot_widget.addItem(self.vertical_line)
+        self.__cursor = 0
+        self.__dirty = False
+
+    def append(self, time, ratio, frame):
+        self.series.append(time, ratio, frame)
+        self.__cursor = time
+        self.__dirty = True
+
+    def set_cursor(self, time):
+        self.__cursor = time
+        self.__dirty = True
+
+    def clear(self):
+        self.series.clear()
+        self.__cursor = 0
+        self.__dirty = True
+        self.refresh()
+
+    def refresh(self):
+        if not self.__dirty:
+            return
+        self.__dirty = False
+        times, ratios, _ = self.series.arrays()
+        times, ratios = decimate_minmax(times, ratios, self.max_points)
+        self.curve.setData(times, ratios)
+        above = ratios > ABNORMAL_LEVEL
+        if above.any():
+            # 경계를 넘는 선분도 빨간색으로 그리도록 양 옆 점까지 포함
+            mask = above.copy()
+            mask[1:] |= above[:-1]
+            mask[:-1] |= above[1:]
+            self.curve_abnormal.setData(times, np.where(mask, ratios, np.nan))
+        else:
+            self.curve_abnormal.setData([], [])
+        self.vertical_line.setValue(self.__cursor)
@@ -0,0 +1,361 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class FrameRef:
+    """링 버퍼 슬롯을 가리키는 프레임 참조 (복사 없음).
+
+    with 블록 안에서만 array를 사용해야 합니다. 블록을 벗어나면 슬롯이 해제되어
+    producer가 덮어쓸 수 있습니다. 계속 보관하려면 array.copy()를 사용하세요.
+    """
+
+    def __init__(self, ring, slot, seq, timestamp):
+        self.__ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.timestamp = timestamp
+        self.array = ring.slots[slot]
+
+    def release(self):
+        if self.__ring is not None:
+            self.__ring._unpin(self.slot)
+            self.__ring = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class FrameConsumer:
+    """링 버퍼를 읽는 consumer. consumer마다 읽은 위치와 드롭 카운터를 따로 가집니다.
+
+    policy:
+        'latest': 항상 가장 최근 프레임을 읽고 건너뛴 프레임은 dropped로 셉니다. (화면, 추론)
+        'drop_oldest': 순서대로 읽고, 늦어서 덮어쓰인 프레임만 dropped로 셉니다. (녹화)
+    """
+    POLICIES = ('latest', 'drop_oldest')
+
+    def __init__(self, ring, name, policy):
+        assert policy in self.POLICIES, f'Unsupported consumer policy: {policy}'
+        self.ring = ring
+        self.name = name
+        self.policy = policy
+        self.consumed = 0
+        self.dropped = 0
+        self.next_seq = ring.write_seq
+
+    @property
+    def lag(self):
+        """아직 읽지 않은 프레임 수"""
+        return max(self.ring.write_seq - self.next_seq, 0)
+
+    def get(self, timeout=None):
+        """다음 프레임의 FrameRef 반환. timeout 또는 버퍼가 닫히면 None"""
+        return self.ring._read(self, timeout)
+
+    def as_dict(self):
+        return {'policy': self.policy, 'consumed': self.consumed,
+                'dropped': self.dropped, 'lag': self.lag}
+
+
+class FrameRingBuffer:
+    """미리 할당된 고정 크기 프레임 링 버퍼.
+
+    producer는 write(fill_fn)으로 다음 슬롯에 직접 프레임을 써넣고
+    (cv2.VideoCapture.read(image=slot) 등), consumer는 슬롯의 view를 받습니다.
+    가장 오래된 슬롯부터 덮어쓰므로 메모리 사용량은 capacity로 고정됩니다.
+    consumer가 사용 중(pin)인 슬롯은 건너뛰고 다음으로 오래된 슬롯을 덮어쓰므로
+    느린 consumer가 있어도 producer는 모든 슬롯이 사용 중일 때만 기다립니다.
+
+    Args:
+        capacity: 슬롯 수
+        frame_shape: 프레임 shape (H, W, 3)
+        dtype: 프레임 dtype
+    """
+
+    def __init__(self, capacity, frame_shape, dtype=np.uint8):
+        assert capacity >= 2, 'capacity must be at least 2'
+        self.capacity = capacity
+        self.slots = np.zeros((capacity, ) + tuple(frame_shape), dtype=dtype)
+        self.seqs = np.full(capacity, -1, dtype=np.int64)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.write_seq = 0
+        self.producer_waits = 0
+        self.__pins = np.zeros(capacity, dtype=np.int32)
+        self.__consumers = {}
+        self.__cond = threading.Condition()
+        self.__closed = False
+
+    def register(self, name, policy='latest'):
+        with self.__cond:
+            consumer = FrameConsumer(self, name, policy)
+            self.__consumers[name] = consumer
+            return consumer
+
+    def unregister(self, name):
+        with self.__cond:
+            self.__consumers.pop(name, None)
+
+    @property
+    def consumers(self):
+        return dict(self.__consumers)
+
+    def write(self, fill_fn):
+        """fill_fn(slot_array) -> bool 로 다음 슬롯을 채웁니다. 실패하면 None, 성공하면 seq 반환"""
+        with self.__cond:
+            if self.__pins.all():
+                self.producer_waits += 1
+                self.__cond.wait_for(lambda: not self.__pins.all() or self.__closed)
+            if self.__closed:
+                return None
+            # 사용 중이 아닌 슬롯 중 가장 오래된 프레임을 덮어씀
+            free = np.flatnonzero(self.__pins == 0)
+            slot = free[np.argmin(self.seqs[free])]
+            # 쓰는 동안에는 이 슬롯을 읽지 못하도록 표시
+            self.seqs[slot] = -1
+        seq = self.write_seq
+        if not fill_fn(self.slots[slot]):
+            return None
+        with self.__cond:
+            self.seqs[slot] = seq
+            self.timestamps[slot] = time.time()
+            self.write_seq = seq + 1
+            self.__cond.notify_all()
+        return seq
+
+    def _read(self, consumer, timeout):
+        with self.__cond:
+            self.__cond.wait_for(
+                lambda: (self.seqs >= consumer.next_seq).any() or self.__closed, timeout)
+            ready = np.flatnonzero(self.seqs >= consumer.next_seq)
+            if not len(ready):
+                return None
+            if consumer.policy == 'latest':
+                slot = ready[np.argmax(self.seqs[ready])]
+            else:
+                # 덮어쓰인 프레임은 건너뛰고 남아 있는 가장 오래된 프레임부터
+                slot = ready[np.argmin(self.seqs[ready])]
+            seq = int(self.seqs[slot])
+            consumer.dropped += seq - consumer.next_seq
+            consumer.consumed += 1
+            consumer.next_seq = seq + 1
+            self.__pins[slot] += 1
+            return FrameRef(self, slot, seq, self.timestamps[slot])
+
+    def _unpin(self, slot):
+        with self.__cond:
+            self.__pins[slot] -= 1
+            self.__cond.notify_all()
+
+    def close(self):
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+
+    @property
+    def closed(self):
+        return self.__closed
+
+    def summary(self):
+        with self.__cond:
+            return {
+                'captured': self.write_seq,
+                'producer_waits': self.producer_waits,
+                'consumers': {name: c.as_dict() for name, c in self.__consumers.items()}
+            }
+
+
+class SyntheticSource:
+    """카메라 없이 테스트하기 위한 합성 영상 소스 (움직이는 그라디언트 + 프레임 번호)"""
+
+    def __init__(self, size=(640, 480), fps=30):
+        self.width, self.height = size
+        self.fps = fps
+        self.__index = 0
+        self.__base = np.tile(
+            np.linspace(0, 255, self.width, dtype=np.uint8)[None, :, None],
+            (self.height, 1, 3))
+
+    @property
+    def frame_shape(self):
+        return (self.height, self.width, 3)
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        if image is None:
+            image = np.empty(self.frame_shape, dtype=np.uint8)
+        shift = (self.__index * 4) % self.width
+        image[:, :self.width - shift] = self.__base[:, shift:]
+        image[:, self.width - shift:] = self.__base[:, :shift]
+        cv2.putText(image, str(self.__index), (10, 40), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.2, (0, 0, 255), 2)
+        self.__index += 1
+        return True, image
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FPS: self.fps,
+                cv2.CAP_PROP_FRAME_WIDTH: self.width,
+                cv2.CAP_PROP_FRAME_HEIGHT: self.height}.get(prop, 0)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FPS:
+            self.fps = value
+        return True
+
+    def release(self):
+        pass
+
+
+def open_source(source, fps=30, size=(640, 480)):
+    """source: 카메라 번호/장치 경로, 영상 파일 경로, 또는 'synthetic'"""
+    if source == 'synthetic':
+        return SyntheticSource(size, fps)
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    capture = cv2.VideoCapture(source)
+    if isinstance(source, int) or str(source).startswith('/dev/video'):
+        capture.set(cv2.CAP_PROP_FPS, fps)
+    return capture
+
+
+class RecordingRanges:
+    """녹화할 프레임 구간을 링 버퍼 seq 범위 [start, stop)로 기록합니다.
+
+    GUI 스레드는 처리를 시작/멈출 때 start/stop을 호출하고, 녹화 스레드는 늦게 읽은
+    프레임도 캡처된 시점의 상태대로 기록할지 판단합니다. (frame.seq in ranges)
+    """
+
+    def __init__(self):
+        self.__ranges = []
+        self.__lock = threading.Lock()
+
+    def start(self, seq):
+        with self.__lock:
+            if not self.__ranges or self.__ranges[-1][1] is not None:
+                self.__ranges.append([seq, None])
+
+    def stop(self, seq):
+        with self.__lock:
+            if self.__ranges and self.__ranges[-1][1] is None:
+                self.__ranges[-1][1] = seq
+
+    @property
+    def active(self):
+        with self.__lock:
+            return bool(self.__ranges) and self.__ranges[-1][1] is None
+
+    def __contains__(self, seq):
+        with self.__lock:
+            return any(start <= seq and (stop is None or seq < stop)
+                       for start, stop in self.__ranges)
+
+
+class LiveCapture:
+    """캡처 스레드가 소스에서 FrameRingBuffer로 프레임을 읽어 넣는 실시간 캡처.
+
+    화면/추론/녹화 등 consumer는 register(name, policy)로 등록해 각자의 속도로 읽습니다.
+    느린 consumer는 캡처를 막지 않고 dropped/lag 카운터만 늘어납니다.
+
+    Args:
+        source: 카메라 번호/장치 경로('/dev/video0'), 영상 파일 경로, 'synthetic'
+            또는 read(image)를 제공하는 객체
+        capacity: 링 버퍼 슬롯 수
+        fps: 카메라/합성 소스에 요청할 FPS
+        realtime: 파일 소스를 영상 FPS에 맞춰 읽을지 여부 (카메라처럼 동작)
+        loop: 파일 소스가 끝나면 처음부터 다시 읽을지 여부
+    """
+
+    def __init__(self, source, capacity=8, fps=30, realtime=True, loop=False,
+                 size=(640, 480)):
+        self.source = source
+        self.capture = source if hasattr(source, 'read') else open_source(source, fps, size)
+        self.is_file = isinstance(source, str) and source != 'synthetic' and \
+            not source.isdigit() and not source.startswith('/dev/video')
+        self.realtime = realtime
+        self.loop = loop
+        self.ring = None
+        self.fps = fps
+        self.__thread = None
+        self.__stop_event = threading.Event()
+        self.__first = None
+        if self.capture.isOpened():
+            fps = self.capture.get(cv2.CAP_PROP_FPS)
+            if fps and fps > 0:
+                self.fps = fps
+            # 첫 프레임으로 해상도를 확인하고 버퍼를 할당
+            ret, frame = self.capture.read()
+            if ret:
+                self.__first = frame
+                self.ring = FrameRingBuffer(capacity, frame.shape, frame.dtype)
+
+    def isOpened(self):
+        return self.ring is not None
+
+    @property
+    def frame_shape(self):
+        return self.ring.slots.shape[1:]
+
+    def register(self, name, policy='latest'):
+        return self.ring.register(name, policy)
+
+    def start(self):
+        assert self.isOpened(), f'Failed to open capture source: {self.source}'
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__capture_worker,
+                                         name='LiveCapture', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+        if self.ring is not None:
+            self.ring.close()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        self.capture.release()
+
+    def is_running(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def summary(self):
+        return self.ring.summary() if self.ring is not None else {}
+
+    def __fill(self, slot):
+        if self.__first is not None:
+            slot[...] = self.__first
+            self.__first = None
+            return True
+        ret, frame = self.capture.read(slot)
+        if not ret and self.is_file and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read(slot)
+        if ret and frame is not slot:
+            # 해상도가 달라 OpenCV가 새 배열을 만든 경우
+            slot[...] = cv2.resize(frame, (slot.shape[1], slot.shape[0]))
+        return ret
+
+    def __capture_worker(self):
+        # 카메라는 read()가 프레임 속도에 맞춰 블록되지만 파일/합성 소스는 직접 맞춤
+        paced = self.realtime and (self.is_file or isinstance(self.capture, SyntheticSource))
+        interval = 1.0 / self.fps if self.fps else 0
+        next_time = time.perf_counter()
+        try:
+            while not self.__stop_event.is_set():
+                if self.ring.write(self.__fill) is None:
+                    break
+                if paced:
+                    next_time += interval
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_time = time.perf_counter()
+        finally:
+            self.ring.close()
@@ -4,19 +4,23 @@ import time
 import cv2
 import numpy as np
 from script import MMSegWrapper, open_directory
+from video_pipeline import VideoPipeline
+from result_cache import VideoResultCache
+from live_capture import LiveCapture, RecordingRanges
+from temporal_infer import TemporalInference
+from graph_plot import ContaminationPlot
+from frame_display import FrameDisplay
+from result_recorder import ResultRecorder, format_time
 import pyqtgraph as pg
 from qtpy.QtWidgets import QMainWindow, QApplication, QWidget, QVBoxLayout, QPushButton, QLineEdit, QGroupBox, \
     QFormLayout, QCheckBox, QMessageBox, QLabel, QTableWidget, QSplitter, \
     QTableWidgetItem, QFileDialog, QListWidget, QHBoxLayout, QSizePolicy, QSpacerItem
-from qtpy.QtCore import Qt, QCoreApplication, QTimer, QSize , QThread, Signal
-from qtpy.QtGui import QFont, QPixmap, QImage, QColor, QPainter, QPen, QKeySequence
+from qtpy.QtCore import Qt, QCoreApplication, QTimer, QSize , QThread, Signal, QObject
+from qtpy.QtGui import QFont, QPixmap, QColor, QPainter, QPen, QKeySequence
 from PyQt5.QtGui import QFontDatabase
 from qtpy.QtGui import QIcon
 from qtpy.QtWidgets import QHeaderView
 from qtpy.QtWidgets import QSlider
-import json
-import csv
-from queue import Queue
 import threading
 
 os.environ['QT_API'] = 'pyqt6'
@@ -36,6 +40,18 @@ def print_available_fonts():
     for font in font_families:
         print(font)
 
+class PipelineSignals(QObject):
+    # VideoPipeline 워커 스레드의 결과를 GUI 스레드로 전달하는 시그널
+    resultReady = Signal(int, object)
+    frameReady = Signal(int, object, object, object)
+    finished = Signal(bool)
+
+
+class ExportSignals(QObject):
+    # 결과 저장 스레드가 끝나면 (저장 완료 메시지, 오류) 전달
+    finished = Signal(str, object)
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super(MainWindow, self).__init__()
@@ -45,20 +61,42 @@ class MainWindow(QMainWindow):
         self.__current_frame = 0
 
     def __initVal(self):
-        self.__wrapper = MMSegWrapper()
+        # 추론 정밀도: fp32 / bf16 (CPU) / fp16 (GPU)
+        self.__wrapper = MMSegWrapper(
+            precision=os.environ.get('HYUNDAI_PRECISION', 'fp32'),
+            channels_last=os.environ.get('HYUNDAI_CHANNELS_LAST', '0') == '1',
+            reference_dir=os.environ.get('HYUNDAI_REFERENCE_DIR'))
+        # 연속 프레임의 패치 점수 필터링 + 변화 없는 프레임 건너뛰기 (HYUNDAI_TEMPORAL=1)
+        self.__temporal = None
+        if os.environ.get('HYUNDAI_TEMPORAL', '0') == '1':
+            gate_threshold = os.environ.get('HYUNDAI_GATE_THRESHOLD')
+            self.__temporal = TemporalInference(
+                self.__wrapper, gate_threshold=float(gate_threshold) if gate_threshold else None)
         self.__currentIndex = -1
         self.__fileList = []
         self.__videoCapture = None
-        self.__timer = QTimer(self)
-        self.__timer.timeout.connect(self.__playVideo)
+        self.__pipeline = None
+        self.__result_cache = None
+        self.__pipeline_signals = PipelineSignals()
+        self.__pipeline_signals.resultReady.connect(self.__onPipelineResult)
+        self.__pipeline_signals.frameReady.connect(self.__onPipelineFrame)
+        self.__pipeline_signals.finished.connect(self.__onPipelineFinished)
+        self.__last_scored_frame = -1
+        self.__resume_after_slider = False
         self.__playing = False
         self.__showGrid = False
-        self.__graph_data = {'time': [], 'abnormal_ratio': [], 'frame_number': []}
         self.__frame_count = 0
         self.__video_fps = None
         self.__current_frame = 0
-        self.__frame_data = []
-        self.__liveVideoCapture = None
+        # 프레임별 결과는 메모리 대신 디스크에 이어 쓰고, 저장할 때 JSON/CSV/TXT로 변환
+        self.__recorder = ResultRecorder()
+        self.__export_signals = ExportSignals()
+        self.__export_signals.finished.connect(self.__onExportFinished)
+        self.__liveCapture = None
+        self.__liveDisplay = None
+        self.__liveInfer = None
+        # 카메라 대신 영상 파일이나 'synthetic'으로 실시간 모드를 테스트할 수 있음
+        self.__live_source = os.environ.get('HYUNDAI_LIVE_SOURCE', '/dev/video0')
         self.__liveTimer = QTimer(self)
         self.__liveTimer.timeout.connect(self.__playVideo)
         self.__real_time_mode = False
@@ -66,8 +104,10 @@ class MainWindow(QMainWindow):
         self.__process_live = False 
         self.__videoWriter = None
         self.__live_video_filename = ""
-        self.__frame_queue = Queue()
-        self.__stop_saving = threading.Event()
+        # 처리 중(__process_live)에 캡처된 프레임의 seq 구간. 녹화 스레드는 이 구간만 기록
+        self.__record_ranges = RecordingRanges()
+        self.__video_recorder = None
+        self.__writer_stop_seq = None
         self.__video_writer_thread = None
         
     def __initUi(self):
@@ -146,6 +186,10 @@ class MainWindow(QMainWindow):
         self.__resultImageLabel.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.__resultImageLabel.setMinimumSize(400, 300)  # 최소 크기 설정
 
+        # label 크기로 먼저 줄이고 BGR 그대로 QPixmap으로 변환 (버퍼/표시 크기 재사용)
+        self.__frameDisplay = FrameDisplay(self.__imageLabel)
+        self.__resultDisplay = FrameDisplay(self.__resultImageLabel, post=self.__postResultPixmap)
+
         # Legend Table 생성 및 설정
         self.__legendTableWidget = QTableWidget()
         self.__legendTableWidget.setEditTriggers(QTableWidget.NoEditTriggers)
@@ -257,10 +301,11 @@ class MainWindow(QMainWindow):
         self.__plot_widget.showGrid(x=True, y=True)
         self.__plot_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.__plot_widget.setMinimumSize(200,150)
-        self.__plot_curve = self.__plot_widget.plot(pen='#002c5f')
-        self.__plot_curve_abnormal = self.__plot_widget.plot(pen=pg.mkPen(color='red', width=3))
-        self.__vertical_line = pg.InfiniteLine( angle=90, movable=False, pen=pg.mkPen('g', width=1))
-        self.__plot_widget.addItem(self.__vertical_line)
+        # 결과는 링 버퍼에 쌓고, 그래프는 추론 속도와 상관없이 고정 주기로 다시 그림
+        self.__plot = ContaminationPlot(self.__plot_widget)
+        self.__plotTimer = QTimer(self)
+        self.__plotTimer.timeout.connect(self.__plot.refresh)
+        self.__plotTimer.start(100)
         self.__plot_widget.scene().sigMouseClicked.connect(self.__onPlotClicked)
 
 
@@ -391,7 +436,7 @@ class MainWindow(QMainWindow):
             self.__displayImage(self.__fileList[self.__currentIndex])
             self.__updateVideoCapture()
             self.__resetGraph()
-            self.__frame_data = []
+            self.__resetRecorder()
 
     def __toggleGrid(self, state):
         self.__showGrid = state == Qt.Checked
@@ -403,16 +448,24 @@ class MainWindow(QMainWindow):
         pen = QPen(QColor(0, 170, 210), 1, Qt.SolidLine)
         painter.setPen(pen)
         rows, cols = 16, 16
-        row_step = pixmap.height() / rows
-        col_step = pixmap.width() / cols
+        # QPainter는 device pixel ratio가 적용된 좌표를 사용
+        width = pixmap.width() / pixmap.devicePixelRatio()
+        height = pixmap.height() / pixmap.devicePixelRatio()
+        row_step = height / rows
+        col_step = width / cols
 
         for i in range(rows + 1):
-            painter.drawLine(0, int(i * row_step), pixmap.width(), int(i * row_step))
+            painter.drawLine(0, int(i * row_step), int(width), int(i * row_step))
         for j in range(cols + 1):
-            painter.drawLine(int(j * col_step), 0, int(j * col_step), pixmap.height())
+            painter.drawLine(int(j * col_step), 0, int(j * col_step), int(height))
         
         painter.end()
         return pixmap
+
+    def __postResultPixmap(self, pixmap):
+        if self.__showGrid:
+            pixmap = self.__addGrid(pixmap)
+        return pixmap
     
     
     def __prevImage(self):
@@ -423,7 +476,7 @@ class MainWindow(QMainWindow):
             self.__displayImage(self.__fileList[self.__currentIndex])
             self.__updateVideoCapture()
             self.__resetGraph()
-            self.__frame_data = []
+            self.__resetRecorder()
 
     def __nextImage(self):
         if self.__currentIndex < len(self.__fileList) - 1:
@@ -433,26 +486,20 @@ class MainWindow(QMainWindow):
             self.__displayImage(self.__fileList[self.__currentIndex])
             self.__updateVideoCapture()
             self.__resetGraph()
-            self.__frame_data = []
+            self.__resetRecorder()
     
     def __displayImage(self, path):
         if path.endswith('.mp4'):
             cap = cv2.VideoCapture(path)
             ret, frame = cap.read()
             if ret:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = frame_rgb.shape
-                bytes_per_line = ch * w
-                q_image = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(q_image)
+                self.__frameDisplay.show(frame)
             else:
                 QMessageBox.warning(self, "비디오 오류", f"{path} 파일을 읽을 수 없습니다.")
-                pixmap = QPixmap()  # 빈 픽스맵 설정
+                self.__imageLabel.setPixmap(QPixmap())  # 빈 픽스맵 설정
             cap.release()
         else:
-            pixmap = QPixmap(path)
-        pixmap = pixmap.scaled(self.__imageLabel.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.__imageLabel.setPixmap(pixmap)
+            self.__frameDisplay.show_file(path)
 
     def __updateNavigationButtons(self):
         has_files = bool(self.__fileList)
@@ -464,6 +511,11 @@ class MainWindow(QMainWindow):
 
     def __updateVideoCapture(self):
         current_file = self.__fileList[self.__currentIndex]
+        self.__stopPipeline()
+        self.__playing = False
+        self.__last_scored_frame = -1
+        self.__closeResultCache()
+        self.__resetTemporal()
         if current_file.endswith('.mp4'):
             if self.__videoCapture is not None:
                 self.__videoCapture.release()
@@ -481,6 +533,12 @@ class MainWindow(QMainWindow):
             self.__video_fps = self.__videoCapture.get(cv2.CAP_PROP_FPS)
             self.__video_duration = total_frames / self.__video_fps
             self.__current_frame = 0
+
+            # 같은 영상/체크포인트로 계산한 결과는 디스크 캐시에서 재사용
+            if total_frames > 0:
+                self.__result_cache = VideoResultCache(
+                    current_file, self.__wrapper.checkpoint_file, total_frames,
+                    signature=self.__wrapper.result_signature())
         else:
             if self.__videoCapture is not None:
                 self.__videoCapture.release()
@@ -499,21 +557,28 @@ class MainWindow(QMainWindow):
             ret, frame = self.__videoCapture.read()
             if ret:
                 self.__displayFrame(frame)
-                dst_filename, result_dict = self.__wrapper.get_result(frame)
-                self.__displayResultImage(dst_filename)
+                self.__resetTemporal()
+                result_dict = self.__inferFrame(frame_pos, frame)
+                self.__displayResultImage(self.__wrapper.render(frame, result_dict))
                 self.__current_frame = frame_pos  # 현재 프레임 업데이트
                 self.__resetGraph()  # 그래프 초기화
-                self.__frame_data = []
-                self.__updateGraphData(result_dict)  # 현재 프레임의 데이터로 그래프 업데이트
-                abnormal_ratio = self.__graph_data['abnormal_ratio'][-1]
+                self.__resetRecorder()
+                abnormal_ratio = self.__updateGraphData(result_dict)  # 현재 프레임의 데이터로 그래프 업데이트
                 self.__updateResultTable(result_dict, abnormal_ratio)
 
 
     def __sliderPressed(self):
         self.__isSliderPressed = True
+        # 재생 중이면 파이프라인을 멈추고, 슬라이더를 놓으면 그 위치부터 다시 재생
+        if self.__playing and not self.__real_time_mode:
+            self.__resume_after_slider = True
+            self.__pause()
 
     def __sliderReleased(self):
         self.__isSliderPressed = False
+        if self.__resume_after_slider:
+            self.__resume_after_slider = False
+            self.__play()
 
 
     def __goToFirst(self):
@@ -522,10 +587,11 @@ class MainWindow(QMainWindow):
         ret, frame = self.__videoCapture.read()
         if ret:
             self.__displayFrame(frame)
-            dst_filename, _ = self.__wrapper.get_result(frame)
-            self.__displayResultImage(dst_filename)
+            self.__resetTemporal()
+            result_dict = self.__inferFrame(0, frame)
+            self.__displayResultImage(self.__wrapper.render(frame, result_dict))
             self.__resetGraph()
-            self.__frame_data = []
+            self.__resetRecorder()
             self.__current_frame = 0  # 현재 프레임을 0으로 설정
 
     def __goToLast(self):
@@ -535,10 +601,11 @@ class MainWindow(QMainWindow):
             ret, frame = self.__videoCapture.read()
             if ret:
                 self.__displayFrame(frame)
-                dst_filename, _ = self.__wrapper.get_result(frame)
-                self.__displayResultImage(dst_filename)
+                self.__resetTemporal()
+                result_dict = self.__inferFrame(total_frames - 1, frame)
+                self.__displayResultImage(self.__wrapper.render(frame, result_dict))
                 self.__resetGraph()
-                self.__frame_data = []
+                self.__resetRecorder()
                 self.__current_frame = total_frames - 1
     
     
@@ -546,6 +613,8 @@ class MainWindow(QMainWindow):
         if self.__real_time_mode:
             if not self.__process_live:
                 self.__process_live = True
+                if self.__liveCapture is not None:
+                    self.__record_ranges.start(self.__liveCapture.ring.write_seq)
                 self.__playing = True  # 추가: 재생 상태 설정
                 self.__liveTimer.start(1000 // self.__live_fps)  # 타이머 시작 (프레임 속도에 맞게 조정)
         else:
@@ -553,8 +622,7 @@ class MainWindow(QMainWindow):
             if current_file.endswith('.mp4'):
                 if not self.__playing:
                     self.__playing = True
-                    self.__videoCapture.set(cv2.CAP_PROP_POS_FRAMES, self.__current_frame)
-                    self.__timer.start(int(1000 / self.__video_fps))
+                    self.__startPipeline(current_file, self.__current_frame)
                     if self.__frameSlider.maximum():
                         self.__realTimeChkBox.setEnabled(True)
                     else:
@@ -566,120 +634,137 @@ class MainWindow(QMainWindow):
             if self.__real_time_mode:
                 self.__liveTimer.stop()
                 self.__process_live = False  # 처리 중지
+                if self.__liveCapture is not None:
+                    self.__record_ranges.stop(self.__liveCapture.ring.write_seq)
             else:
-                self.__timer.stop()
-                self.__current_frame = int(self.__videoCapture.get(cv2.CAP_PROP_POS_FRAMES))
+                self.__stopPipeline()
+                if self.__last_scored_frame >= 0:
+                    self.__current_frame = self.__last_scored_frame + 1
+
+    def __startPipeline(self, path, start_frame):
+        # decode -> infer -> render를 각각의 스레드에서 실행하고 결과만 시그널로 받음
+        self.__stopPipeline()
+        capture = cv2.VideoCapture(path)
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        signals = self.__pipeline_signals
+        self.__pipeline = VideoPipeline(
+            capture,
+            infer_fn=self.__inferFrame,
+            render_fn=self.__wrapper.render,
+            on_result=signals.resultReady.emit,
+            on_render=signals.frameReady.emit,
+            on_finished=signals.finished.emit,
+            start_frame=start_frame,
+            decode_policy='block',  # 모든 프레임을 추론
+            render_policy='drop_oldest')  # 화면에는 가장 최근 결과만 표시
+        self.__pipeline.start()
+
+    def __stopPipeline(self):
+        if self.__pipeline is not None:
+            self.__pipeline.stop()
+            self.__pipeline.capture.release()
+            self.__pipeline = None
+        if self.__result_cache is not None:
+            self.__result_cache.flush()
+
+    def __inferFrame(self, frame_index, frame):
+        # 이전 프레임에 따라 결과가 달라지므로 프레임별 디스크 캐시는 사용하지 않음
+        if self.__temporal is not None:
+            return self.__temporal.infer(frame)
+        # 캐시에 있는 프레임은 모델을 거치지 않음 (파이프라인 infer 스레드에서도 호출됨)
+        cache = self.__result_cache
+        if cache is not None:
+            result_dict = cache.get(frame_index)
+            if result_dict is not None:
+                return result_dict
+        result_dict = self.__wrapper.infer(frame)
+        if cache is not None:
+            cache.put(frame_index, result_dict)
+        return result_dict
+
+    def __resetTemporal(self):
+        if self.__temporal is not None:
+            self.__temporal.reset()
+
+    def __closeResultCache(self):
+        if self.__result_cache is not None:
+            self.__result_cache.close()
+            self.__result_cache = None
+
+    def __onPipelineResult(self, frame_index, result_dict):
+        # 모든 추론 결과를 그래프와 저장 데이터에 기록
+        self.__current_frame = frame_index
+        self.__last_scored_frame = frame_index
+        abnormal_ratio = self.__updateGraphData(result_dict)
+        result_dict['abnormal_ratio'] = abnormal_ratio
+
+        current_time = frame_index / self.__video_fps
+        self.__recorder.append(current_time, frame_index, abnormal_ratio, result_dict['seg_map'])
+
+    def __onPipelineFrame(self, frame_index, frame, vis_img, result_dict):
+        self.__realTimeChkBox.setEnabled(False)
+        self.__displayFrame(frame)
+        self.__displayResultImage(vis_img)
+        self.__updateResultTable(result_dict, result_dict.get('abnormal_ratio', 0))
+        self.__frameSlider.setValue(frame_index)
+
+    def __onPipelineFinished(self, completed):
+        if self.__pipeline is not None:
+            for stats in self.__pipeline.stats.values():
+                print(stats)
+            print(f"dropped frames: {self.__pipeline.dropped}")
+            if self.__temporal is not None:
+                print(self.__temporal.summary())
+            print(self.__frameDisplay.summary())
+        if not completed:
+            return
+
+        self.__video_finished = True
+        self.__realTimeChkBox.setEnabled(True)
+        self.__pause()
+        self.__current_frame = self.__frameSlider.maximum()
+        self.__promptSaveResults()
+        self.__realTimeChkBox.setEnabled(True)
 
 
     def __playVideo(self):
         
         if self.__real_time_mode:
             self.__frameSlider.setEnabled(False)
-            if self.__liveVideoCapture.isOpened():
-                ret, frame = self.__liveVideoCapture.read()
-                if ret:
+            if self.__liveCapture is not None:
+                # 캡처 스레드가 링 버퍼에 넣은 가장 최근 프레임만 사용 (밀린 프레임은 건너뜀)
+                frame_ref = self.__liveDisplay.get(timeout=0)
+                if frame_ref is not None:
                     self.__frame_count += 1
-                    if self.__frame_count % 1 == 0: 
-                        # 프레임을 RGB로 변환
-                        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        q_image = QImage(frame_rgb.data, frame_rgb.shape[1], frame_rgb.shape[0],
-                                        frame_rgb.strides[0], QImage.Format_RGB888)
-                        pixmap = QPixmap.fromImage(q_image)
-                        self.__imageLabel.setPixmap(pixmap.scaled(
-                            self.__imageLabel.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                        if self.__process_live:
-                            # 인퍼런스 수행 및 결과 업데이트
-                            dst_filename, result_dict = self.__wrapper.get_result(frame)
-                            self.__displayResultImage(dst_filename)
-                            abnormal_ratio = self.__updateGraphData(result_dict)
-                            self.__updateResultTable(result_dict, abnormal_ratio)
-
-                            # 프레임 데이터 업데이트
-                            if self.__video_fps is None or self.__video_fps == 0 or self.__video_fps ==-1:
-                                current_time = self.__current_frame / self.__live_fps
-                            else:
-                                current_time = self.__current_frame / self.__video_fps
-                            self.__frame_data.append({
-                                'time': current_time,
-                                'contamination_level': abnormal_ratio,
-                                'patch_counts': {str(val): count for val, count in zip(result_dict['unique_values'], result_dict['counts'])},
-                                'patch_array': result_dict.get('seg_map', [])
-                            })
-
-                                # VideoWriter에 프레임 기록
-                            if self.__videoWriter is not None:
-                                self.__frame_queue.put(frame.copy())
-                       
-
-                            self.__current_frame += 1
-                else:
-                    QMessageBox.warning(self, "실시간 비디오", "비디오 스트림을 읽을 수 없습니다.")
-                    self.__stopLiveVideoCapture()
-        
-        else:
-            self.__realTimeChkBox.setEnabled(False)
-            if self.__videoCapture.isOpened() and not self.__isSliderPressed:
-                ret, frame = self.__videoCapture.read()
-                if ret:
-                    self.__frame_count += 1
-                    if self.__frame_count % 2 == 0:  # n프레임마다 처리
-                        dst_filename, result_dict = self.__wrapper.get_result(frame)
-                        self.__displayFrame(frame)
-                        self.__displayResultImage(dst_filename)
-                        abnormal_ratio = self.__updateGraphData(result_dict)
-                        self.__updateResultTable(result_dict, abnormal_ratio)
+                    with frame_ref:
+                        # 링 버퍼 슬롯에서 바로 줄여 표시 (QPixmap이 만들어진 뒤 슬롯 해제)
+                        self.__frameDisplay.show(frame_ref.array)
+                infer_ref = self.__liveInfer.get(timeout=0)
+                if infer_ref is not None and self.__process_live:
+                    with infer_ref:
+                        # 인퍼런스 수행 (오버레이 결과는 새 배열이므로 슬롯은 바로 해제)
+                        if self.__temporal is not None:
+                            result_dict = self.__temporal.infer(infer_ref.array)
+                            dst_filename = self.__wrapper.render(infer_ref.array, result_dict)
+                        else:
+                            dst_filename, result_dict = self.__wrapper.get_result(infer_ref.array)
+                    # 건너뛴 프레임이 있어도 그래프/결과 시간은 캡처된 프레임 번호 기준
+                    self.__current_frame = infer_ref.seq
+                    self.__displayResultImage(dst_filename)
+                    abnormal_ratio = self.__updateGraphData(result_dict)
+                    self.__updateResultTable(result_dict, abnormal_ratio)
 
+                    # 프레임 데이터 업데이트
+                    if self.__video_fps is None or self.__video_fps == 0 or self.__video_fps ==-1:
+                        current_time = self.__current_frame / self.__live_fps
+                    else:
                         current_time = self.__current_frame / self.__video_fps
-                        patch_counts = {str(val): count for val, count in zip(result_dict['unique_values'], result_dict['counts'])}
-                        patch_array = result_dict['seg_map'] if 'seg_map' in result_dict else []
-                        frame_data = {
-                        'time': current_time,
-                        'contamination_level': abnormal_ratio,
-                        'patch_counts': patch_counts,
-                        'patch_array': patch_array
-                    }
-                        self.__frame_data.append(frame_data)
-                        #print(self.__frame_data)
-
-                    self.__current_frame = int(self.__videoCapture.get(cv2.CAP_PROP_POS_FRAMES))
-                    self.__frameSlider.setValue(self.__current_frame)
-
-                    if self.__current_frame == self.__frameSlider.maximum():
-                        self.__video_finished = True
-                        self.__realTimeChkBox.setEnabled(True)
-                        self.__pause()
-
-                        # 팝업 창 표시 (Y/N 키 단축키 설정)
-                        msgBox = QMessageBox(self)
-                        msgBox.setWindowTitle('저장 확인')
-                        msgBox.setText('저장하시겠습니까?')
-                        msgBox.setIcon(QMessageBox.Question)
-                        
-                        # "No" 버튼 먼저 추가
-                        no_button = msgBox.addButton('No', QMessageBox.NoRole)
-                        # "Yes" 버튼 나중에 추가
-                        yes_button = msgBox.addButton('Yes', QMessageBox.YesRole)
-                        
-                        # 버튼에 단축키 설정
-                        no_button.setShortcut(QKeySequence(Qt.Key_N))
-                        yes_button.setShortcut(QKeySequence(Qt.Key_Y))
-                        
-                        # 기본 버튼 설정 (필요시 설정 가능)
-                        msgBox.setDefaultButton(no_button)
-                        
-                        # 메시지 박스 실행
-                        msgBox.exec()
-                        
-                        # 사용자 응답 처리
-                        if msgBox.clickedButton() == yes_button:
-                            self.__saveResults()
-                        elif msgBox.clickedButton() == no_button:
-                            pass  # "No"를 선택한 경우 추가 작업이 필요하면 여기에 작성
-                        self.__realTimeChkBox.setEnabled(True)
-                else:
-                    self.__pause()
-                    #self.__video_finished = True
-        
+                    self.__recorder.append(current_time, self.__current_frame, abnormal_ratio, result_dict['seg_map'])
+                elif infer_ref is not None:
+                    infer_ref.release()
+                if frame_ref is None and not self.__liveCapture.is_running():
+                    QMessageBox.warning(self, "실시간 비디오", "비디오 스트림을 읽을 수 없습니다.")
+                    self.__stopLiveVideoCapture()
 
     
     def __saveResults(self):
@@ -717,18 +802,12 @@ class MainWindow(QMainWindow):
                     current_file = self.__fileList[self.__currentIndex]
                     base_name = os.path.splitext(os.path.basename(current_file))[0]
                 
-                if not self.__frame_data:
+                time_range = self.__recorder.time_range()
+                if time_range is None:
                     QMessageBox.warning(self, "저장 실패", "저장할 데이터가 없습니다.")
                     return
                 
-                start_time = self.__frame_data[0]['time']
-                end_time = self.__frame_data[-1]['time']
-                
-                def format_time(seconds):
-                    hrs = int(seconds // 3600)
-                    mins = int((seconds % 3600) // 60)
-                    secs = int(seconds % 60)
-                    return f"{hrs:02}:{mins:02}:{secs:02}"
+                start_time, end_time = time_range
                 
                 start_time_str = format_time(start_time)
                 end_time_str = format_time(end_time)
@@ -745,57 +824,23 @@ class MainWindow(QMainWindow):
                 else:
                     video_file = os.path.join(online_dir, f"{file_base}.mp4")
                 
-                # JSON 저장
-                serializable_data = []
-                for frame in self.__frame_data:
-                    frame_copy = frame.copy()
-                    
-                    if 'patch_array' in frame_copy and isinstance(frame_copy['patch_array'], np.ndarray):
-                        frame_copy['patch_array'] = frame_copy['patch_array'].tolist()
-                    if 'patch_counts' in frame_copy and isinstance(frame_copy['patch_counts'], dict):
-                        for key in frame_copy['patch_counts']:
-                            frame_copy['patch_counts'][key] = int(frame_copy['patch_counts'][key])
-                    if 'time' in frame_copy:
-                        frame_copy['time'] = float(frame_copy['time'])
-                    if 'contamination_level' in frame_copy:
-                        frame_copy['contamination_level'] = float(frame_copy['contamination_level'])
-                    
-                    serializable_data.append(frame_copy)
-                
-                with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(serializable_data, f, ensure_ascii=False, indent=4)
-                
-                label_map = {0: "Clean", 1: "Rain blur", 2: "Rain blockage"}
-
-                with open(txt_file, 'w', encoding='utf-8') as f:
-                    for frame in self.__frame_data:
-                        time_str = format_time(frame['time'])
-                        contamination = frame.get('contamination_level', 0)
-                        counts = frame.get('patch_counts', {})
-                        counts_str = ', '.join([f"{label_map.get(int(k), 'unknown')}: {v}" for k, v in counts.items()])
-                        f.write("-------------------------------------------------------------------------------------------------------\n")
-                        f.write(f"Time: {time_str}, Contamination Level: {contamination:.2%}, Patch Counts: {counts_str}\n")
-                        
-                
-                with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    # 헤더 작성
-                    writer.writerow(['Time (s)', 'Contamination Level (%)', 'Frame Number'])
-                    # 데이터 작성
-                    for t, ratio, frame_num in zip(self.__graph_data['time'], self.__graph_data['abnormal_ratio'], self.__graph_data['frame_number']):
-                        writer.writerow([f"{t:.2f}", f"{ratio * 100:.2f}", frame_num])
-                
+                self.__plot.refresh()
                 pixmap = self.__plot_widget.grab()
                 pixmap.save(graph_file, 'PNG')
                 
                 # 실시간 모드에서 VideoWriter를 사용하여 저장된 비디오를 지정된 경로로 이동
                 if self.__real_time_mode and self.__videoWriter is not None:
+                    self.__stopVideoWriter()
                     self.__videoWriter.release()
                     # 비디오 파일을 지정된 저장 디렉토리로 이동
                     os.rename(self.__live_video_filename, video_file)
                     self.__videoWriter = None  # VideoWriter 객체 초기화
                 
-                QMessageBox.information(self, "저장 완료", f"결과가 성공적으로 저장되었습니다:\nJSON: {json_file}\nTXT: {txt_file}\nCSV: {csv_file}\nGraph: {graph_file}\nVideo: {video_file}")
+                # JSON/TXT/CSV는 기록된 결과에서 백그라운드로 변환 (UI를 막지 않음)
+                message = f"결과가 성공적으로 저장되었습니다:\nJSON: {json_file}\nTXT: {txt_file}\nCSV: {csv_file}\nGraph: {graph_file}\nVideo: {video_file}"
+                self.__recorder.export_async(
+                    lambda error: self.__export_signals.finished.emit(message, error),
+                    json_file=json_file, csv_file=csv_file, txt_file=txt_file)
             
             except Exception as e:
                 QMessageBox.warning(self, "저장 실패", f"결과 저장 중 오류가 발생했습니다:\n{str(e)}")
@@ -803,6 +848,17 @@ class MainWindow(QMainWindow):
 
                 
 
+    def __onExportFinished(self, message, error):
+        if error is None:
+            QMessageBox.information(self, "저장 완료", message)
+        else:
+            QMessageBox.warning(self, "저장 실패", f"결과 저장 중 오류가 발생했습니다:\n{str(error)}")
+
+    def __resetRecorder(self):
+        # 저장 중인 이전 기록은 저장이 끝난 뒤 지워짐
+        self.__recorder.close()
+        self.__recorder = ResultRecorder()
+
     def __onPlotClicked(self, event):
         if self.__video_finished and QApplication.keyboardModifiers() == Qt.ShiftModifier:
             pos = event.scenePos()
@@ -811,22 +867,21 @@ class MainWindow(QMainWindow):
                 clicked_time = mouse_point.x()
                 
                 # Find the closest time in the graph data
-                closest_time_index = min(range(len(self.__graph_data['time'])), 
-                                         key=lambda i: abs(self.__graph_data['time'][i] - clicked_time))
-                
-                frame_number = self.__graph_data['frame_number'][closest_time_index]
-                
+                closest_index = self.__plot.series.nearest(clicked_time)
+                if closest_index is None:
+                    return
+                closest_time, abnormal_ratio, frame_number = self.__plot.series.point(closest_index)
+
                 self.__videoCapture.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
                 ret, frame = self.__videoCapture.read()
                 if ret:
                     self.__displayFrame(frame)
-                    dst_filename, result_dict = self.__wrapper.get_result(frame)
-                    self.__displayResultImage(dst_filename)
+                    result_dict = self.__inferFrame(frame_number, frame)
+                    self.__displayResultImage(self.__wrapper.render(frame, result_dict))
                     self.__frameSlider.setValue(frame_number)
-                    self.__vertical_line.setValue(self.__graph_data['time'][closest_time_index])
-                    
+                    self.__plot.set_cursor(closest_time)
+
                     # Update result table
-                    abnormal_ratio = self.__graph_data['abnormal_ratio'][closest_time_index]
                     self.__updateResultTable(result_dict, abnormal_ratio)
 
     def __updateGraphData(self, result_dict):
@@ -845,66 +900,27 @@ class MainWindow(QMainWindow):
         
         abnormal_ratio = abnormal_patches / total_patches if total_patches > 0 else 0
 
-        self.__graph_data['time'].append(current_time)
-        self.__graph_data['abnormal_ratio'].append(abnormal_ratio)
-        self.__graph_data['frame_number'].append(current_frame)
-
-        # Limit the data points to the last 1000 for performance
-        if len(self.__graph_data['time']) > 1000:
-            self.__graph_data['time'] = self.__graph_data['time'][-1000:]
-            self.__graph_data['abnormal_ratio'] = self.__graph_data['abnormal_ratio'][-1000:]
-            self.__graph_data['frame_number'] = self.__graph_data['frame_number'][-1000:]
-
-        # Update the plot
-        if abnormal_ratio <= 0.7:
-            self.__plot_curve.setData(self.__graph_data['time'], self.__graph_data['abnormal_ratio'])
-        else:
-            self.__plot_curve_abnormal.setData(self.__graph_data['time'], self.__graph_data['abnormal_ratio'])
-
-        self.__vertical_line.setValue(current_time)
-        
-        
+        # 링 버퍼에만 기록하고 그래프는 plotTimer 주기로 다시 그림
+        self.__plot.append(current_time, abnormal_ratio, current_frame)
         return abnormal_ratio
 
     def __resetGraph(self):
-        self.__graph_data = {'time': [], 'abnormal_ratio': [], 'frame_number': []}
-        self.__plot_curve.setData([], [])
-        self.__plot_curve_abnormal.setData([], [])
-        self.__vertical_line.setValue(0)
+        self.__plot.clear()
         self.__video_finished = False
         self.__current_frame = 0
 
     
     def __displayFrame(self, frame):
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = frame_rgb.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        qt_pixmap = QPixmap.fromImage(qt_image).scaled(self.__imageLabel.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.__imageLabel.setPixmap(qt_pixmap)
+        self.__frameDisplay.show(frame)
 
     def __displayResultImage(self, img):
         if isinstance(img, str):  # img가 파일 경로일 때
-            pixmap = QPixmap(img)
-        elif isinstance(img, np.ndarray):  # img가 numpy 배열일 때
-            if img.ndim == 2:  # grayscale image
-                h, w = img.shape
-                qt_image = QImage(img.data, w, h, QImage.Format_Grayscale8)
-            else:  # color image
-                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                h, w, ch = img_rgb.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(img_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-
-            pixmap = QPixmap.fromImage(qt_image)
+            self.__resultDisplay.show_file(img)
+        elif isinstance(img, np.ndarray):  # img가 numpy 배열일 때 (BGR 또는 grayscale)
+            self.__resultDisplay.show(img)
         else:
             raise ValueError("Unsupported image format")
 
-        pixmap = pixmap.scaled(self.__resultImageLabel.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        if self.__showGrid:
-            pixmap=self.__addGrid(pixmap.copy())
-        self.__resultImageLabel.setPixmap(pixmap)
-
     
 
     def __initResultTable(self):
@@ -991,20 +1007,22 @@ class MainWindow(QMainWindow):
             self.__stopLiveVideoCapture()
 
     def __initLiveVideoCapture(self):
-        if self.__liveVideoCapture is None:
-            self.__liveVideoCapture = cv2.VideoCapture('/dev/video0')
-            if not self.__liveVideoCapture.isOpened():
-                QMessageBox.critical(self, "비디오 오류", "/dev/video0을 열 수 없습니다.")
+        if self.__liveCapture is None:
+            # 캡처 스레드가 프레임을 링 버퍼에 넣고 화면/추론/녹화가 각자 읽음
+            self.__liveCapture = LiveCapture(self.__live_source, capacity=8, fps=self.__live_fps, loop=True)
+            if not self.__liveCapture.isOpened():
+                QMessageBox.critical(self, "비디오 오류", f"{self.__live_source}을 열 수 없습니다.")
+                self.__liveCapture = None
                 self.__realTimeChkBox.setChecked(False)
                 self.__real_time_mode = False
                 return
-            self.__liveVideoCapture.set(cv2.CAP_PROP_FPS, self.__live_fps)
-            self.__video_fps = self.__liveVideoCapture.get(cv2.CAP_PROP_FPS)
+            self.__video_fps = self.__liveCapture.fps
             if self.__video_fps == 0 or self.__video_fps is None or self.__video_fps == -1:
                 self.__video_fps = self.__live_fps
-            actual_width = int(self.__liveVideoCapture.get(cv2.CAP_PROP_FRAME_WIDTH))
-            actual_height = int(self.__liveVideoCapture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            actual_height, actual_width = self.__liveCapture.frame_shape[:2]
             print(f"실시간 비디오 해상도: {actual_width}x{actual_height}, FPS: {self.__video_fps}")
+            self.__liveDisplay = self.__liveCapture.register('display', 'latest')
+            self.__liveInfer = self.__liveCapture.register('inference', 'latest')
             self.__liveTimer.start(1000 // self.__live_fps)
             self.__playBtn.setEnabled(True)
             self.__pauseBtn.setEnabled(True)
@@ -1024,20 +1042,31 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "비디오 저장 오류", "VideoWriter를 초기화할 수 없습니다.")
                 self.__videoWriter = None
 
-            # 추가된 부분 시작
+            # 녹화는 프레임을 순서대로 읽고, 밀리면 가장 오래된 프레임부터 버림
             if self.__videoWriter is not None:
-                self.__stop_saving.clear()
-                self.__video_writer_thread = threading.Thread(target=self.__video_writer_worker)
+                recorder = self.__liveCapture.register('recording', 'drop_oldest')
+                self.__record_ranges = RecordingRanges()
+                self.__video_recorder = recorder
+                self.__writer_stop_seq = None
+                self.__video_writer_thread = threading.Thread(target=self.__video_writer_worker, args=(recorder, ))
                 self.__video_writer_thread.start()
-            # 추가된 부분 끝
+            self.__resetTemporal()
+            self.__liveCapture.start()
 
 
 
 
     def __stopLiveVideoCapture(self):
-        if self.__liveVideoCapture is not None:
-            self.__liveVideoCapture.release()
-            self.__liveVideoCapture = None
+        if self.__liveCapture is not None:
+            # 링 버퍼를 닫으면 녹화 스레드는 남은 프레임을 기록한 뒤 종료
+            self.__liveCapture.stop()
+            print(f"실시간 캡처 통계: {self.__liveCapture.summary()}")
+            if self.__temporal is not None:
+                print(self.__temporal.summary())
+            self.__liveCapture = None
+            self.__liveDisplay = None
+            self.__liveInfer = None
+        self.__stopVideoWriter()
         self.__liveTimer.stop()
         self.__playing = False
         self.__process_live = False
@@ -1048,20 +1077,9 @@ class MainWindow(QMainWindow):
         self.__resetGraph()
         self.__initResultTable()
 
-        # 추가된 부분 시작
-        if self.__video_writer_thread is not None:
-            self.__stop_saving.set()
-            self.__video_writer_thread.join()
-            self.__video_writer_thread = None
-
         if self.__videoWriter is not None:
             self.__videoWriter.release()
             self.__videoWriter = None
-        
-            # VideoWriter가 활성화되어 있으면 종료
-            if self.__videoWriter is not None:
-                self.__videoWriter.release()
-                self.__videoWriter = None
 
     def keyPressEvent(self, event):
         if event.modifiers() == Qt.ControlModifier and event.key() == Qt.Key_S and self.__process_live == True:
@@ -1099,20 +1117,39 @@ class MainWindow(QMainWindow):
         if msgBox.clickedButton() == yes_button:
             self.__saveResults()
 
-    def __video_writer_worker(self):
-        while not self.__stop_saving.is_set() or not self.__frame_queue.empty():
-            try:
-                frame = self.__frame_queue.get(timeout=0.1)
-                if self.__videoWriter is not None:
-                    self.__videoWriter.write(frame)
-                self.__frame_queue.task_done()
-            except:
+    def __video_writer_worker(self, recorder):
+        # 종료 요청 시점까지 캡처된 프레임은 모두 읽고, 처리 중에 캡처된 프레임만 기록
+        while True:
+            stop_seq = self.__writer_stop_seq
+            if stop_seq is not None and recorder.next_seq >= stop_seq:
+                break
+            frame_ref = recorder.get(timeout=0.1)
+            if frame_ref is None:
+                if recorder.ring.closed:
+                    break
                 continue
-
-    def closeEvent(self, event):
-        self.__stop_saving.set()
+            with frame_ref:
+                stop_seq = self.__writer_stop_seq
+                if stop_seq is not None and frame_ref.seq >= stop_seq:
+                    break
+                if frame_ref.seq in self.__record_ranges and self.__videoWriter is not None:
+                    self.__videoWriter.write(frame_ref.array)
+
+    def __stopVideoWriter(self):
         if self.__video_writer_thread is not None:
+            # 캡처는 계속될 수 있으므로 현재까지 캡처된 프레임까지만 기록하고 종료
+            self.__writer_stop_seq = self.__video_recorder.ring.write_seq
             self.__video_writer_thread.join()
+            self.__video_writer_thread = None
+            self.__video_recorder = None
+
+    def closeEvent(self, event):
+        self.__stopPipeline()
+        self.__closeResultCache()
+        self.__recorder.close()
+        if self.__liveCapture is not None:
+            self.__liveCapture.stop()
+        self.__stopVideoWriter()
         event.accept()
 
 
@@ -1,9 +1,10 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-from .inference import inference_model, init_model, show_result_pyplot
+from .inference import (inference_context, inference_model, init_model,
+                        show_result_pyplot)
 from .mmseg_inferencer import MMSegInferencer
 from .remote_sense_inferencer import RSImage, RSInferencer
 
 __all__ = [
-    'init_model', 'inference_model', 'show_result_pyplot', 'MMSegInferencer',
-    'RSInferencer', 'RSImage'
+    'init_model', 'inference_model', 'inference_context', 'show_result_pyplot',
+    'MMSegInferencer', 'RSInferencer', 'RSImage'
 ]
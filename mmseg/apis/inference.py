@@ -1,7 +1,8 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import warnings
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
 
 import mmcv
 import numpy as np
@@ -18,11 +19,15 @@ from mmseg.utils import SampleList, dataset_aliases, get_classes, get_palette
 from mmseg.visualization import SegLocalVisualizer
 from .utils import ImageType, _preprare_data
 
+PRECISIONS = {'fp32': None, 'bf16': torch.bfloat16, 'fp16': torch.float16}
+
 
 def init_model(config: Union[str, Path, Config],
                checkpoint: Optional[str] = None,
                device: str = 'cuda:0',
-               cfg_options: Optional[dict] = None):
+               cfg_options: Optional[dict] = None,
+               precision: str = 'fp32',
+               channels_last: bool = False):
     """Initialize a segmentor from config file.
 
     Args:
@@ -34,9 +39,22 @@ def init_model(config: Union[str, Path, Config],
             Use 'cpu' for loading model on CPU.
         cfg_options (dict, optional): Options to override some settings in
             the used config.
+        precision (str): Inference precision used by
+            :func:`inference_context`. 'fp32', 'bf16' autocast (e.g. on
+            CPU) or 'fp16' autocast (CUDA only). The weights are kept in
+            fp32. Default 'fp32'.
+        channels_last (bool): Whether to convert the weights to the
+            channels_last memory format, which convolutions then also use
+            for their inputs and outputs. Default False.
     Returns:
         nn.Module: The constructed segmentor.
     """
+    if precision not in PRECISIONS:
+        raise ValueError(f'precision must be one of {list(PRECISIONS)}, '
+                         f'but got {precision}')
+    if precision == 'fp16' and not str(device).startswith('cuda'):
+        raise ValueError('fp16 inference is only supported on CUDA, '
+                         'use bf16 on CPU')
     if isinstance(config, (str, Path)):
         config = Config.fromfile(config)
     elif not isinstance(config, Config):
@@ -89,11 +107,39 @@ def init_model(config: Union[str, Path, Config],
                 'palette': get_palette(dataset_name)
             }
     model.cfg = config  # save the config in the model for convenience
+    model.precision = precision
     model.to(device)
+    if channels_last:
+        model.to(memory_format=torch.channels_last)
     model.eval()
     return model
 
 
+@contextmanager
+def inference_context(model: BaseSegmentor,
+                      precision: Optional[str] = None) -> Iterator[None]:
+    """Context to run the forward of a segmentor for inference.
+
+    Gradients are disabled with ``torch.inference_mode`` and the forward is
+    autocast to the precision of the model.
+
+    Args:
+        model (nn.Module): The loaded segmentor.
+        precision (str, optional): Override the precision the model was
+            initialized with, e.g. 'fp32' to get reference results.
+            Defaults to None.
+    """
+    precision = precision or getattr(model, 'precision', 'fp32')
+    dtype = PRECISIONS[precision]
+    with torch.inference_mode():
+        if dtype is None:
+            yield
+        else:
+            device_type = next(model.parameters()).device.type
+            with torch.autocast(device_type, dtype=dtype):
+                yield
+
+
 def inference_model(model: BaseSegmentor,
                     img: ImageType) -> Union[SegDataSample, SampleList]:
     """Inference image(s) with the segmentor.
@@ -112,7 +158,7 @@ def inference_model(model: BaseSegmentor,
     data, is_batch = _preprare_data(img, model)
 
     # forward the model
-    with torch.no_grad():
+    with inference_context(model):
         results = model.test_step(data)
 
     return results if is_batch else results[0]
@@ -34,7 +34,8 @@ from .transforms import (CLAHE, AdjustGamma, Albu, BioMedical3DPad,
                          BioMedicalRandomGamma, ConcatCDInput, GenerateEdge,
                          LoadAnnotations, LoadBiomedicalAnnotation,
                          LoadBiomedicalData, LoadBiomedicalImageFromFile,
-                         LoadImageFromNDArray, LoadMultipleRSImageFromFile,
+                         LoadImageFromCache, LoadImageFromNDArray,
+                         LoadMultipleRSImageFromFile, LoadPatchNetInput,
                          LoadSingleRSImageFromFile, PackSegInputs,
                          PhotoMetricDistortion, RandomCrop, RandomCutOut,
                          RandomMosaic, RandomRotate, RandomRotFlip, Rerange,
@@ -62,5 +63,6 @@ __all__ = [
     'MapillaryDataset_v2', 'Albu', 'LEVIRCDDataset',
     'LoadMultipleRSImageFromFile', 'LoadSingleRSImageFromFile',
     'ConcatCDInput', 'BaseCDDataset', 'DSDLSegDataset', 'BDD100KDataset',
-    'NYUDataset', 'HSIDrive20Dataset', 'HyundaeDataset'
+    'NYUDataset', 'HSIDrive20Dataset', 'HyundaeDataset', 'LoadPatchNetInput',
+    'LoadImageFromCache'
 ]
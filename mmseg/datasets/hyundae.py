@@ -2,13 +2,17 @@
 from mmseg.registry import DATASETS
 from .basesegdataset import BaseSegDataset
 import copy
+import logging
 import os.path as osp
 from typing import Callable, Dict, List, Optional, Sequence, Union
 import mmengine
 import mmengine.fileio as fileio
 import numpy as np
 from mmengine.dataset import BaseDataset, Compose
+from mmengine.logging import print_log
 from mmseg.registry import DATASETS
+from .patch_label_cache import PatchLabelCache
+
 
 @DATASETS.register_module()
 class HyundaeDataset(BaseSegDataset):
@@ -16,6 +20,16 @@ class HyundaeDataset(BaseSegDataset):
 
     The ``img_suffix`` is fixed to '_leftImg8bit.png' and ``seg_map_suffix`` is
     fixed to '_gtFine_labelTrainIds.png' for Hyundae dataset.
+
+    Args:
+        ann_cache (str, optional): Directory of a patch label cache packed by
+            ``tools/dataset_converters/hyundae_patch_cache.py``. Labels found
+            in the cache are read from the memory mapped ``labels.npy``
+            instead of parsing the ``.json`` annotation on every load; missing
+            or stale entries fall back to the ``.json`` file. Defaults to None.
+        ann_cache_check (str): How to detect stale cache entries. 'stat'
+            compares the size and modification time of each annotation, 'crc'
+            also its crc32 and 'none' trusts the cache. Defaults to 'stat'.
     """
     METAINFO = dict(
         classes=('clean','raindrop_blur','raindrop_blockage','dust_blur','dust_blockage','snow_blur','snow_blockage')
@@ -24,7 +38,11 @@ class HyundaeDataset(BaseSegDataset):
     def __init__(self,
                  img_suffix='.png',
                  seg_map_suffix='.json',
+                 ann_cache: Optional[str] = None,
+                 ann_cache_check: str = 'stat',
                  **kwargs) -> None:
+        self.ann_cache = ann_cache
+        self.ann_cache_check = ann_cache_check
         super().__init__(
             img_suffix=img_suffix, seg_map_suffix=seg_map_suffix, **kwargs)
         
@@ -70,4 +88,32 @@ class HyundaeDataset(BaseSegDataset):
                 data_info['seg_fields'] = []
                 data_list.append(data_info)
             data_list = sorted(data_list, key=lambda x: x['img_path'])
+        if self.ann_cache is not None:
+            self._attach_ann_cache(data_list)
         return data_list
+
+    def _attach_ann_cache(self, data_list: List[dict]) -> None:
+        """Point the data infos to their rows in the patch label cache."""
+        cache = PatchLabelCache(self.ann_cache)
+        if self.ann_cache_check != 'none' and not cache.check_labels():
+            print_log(
+                f'The labels in {self.ann_cache} do not match their checksum, '
+                'loading the .json annotations instead.',
+                logger='current',
+                level=logging.WARNING)
+            return
+        num_stale = 0
+        for data_info in data_list:
+            row = cache.lookup(data_info['img_path'],
+                               data_info.get('seg_map_path'),
+                               self.ann_cache_check)
+            if row is None:
+                num_stale += 1
+            else:
+                data_info['seg_map_cache'] = (cache.labels_file, row)
+        if num_stale:
+            print_log(
+                f'{num_stale} of {len(data_list)} annotations are missing or '
+                f'stale in {self.ann_cache}, they are loaded from .json.',
+                logger='current',
+                level=logging.WARNING)
@@ -0,0 +1,179 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import json
+import os
+import os.path as osp
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import mmcv
+import mmengine.fileio as fileio
+import numpy as np
+from mmengine.utils import ProgressBar, mkdir_or_exist
+
+INDEX_FILE = 'index.json'
+CACHE_VERSION = 1
+
+
+def load_resized_image(
+        img_path: str,
+        scale: Tuple[int, int],
+        interpolation: str = 'area',
+        backend_args: Optional[dict] = None
+) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Decode a BGR image and resize it to ``scale`` (w, h).
+
+    Returns:
+        tuple: The resized image and the original (h, w).
+    """
+    img_bytes = fileio.get(img_path, backend_args=backend_args)
+    img = mmcv.imfrombytes(img_bytes, flag='color', backend='cv2')
+    assert img is not None, f'failed to load image: {img_path}'
+    ori_shape = img.shape[:2]
+    if img.shape[1::-1] != tuple(scale):
+        img = mmcv.imresize(img, tuple(scale), interpolation=interpolation)
+    return img, ori_shape
+
+
+@lru_cache(maxsize=None)
+def open_image_shard(shard_file: str) -> np.ndarray:
+    """Memory map an image shard once per process."""
+    return np.load(shard_file, mmap_mode='r')
+
+
+def _load_one(args):
+    img_path, scale, interpolation, backend_args = args
+    img, ori_shape = load_resized_image(img_path, scale, interpolation,
+                                        backend_args)
+    stat = os.stat(img_path) if osp.isfile(img_path) else None
+    stamp = [stat.st_size, stat.st_mtime_ns] if stat else [0, 0]
+    return img, list(ori_shape) + stamp
+
+
+def build_image_cache(data_list: Sequence[dict],
+                      cache_dir: str,
+                      scale: Tuple[int, int] = (512, 512),
+                      interpolation: str = 'area',
+                      shard_size: int = 2048,
+                      nproc: int = 1,
+                      backend_args: Optional[dict] = None) -> 'ImageCache':
+    """Decode and resize the images of a data list into memory mapped shards.
+
+    Images are stored as ``uint8[n, h, w, 3]`` in ``images_xxxxx.npy``
+    shards of ``shard_size`` images, and ``index.json`` maps every
+    ``img_path`` to its shard and row together with the original image
+    shape, file size and modification time. Images are decoded in ``nproc``
+    processes and written as they arrive, so memory use does not grow with
+    the dataset.
+
+    Args:
+        data_list (Sequence[dict]): Data infos with ``img_path``.
+        cache_dir (str): Output directory.
+        scale (tuple[int]): Training resolution ``(w, h)``.
+            Defaults to (512, 512).
+        interpolation (str): Interpolation method of ``mmcv.imresize``.
+            Defaults to 'area', since the cache is built once.
+        shard_size (int): Number of images per shard. Defaults to 2048.
+        nproc (int): Number of decoding processes. Defaults to 1.
+        backend_args (dict, optional): Arguments to instantiate a file
+            backend. Defaults to None.
+
+    Returns:
+        ImageCache: The built cache.
+    """
+    mkdir_or_exist(cache_dir)
+    w, h = scale
+    num_images = len(data_list)
+    tasks = [(info['img_path'], tuple(scale), interpolation, backend_args)
+             for info in data_list]
+    pool = Pool(nproc) if nproc > 1 else None
+    if pool is not None:
+        results = pool.imap(_load_one, tasks, chunksize=16)
+    else:
+        results = map(_load_one, tasks)
+
+    shards = []
+    items = {}
+    shard = None
+    progress_bar = ProgressBar(num_images)
+    try:
+        for i, (img, stamp) in enumerate(results):
+            shard_idx, row = divmod(i, shard_size)
+            if row == 0:
+                shard_file = f'images_{shard_idx:05d}.npy'
+                shards.append(shard_file)
+                shard = np.lib.format.open_memmap(
+                    osp.join(cache_dir, shard_file),
+                    mode='w+',
+                    dtype=np.uint8,
+                    shape=(min(shard_size, num_images - i), h, w, 3))
+            shard[row] = img
+            items[tasks[i][0]] = [shard_idx, row] + stamp
+            progress_bar.update()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    del shard
+    # drop mappings of a previous cache in the same directory
+    open_image_shard.cache_clear()
+    index = dict(
+        version=CACHE_VERSION,
+        scale=list(scale),
+        interpolation=interpolation,
+        num_images=num_images,
+        shards=shards,
+        items=items)
+    with open(osp.join(cache_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f)
+    return ImageCache(cache_dir)
+
+
+class ImageCache:
+    """Read-only view of a cache written by :func:`build_image_cache`.
+
+    Args:
+        cache_dir (str): Directory of the shards and ``index.json``.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        with open(osp.join(cache_dir, INDEX_FILE), 'r') as f:
+            self.index = json.load(f)
+        assert self.index.get('version') == CACHE_VERSION, \
+            f'Unsupported image cache version in {cache_dir}'
+        self.scale = tuple(self.index['scale'])
+        self.interpolation = self.index['interpolation']
+        self.shard_files: List[str] = [
+            osp.join(cache_dir, shard) for shard in self.index['shards']
+        ]
+        self.items: Dict[str, list] = self.index['items']
+
+    def __len__(self) -> int:
+        return self.index['num_images']
+
+    def lookup(self, img_path: str, check: str = 'stat') -> Optional[tuple]:
+        """``(image, ori_shape)`` of an image, or None if missing or stale.
+
+        The image is a read-only view into the mapped shard.
+
+        Args:
+            img_path (str): Image path used as the key.
+            check (str): 'stat' compares the size and modification time of
+                the image file and 'none' skips the check. Defaults to
+                'stat'.
+        """
+        assert check in ('none', 'stat'), f'Unknown check: {check}'
+        item = self.items.get(img_path)
+        if item is None:
+            return None
+        shard_idx, row, ori_h, ori_w, size, mtime_ns = item
+        if check == 'stat':
+            try:
+                stat = os.stat(img_path)
+            except OSError:
+                return None
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                return None
+        return open_image_shard(self.shard_files[shard_idx])[row], (ori_h,
+                                                                    ori_w)
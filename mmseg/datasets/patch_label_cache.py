@@ -0,0 +1,176 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import json
+import os
+import os.path as osp
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from mmengine.utils import (mkdir_or_exist, track_parallel_progress,
+                            track_progress)
+
+LABELS_FILE = 'labels.npy'
+INDEX_FILE = 'index.json'
+CACHE_VERSION = 1
+
+
+def load_patch_label(seg_map_path: str) -> np.ndarray:
+    """Load a PatchNet ``.json`` annotation and fuse it into class labels.
+
+    The ``patch`` field holds an (H, W, 2) grid of the contamination type
+    (0 for clean) and the severity, which are fused into a single label map.
+
+    Args:
+        seg_map_path (str): Path of the ``.json`` annotation.
+
+    Returns:
+        np.ndarray: The fused (H, W) label map.
+    """
+    with open(seg_map_path, 'r') as file:
+        json_data = json.load(file)
+    gt_semantic_seg = np.transpose(json_data['patch'], (2, 0, 1))
+    gt_semantic_seg[0][gt_semantic_seg[0] != 0] -= 1
+    return gt_semantic_seg[0] + gt_semantic_seg[1]
+
+
+@lru_cache(maxsize=None)
+def open_patch_labels(labels_file: str) -> np.ndarray:
+    """Memory map a packed ``labels.npy`` once per process."""
+    return np.load(labels_file, mmap_mode='r')
+
+
+def file_stamp(path: str, with_crc: bool = True) -> List[int]:
+    """``[size, mtime_ns, crc32]`` of a file, crc32 is 0 if not computed."""
+    stat = os.stat(path)
+    crc = 0
+    if with_crc:
+        with open(path, 'rb') as f:
+            crc = zlib.crc32(f.read())
+    return [stat.st_size, stat.st_mtime_ns, crc]
+
+
+def _pack_one(seg_map_path: str) -> Tuple[np.ndarray, List[int]]:
+    return load_patch_label(seg_map_path), file_stamp(seg_map_path)
+
+
+def build_patch_label_cache(data_list: Sequence[dict],
+                            cache_dir: str,
+                            grid_size: Tuple[int, int] = (16, 16),
+                            nproc: int = 1) -> 'PatchLabelCache':
+    """Pack the ``.json`` patch annotations of a data list into one file.
+
+    The labels are stored as ``uint8[N, h, w]`` in ``labels.npy`` and
+    ``index.json`` maps every ``img_path`` to its row together with the size,
+    modification time and crc32 of its annotation file.
+
+    Args:
+        data_list (Sequence[dict]): Data infos with ``img_path`` and
+            ``seg_map_path``, e.g. ``HyundaeDataset.load_data_list()``.
+        cache_dir (str): Output directory.
+        grid_size (tuple[int]): Size ``(h, w)`` of the label grid.
+            Defaults to (16, 16).
+        nproc (int): Number of processes to parse annotations with.
+            Defaults to 1.
+
+    Returns:
+        PatchLabelCache: The packed cache.
+    """
+    mkdir_or_exist(cache_dir)
+    seg_map_paths = [info['seg_map_path'] for info in data_list]
+    if nproc > 1:
+        packed = track_parallel_progress(_pack_one, seg_map_paths, nproc)
+    else:
+        packed = track_progress(_pack_one, seg_map_paths)
+
+    labels_file = osp.join(cache_dir, LABELS_FILE)
+    labels = np.lib.format.open_memmap(
+        labels_file,
+        mode='w+',
+        dtype=np.uint8,
+        shape=(len(data_list), ) + tuple(grid_size))
+    items = {}
+    for i, (info, (label, stamp)) in enumerate(zip(data_list, packed)):
+        assert label.shape == tuple(grid_size), \
+            f'{info["seg_map_path"]} has a {label.shape} grid, ' \
+            f'expected {tuple(grid_size)}'
+        labels[i] = label
+        items[info['img_path']] = [i, info['seg_map_path']] + stamp
+    labels.flush()
+    index = dict(
+        version=CACHE_VERSION,
+        num_labels=len(data_list),
+        grid_size=list(grid_size),
+        labels_crc32=zlib.crc32(labels.tobytes()),
+        items=items)
+    del labels
+    # drop a mapping of a previous cache in the same directory
+    open_patch_labels.cache_clear()
+    with open(osp.join(cache_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f)
+    return PatchLabelCache(cache_dir)
+
+
+class PatchLabelCache:
+    """Read-only view of a cache written by :func:`build_patch_label_cache`.
+
+    Args:
+        cache_dir (str): Directory of ``labels.npy`` and ``index.json``.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.labels_file = osp.join(cache_dir, LABELS_FILE)
+        with open(osp.join(cache_dir, INDEX_FILE), 'r') as f:
+            self.index = json.load(f)
+        assert self.index.get('version') == CACHE_VERSION, \
+            f'Unsupported patch label cache version in {cache_dir}'
+        self.items: Dict[str, list] = self.index['items']
+
+    @property
+    def labels(self) -> np.ndarray:
+        return open_patch_labels(self.labels_file)
+
+    def __len__(self) -> int:
+        return self.index['num_labels']
+
+    def __getitem__(self, img_path: str) -> np.ndarray:
+        """Read-only label grid of an image, a view into the mapped file."""
+        return self.labels[self.items[img_path][0]]
+
+    def check_labels(self) -> bool:
+        """Whether ``labels.npy`` still matches the crc32 in the index."""
+        labels = self.labels
+        return labels.shape[0] == len(self) and \
+            zlib.crc32(labels.tobytes()) == self.index['labels_crc32']
+
+    def lookup(self,
+               img_path: str,
+               seg_map_path: str,
+               check: str = 'stat') -> Optional[int]:
+        """Row of an image, or None if missing or stale.
+
+        Args:
+            img_path (str): Image path used as the key.
+            seg_map_path (str): The annotation the row was packed from.
+            check (str): 'stat' compares the size and modification time of
+                the annotation, 'crc' also its crc32 and 'none' skips the
+                check. Defaults to 'stat'.
+        """
+        assert check in ('none', 'stat', 'crc'), f'Unknown check: {check}'
+        item = self.items.get(img_path)
+        if item is None:
+            return None
+        row, packed_path, size, mtime_ns, crc = item
+        if packed_path != seg_map_path:
+            return None
+        if check != 'none':
+            try:
+                stamp = file_stamp(seg_map_path, with_crc=check == 'crc')
+            except OSError:
+                return None
+            if stamp[0] != size or (check == 'stat' and stamp[1] != mtime_ns):
+                return None
+            if check == 'crc' and stamp[2] != crc:
+                return None
+        return row
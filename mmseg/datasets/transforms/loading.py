@@ -1,4 +1,5 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import io
 import warnings
 from pathlib import Path
 from typing import Dict, Optional, Union
@@ -9,16 +10,18 @@ import numpy as np
 from mmcv.transforms import BaseTransform
 from mmcv.transforms import LoadAnnotations as MMCV_LoadAnnotations
 from mmcv.transforms import LoadImageFromFile
+from PIL import Image
 
 from mmseg.registry import TRANSFORMS
 from mmseg.utils import datafrombytes
+from ..image_cache import ImageCache, load_resized_image
+from ..patch_label_cache import load_patch_label, open_patch_labels
 
 try:
     from osgeo import gdal
 except ImportError:
     gdal = None
 import shutil
-import json
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 
@@ -129,20 +132,19 @@ class LoadAnnotations(MMCV_LoadAnnotations):
             dict: The dict contains loaded semantic segmentation annotations.
         """
 
-        if results['seg_map_path'][-4:] != 'json':
+        if results.get('seg_map_cache') is not None:
+            # read-only view into the packed labels of ``HyundaeDataset``
+            labels_file, row = results['seg_map_cache']
+            gt_semantic_seg = open_patch_labels(labels_file)[row]
+        elif results['seg_map_path'][-4:] != 'json':
             img_bytes = fileio.get(
                 results['seg_map_path'], backend_args=self.backend_args)
             gt_semantic_seg = mmcv.imfrombytes(
                 img_bytes, flag='unchanged',
                 backend=self.imdecode_backend).squeeze().astype(np.uint8)
         else:
-            with open(results['seg_map_path'], "r") as file:
-                json_data = json.load(file)
-            gt_semantic_seg = np.transpose(json_data['patch'],(2,0,1))
+            gt_semantic_seg = load_patch_label(results['seg_map_path'])
             # self.viz_seg(gt_semantic_seg)
-            gt_semantic_seg[0][gt_semantic_seg[0] != 0] -= 1
-            gt_semantic_seg = gt_semantic_seg[0] + gt_semantic_seg[1]
-            
 
         # reduce zero_label
         if self.reduce_zero_label is None:
@@ -151,6 +153,10 @@ class LoadAnnotations(MMCV_LoadAnnotations):
             'Initialize dataset with `reduce_zero_label` as ' \
             f'{results["reduce_zero_label"]} but when load annotation ' \
             f'the `reduce_zero_label` is {self.reduce_zero_label}'
+        # labels from the patch label cache are read-only
+        modified = self.reduce_zero_label or results.get('label_map')
+        if modified and not gt_semantic_seg.flags.writeable:
+            gt_semantic_seg = gt_semantic_seg.copy()
         if self.reduce_zero_label:
             # avoid using underflow conversion
             gt_semantic_seg[gt_semantic_seg == 0] = 255
@@ -812,3 +818,207 @@ class LoadImageFromNpyFile(LoadImageFromFile):
         results['img_shape'] = img.shape[:2]
         results['ori_shape'] = img.shape[:2]
         return results
+
+
+@TRANSFORMS.register_module()
+class LoadPatchNetInput(BaseTransform):
+    """Load an image resized straight to the PatchNet input size.
+
+    PatchNet predicts a coarse patch grid, so the full-resolution ``Resize``
+    of the default test pipeline only adds decoding and resizing cost. This
+    transform replaces ``LoadImageFromFile`` + ``Resize`` with a single
+    resize to ``scale``. JPEG files are decoded at a reduced resolution (DCT
+    scaling of 1/2, 1/4 or 1/8) that is still at least ``scale``, which
+    skips most of the decoding work for large frames. Images already given in
+    ``results['img']`` (e.g. video frames) are resized directly.
+
+    Required Keys:
+
+    - img_path or img
+
+    Modified Keys:
+
+    - img
+    - img_shape
+    - ori_shape
+
+    Added Keys:
+
+    - scale
+    - scale_factor
+    - keep_ratio
+
+    Args:
+        scale (tuple[int]): Network input size ``(w, h)``.
+            Defaults to (512, 512).
+        interpolation (str): Interpolation method of ``mmcv.imresize``.
+            Defaults to 'bilinear'.
+        reduced_decode (bool): Whether to decode JPEG files at a reduced
+            resolution. Defaults to True.
+        backend_args (dict, optional): Arguments to instantiate a file
+            backend. Defaults to None.
+    """
+
+    def __init__(self,
+                 scale=(512, 512),
+                 interpolation: str = 'bilinear',
+                 reduced_decode: bool = True,
+                 backend_args: Optional[dict] = None) -> None:
+        assert len(scale) == 2, f'scale should be (w, h), but got {scale}'
+        self.scale = tuple(scale)
+        self.interpolation = interpolation
+        self.reduced_decode = reduced_decode
+        self.backend_args = backend_args.copy() if backend_args else None
+
+    def _decode(self, img_bytes: bytes, filename: str):
+        """Decode an image and return it with its original (h, w)."""
+        if self.reduced_decode and \
+                Path(filename).suffix.lower() in ('.jpg', '.jpeg'):
+            with Image.open(io.BytesIO(img_bytes)) as pil_img:
+                ori_w, ori_h = pil_img.size
+                # picks the largest DCT scaling that keeps at least ``scale``
+                pil_img.draft('RGB', self.scale)
+                img = mmcv.rgb2bgr(np.asarray(pil_img.convert('RGB')))
+            return img, (ori_h, ori_w)
+        img = mmcv.imfrombytes(img_bytes, flag='color', backend='cv2')
+        return img, img.shape[:2]
+
+    def transform(self, results: dict) -> dict:
+        """Functions to load and resize the image.
+
+        Args:
+            results (dict): Result dict with ``img_path`` or ``img``.
+
+        Returns:
+            dict: The dict contains the resized image and meta information.
+        """
+        if results.get('img', None) is not None:
+            img = results['img']
+            ori_shape = img.shape[:2]
+            results.setdefault('img_path', None)
+        else:
+            filename = results['img_path']
+            img_bytes = fileio.get(filename, backend_args=self.backend_args)
+            img, ori_shape = self._decode(img_bytes, filename)
+            assert img is not None, f'failed to load image: {filename}'
+
+        if img.shape[1::-1] != self.scale:
+            img = mmcv.imresize(
+                img, self.scale, interpolation=self.interpolation)
+        results['img'] = img
+        results['img_shape'] = img.shape[:2]
+        results['ori_shape'] = ori_shape
+        results['scale'] = self.scale
+        results['scale_factor'] = (self.scale[0] / ori_shape[1],
+                                   self.scale[1] / ori_shape[0])
+        results['keep_ratio'] = False
+        return results
+
+    def __repr__(self):
+        repr_str = self.__class__.__name__
+        repr_str += f'(scale={self.scale}, '
+        repr_str += f"interpolation='{self.interpolation}', "
+        repr_str += f'reduced_decode={self.reduced_decode}, '
+        repr_str += f'backend_args={self.backend_args})'
+        return repr_str
+
+
+@TRANSFORMS.register_module()
+class LoadImageFromCache(BaseTransform):
+    """Load a pre-decoded, pre-resized image from an image cache.
+
+    The cache is built once with ``tools/dataset_converters/
+    build_image_cache.py``, which stores every image of a dataset resized to
+    the training resolution in memory mapped ``uint8`` shards. Loading is
+    then a copy out of the page cache instead of a full-resolution decode.
+    Images missing from the cache, or changed since it was built, are decoded
+    and resized from ``img_path`` the same way as the builder did.
+
+    Required Keys:
+
+    - img_path
+
+    Modified Keys:
+
+    - img
+    - img_shape
+    - ori_shape
+
+    Added Keys:
+
+    - scale
+    - scale_factor
+    - keep_ratio
+
+    Args:
+        cache_dir (str): Directory of the image cache.
+        to_float32 (bool): Whether to convert the loaded image to a float32
+            numpy array. Defaults to False.
+        check (str): 'stat' falls back to the image file if its size or
+            modification time changed since the cache was built, 'none'
+            trusts the cache. Each image is checked once per worker.
+            Defaults to 'stat'.
+        backend_args (dict, optional): Arguments to instantiate a file
+            backend for the fallback. Defaults to None.
+    """
+
+    def __init__(self,
+                 cache_dir: str,
+                 to_float32: bool = False,
+                 check: str = 'stat',
+                 backend_args: Optional[dict] = None) -> None:
+        self.cache_dir = cache_dir
+        self.to_float32 = to_float32
+        self.check = check
+        self.backend_args = backend_args.copy() if backend_args else None
+        self._cache = None
+        self._checked = set()
+
+    @property
+    def cache(self) -> ImageCache:
+        # opened lazily so that the index is loaded in each worker
+        if self._cache is None:
+            self._cache = ImageCache(self.cache_dir)
+        return self._cache
+
+    def transform(self, results: dict) -> dict:
+        """Functions to load the cached image.
+
+        Args:
+            results (dict): Result dict with ``img_path``.
+
+        Returns:
+            dict: The dict contains the image and meta information.
+        """
+        filename = results['img_path']
+        cache = self.cache
+        check = 'none' if filename in self._checked else self.check
+        cached = cache.lookup(filename, check)
+        if cached is not None:
+            self._checked.add(filename)
+            # copy out of the read-only mapping, later transforms may
+            # modify the image in place
+            img, ori_shape = np.array(cached[0]), cached[1]
+        else:
+            img, ori_shape = load_resized_image(filename, cache.scale,
+                                                cache.interpolation,
+                                                self.backend_args)
+        if self.to_float32:
+            img = img.astype(np.float32)
+
+        results['img'] = img
+        results['img_shape'] = img.shape[:2]
+        results['ori_shape'] = ori_shape
+        results['scale'] = cache.scale
+        results['scale_factor'] = (cache.scale[0] / ori_shape[1],
+                                   cache.scale[1] / ori_shape[0])
+        results['keep_ratio'] = False
+        return results
+
+    def __repr__(self):
+        repr_str = self.__class__.__name__
+        repr_str += f"(cache_dir='{self.cache_dir}', "
+        repr_str += f'to_float32={self.to_float32}, '
+        repr_str += f"check='{self.check}', "
+        repr_str += f'backend_args={self.backend_args})'
+        return repr_str
@@ -1,4 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-from .metrics import CityscapesMetric, DepthMetric, IoUMetric
+from .metrics import (CityscapesMetric, DepthMetric, IoUMetric,
+                      PatchContaminationMetric)
 
-__all__ = ['IoUMetric', 'CityscapesMetric', 'DepthMetric']
+__all__ = [
+    'IoUMetric', 'CityscapesMetric', 'DepthMetric', 'PatchContaminationMetric'
+]
@@ -2,5 +2,8 @@
 from .citys_metric import CityscapesMetric
 from .depth_metric import DepthMetric
 from .iou_metric import IoUMetric
+from .patch_metric import PatchContaminationMetric
 
-__all__ = ['IoUMetric', 'CityscapesMetric', 'DepthMetric']
+__all__ = [
+    'IoUMetric', 'CityscapesMetric', 'DepthMetric', 'PatchContaminationMetric'
+]
@@ -0,0 +1,241 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+from mmengine.dist import all_reduce, get_comm_device
+from mmengine.evaluator import BaseMetric
+from mmengine.logging import MMLogger, print_log
+from prettytable import PrettyTable
+
+from mmseg.registry import METRICS
+
+
+@METRICS.register_module()
+class PatchContaminationMetric(BaseMetric):
+    """Confusion matrix based metric for PatchNet contamination grids.
+
+    The classes are expected in the PatchNet layout: ``clean`` followed by a
+    ``<type>_<severity>`` class for every contamination type and severity,
+    e.g. ``clean, raindrop_blur, raindrop_blockage, dust_blur, ...``.
+
+    All patches of a batch are accumulated into a single
+    ``num_classes x num_classes`` confusion matrix on the prediction device
+    with one ``bincount``, together with the per-frame contamination ratio
+    error. Both are summed across ranks once in :meth:`evaluate`, so no
+    per-sample results are gathered. Samples duplicated by a distributed
+    sampler to pad the last batch are counted as well.
+
+    Reported metrics (in %):
+
+    - aAcc, mIoU, mAcc, mFscore, mPrecision, mRecall: over all classes.
+    - type_aAcc, type_mIoU: with the severities of each type merged.
+    - severity_aAcc, severity_mIoU: with the types of each severity merged.
+    - ratio_MAE, ratio_RMSE: error of the per-frame ratio of contaminated
+      patches, the contamination level plotted by the GUI.
+
+    Args:
+        ignore_index (int): Index that will be ignored in evaluation.
+            Default: 255.
+        num_severities (int): Number of severities per contamination type.
+            Defaults to 2.
+        beta (int): Determines the weight of recall in the F-score.
+            Default: 1.
+        collect_device (str): Device name used for collecting results from
+            different ranks during distributed training. Must be 'cpu' or
+            'gpu'. Defaults to 'cpu'.
+        prefix (str, optional): The prefix that will be added in the metric
+            names to disambiguate homonymous metrics of different evaluators.
+            If prefix is not provided in the argument, self.default_prefix
+            will be used instead. Defaults to None.
+    """
+
+    def __init__(self,
+                 ignore_index: int = 255,
+                 num_severities: int = 2,
+                 beta: int = 1,
+                 collect_device: str = 'cpu',
+                 prefix: Optional[str] = None,
+                 **kwargs) -> None:
+        super().__init__(collect_device=collect_device, prefix=prefix)
+        self.ignore_index = ignore_index
+        self.num_severities = num_severities
+        self.beta = beta
+        self._confusion: Optional[torch.Tensor] = None
+        # sum of absolute errors, sum of squared errors and number of frames
+        self._ratio_stats: Optional[torch.Tensor] = None
+
+    def process(self, data_batch: dict, data_samples: Sequence[dict]) -> None:
+        """Accumulate the patches of one batch into the confusion matrix.
+
+        Args:
+            data_batch (dict): A batch of data from the dataloader.
+            data_samples (Sequence[dict]): A batch of outputs from the model.
+        """
+        num_classes = len(self.dataset_meta['classes'])
+        preds, labels, frame_ids = [], [], []
+        for i, data_sample in enumerate(data_samples):
+            pred = data_sample['pred_sem_seg']['data'].flatten()
+            preds.append(pred)
+            labels.append(data_sample['gt_sem_seg']['data'].flatten().to(pred))
+            frame_ids.append(torch.full_like(pred, i))
+        pred, label = torch.cat(preds).long(), torch.cat(labels).long()
+        frame_ids = torch.cat(frame_ids).long()
+
+        valid = label != self.ignore_index
+        pred, label, frame_ids = pred[valid], label[valid], frame_ids[valid]
+        confusion = torch.bincount(
+            label * num_classes + pred,
+            minlength=num_classes**2).view(num_classes, num_classes)
+
+        num_frames = len(data_samples)
+        num_patches = torch.bincount(frame_ids, minlength=num_frames)
+        pred_counts = torch.bincount(frame_ids, (pred > 0).double(),
+                                     num_frames)
+        label_counts = torch.bincount(frame_ids, (label > 0).double(),
+                                      num_frames)
+        ratio_error = (pred_counts - label_counts) / num_patches.clamp(min=1)
+        abs_sum = ratio_error.abs().sum()
+        sq_sum = ratio_error.square().sum()
+        num_valid = (num_patches > 0).sum().double()
+        ratio_stats = torch.stack([abs_sum, sq_sum, num_valid])
+
+        if self._confusion is None:
+            self._confusion = confusion
+            self._ratio_stats = ratio_stats
+        else:
+            self._confusion += confusion
+            self._ratio_stats += ratio_stats
+
+    def evaluate(self, size: int) -> dict:
+        """Reduce the accumulated statistics across ranks and compute the
+        metrics.
+
+        Args:
+            size (int): Length of the entire validation dataset, unused as
+                the statistics are not gathered per sample.
+
+        Returns:
+            dict: Evaluation metrics dict on the val dataset.
+        """
+        num_classes = len(self.dataset_meta['classes'])
+        device = get_comm_device()
+        confusion = self._confusion
+        if confusion is None:
+            confusion = torch.zeros(num_classes, num_classes, dtype=torch.long)
+            ratio_stats = torch.zeros(3, dtype=torch.double)
+        else:
+            ratio_stats = self._ratio_stats
+        confusion = confusion.to(device)
+        ratio_stats = ratio_stats.to(device)
+        all_reduce(confusion)
+        all_reduce(ratio_stats)
+
+        metrics = self.compute_metrics(
+            [confusion.cpu().numpy(),
+             ratio_stats.cpu().numpy()])
+        if self.prefix:
+            metrics = {
+                '/'.join((self.prefix, k)): v
+                for k, v in metrics.items()
+            }
+        self._confusion = None
+        self._ratio_stats = None
+        return metrics
+
+    def _group(self, num_classes: int, level: str) -> np.ndarray:
+        """Index of the type or severity group of every class."""
+        labels = np.arange(num_classes)
+        groups = np.zeros(num_classes, dtype=np.int64)
+        if level == 'type':
+            groups[1:] = (labels[1:] - 1) // self.num_severities + 1
+        else:
+            groups[1:] = (labels[1:] - 1) % self.num_severities + 1
+        return groups
+
+    @staticmethod
+    def merge_confusion(confusion: np.ndarray,
+                        groups: np.ndarray) -> np.ndarray:
+        """Sum the rows and columns of classes in the same group."""
+        num_groups = groups.max() + 1
+        merged = np.zeros((num_groups, num_groups), dtype=confusion.dtype)
+        np.add.at(merged, (groups[:, None], groups[None, :]), confusion)
+        return merged
+
+    def confusion_to_metrics(self, confusion: np.ndarray) -> Dict[str, Any]:
+        """Per-class IoU, Acc, Fscore, Precision, Recall and aAcc."""
+        confusion = confusion.astype(np.float64)
+        intersect = np.diag(confusion)
+        area_label = confusion.sum(1)
+        area_pred = confusion.sum(0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = intersect / area_pred
+            recall = intersect / area_label
+            fscore = (1 + self.beta**2) * precision * recall / (
+                self.beta**2 * precision + recall)
+            return OrderedDict(
+                aAcc=intersect.sum() / confusion.sum(),
+                IoU=intersect / (area_label + area_pred - intersect),
+                Acc=recall,
+                Fscore=fscore,
+                Precision=precision,
+                Recall=recall)
+
+    def _log_table(self, names: List[str], metrics: dict, title: str,
+                   logger: MMLogger) -> None:
+        table = PrettyTable()
+        table.add_column(title, names)
+        for key in ('IoU', 'Acc', 'Fscore', 'Precision', 'Recall'):
+            table.add_column(key, np.round(metrics[key] * 100, 2))
+        print_log(f'per {title.lower()} results:', logger)
+        print_log('\n' + table.get_string(), logger=logger)
+
+    def compute_metrics(self, results: list) -> Dict[str, float]:
+        """Compute the metrics from the reduced statistics.
+
+        Args:
+            results (list): The confusion matrix of shape
+                (num_classes, num_classes), indexed by (label, prediction),
+                and the frame ratio statistics (sum of absolute errors, sum
+                of squared errors, number of frames).
+
+        Returns:
+            Dict[str, float]: The computed metrics.
+        """
+        logger: MMLogger = MMLogger.get_current_instance()
+        confusion, ratio_stats = results
+        class_names = list(self.dataset_meta['classes'])
+        num_classes = len(class_names)
+        assert (num_classes - 1) % self.num_severities == 0, \
+            f'{num_classes} classes do not split into clean and ' \
+            f'{self.num_severities} severities per type'
+
+        metrics = OrderedDict()
+        class_metrics = self.confusion_to_metrics(confusion)
+        metrics['aAcc'] = np.round(class_metrics['aAcc'] * 100, 2)
+        for key in ('IoU', 'Acc', 'Fscore', 'Precision', 'Recall'):
+            metrics['m' + key] = np.round(
+                np.nanmean(class_metrics[key]) * 100, 2)
+        self._log_table(class_names, class_metrics, 'Class', logger)
+
+        for level in ('type', 'severity'):
+            groups = self._group(num_classes, level)
+            merged = self.confusion_to_metrics(
+                self.merge_confusion(confusion, groups))
+            metrics[f'{level}_aAcc'] = np.round(merged['aAcc'] * 100, 2)
+            metrics[f'{level}_mIoU'] = np.round(
+                np.nanmean(merged['IoU']) * 100, 2)
+            names = [class_names[0]]
+            for group in range(1, groups.max() + 1):
+                # e.g. raindrop_blur -> raindrop (type) or blur (severity)
+                name = class_names[int(np.flatnonzero(groups == group)[0])]
+                prefix, _, suffix = name.rpartition('_')
+                names.append((prefix if level == 'type' else suffix) or name)
+            self._log_table(names, merged, level.capitalize(), logger)
+
+        abs_sum, sq_sum, num_frames = ratio_stats
+        num_frames = max(num_frames, 1)
+        metrics['ratio_MAE'] = np.round(abs_sum / num_frames * 100, 2)
+        metrics['ratio_RMSE'] = np.round(np.sqrt(sq_sum / num_frames) * 100, 2)
+        return metrics
@@ -16,7 +16,7 @@ from torch.nn.modules.batchnorm import _BatchNorm
 from torch.nn.modules.utils import _pair as to_2tuple
 
 from mmseg.registry import MODELS
-from ..utils import PatchEmbed
+from ..utils import PatchEmbed, TensorCache, check_attn_impl
 from .vit import TransformerEncoderLayer as VisionTransformerEncoderLayer
 
 
@@ -37,6 +37,9 @@ class BEiTAttention(BaseModule):
         attn_drop_rate (float): Dropout ratio of attention weight.
             Default: 0.0
         proj_drop_rate (float): Dropout ratio of output. Default: 0.
+        attn_impl (str): Attention implementation, 'math' or 'sdpa'. 'sdpa'
+            passes the relative position bias as the mask of
+            ``F.scaled_dot_product_attention``. Default: 'math'.
         init_cfg (dict | None, optional): The Config for initialization.
             Default: None.
     """
@@ -49,9 +52,12 @@ class BEiTAttention(BaseModule):
                  qk_scale=None,
                  attn_drop_rate=0.,
                  proj_drop_rate=0.,
+                 attn_impl='math',
                  init_cfg=None,
                  **kwargs):
         super().__init__(init_cfg=init_cfg)
+        check_attn_impl(attn_impl)
+        self.attn_impl = attn_impl
         self.embed_dims = embed_dims
         self.num_heads = num_heads
         head_embed_dims = embed_dims // num_heads
@@ -65,6 +71,7 @@ class BEiTAttention(BaseModule):
 
         self.window_size = window_size
         self._init_rel_pos_embedding()
+        self._bias_cache = TensorCache(max_size=1)
 
         self.qkv = nn.Linear(embed_dims, embed_dims * 3, bias=qkv_bias)
         self.attn_drop = nn.Dropout(attn_drop_rate)
@@ -113,6 +120,26 @@ class BEiTAttention(BaseModule):
     def init_weights(self):
         trunc_normal_(self.relative_position_bias_table, std=0.02)
 
+    def _apply(self, fn, *args, **kwargs):
+        self._bias_cache.clear()
+        return super()._apply(fn, *args, **kwargs)
+
+    def get_relative_position_bias(self):
+        """Gather the relative position bias of shape (nH, Wh*Ww+1,
+        Wh*Ww+1), cached unless gradients flow into the table."""
+        return self._bias_cache.get(None,
+                                    (self.relative_position_bias_table, ),
+                                    self._gather_relative_position_bias)
+
+    def _gather_relative_position_bias(self):
+        Wh = self.window_size[0]
+        Ww = self.window_size[1]
+        relative_position_bias = self.relative_position_bias_table[
+            self.relative_position_index.view(-1)].view(
+                Wh * Ww + 1, Wh * Ww + 1, -1)
+        return relative_position_bias.permute(
+            2, 0, 1).contiguous()  # nH, Wh*Ww, Wh*Ww
+
     def forward(self, x):
         """
         Args:
@@ -129,24 +156,37 @@ class BEiTAttention(BaseModule):
 
         qkv = qkv.reshape(B, N, 3, self.num_heads, -1).permute(2, 0, 3, 1, 4)
         q, k, v = qkv[0], qkv[1], qkv[2]
-        q = q * self.scale
-        attn = (q @ k.transpose(-2, -1))
-        if self.relative_position_bias_table is not None:
-            Wh = self.window_size[0]
-            Ww = self.window_size[1]
-            relative_position_bias = self.relative_position_bias_table[
-                self.relative_position_index.view(-1)].view(
-                    Wh * Ww + 1, Wh * Ww + 1, -1)
-            relative_position_bias = relative_position_bias.permute(
-                2, 0, 1).contiguous()  # nH, Wh*Ww, Wh*Ww
-            attn = attn + relative_position_bias.unsqueeze(0)
-        attn = attn.softmax(dim=-1)
-        attn = self.attn_drop(attn)
-        x = (attn @ v).transpose(1, 2).reshape(B, N, C)
+        if self.attn_impl == 'sdpa':
+            x = self._sdpa_forward(q, k, v)
+        else:
+            q = q * self.scale
+            attn = (q @ k.transpose(-2, -1))
+            if self.relative_position_bias_table is not None:
+                relative_position_bias = self.get_relative_position_bias()
+                attn = attn + relative_position_bias.unsqueeze(0)
+            attn = attn.softmax(dim=-1)
+            attn = self.attn_drop(attn)
+            x = attn @ v
+        x = x.transpose(1, 2).reshape(B, N, C)
         x = self.proj(x)
         x = self.proj_drop(x)
         return x
 
+    def _sdpa_forward(self, q, k, v):
+        """Attention of q, k, v of shape (B, nH, N, C) with the fused
+        kernel, the relative position bias is the additive mask."""
+        attn_mask = None
+        if self.relative_position_bias_table is not None:
+            attn_mask = self.get_relative_position_bias().unsqueeze(0).to(
+                q.dtype)
+        return F.scaled_dot_product_attention(
+            q,
+            k,
+            v,
+            attn_mask=attn_mask,
+            dropout_p=self.attn_drop.p if self.training else 0.,
+            scale=self.scale)
+
 
 class BEiTTransformerEncoderLayer(VisionTransformerEncoderLayer):
     """Implements one encoder layer in Vision Transformer.
@@ -172,6 +212,8 @@ class BEiTTransformerEncoderLayer(VisionTransformerEncoderLayer):
             Default: None.
         init_values (float, optional): Initialize the values of BEiTAttention
             and FFN with learnable scaling. Default: None.
+        attn_impl (str): Attention implementation of BEiTAttention, 'math'
+            or 'sdpa'. Default: 'math'.
     """
 
     def __init__(self,
@@ -187,7 +229,8 @@ class BEiTTransformerEncoderLayer(VisionTransformerEncoderLayer):
                  window_size=None,
                  attn_cfg=dict(),
                  ffn_cfg=dict(add_identity=False),
-                 init_values=None):
+                 init_values=None,
+                 attn_impl='math'):
         attn_cfg.update(dict(window_size=window_size, qk_scale=None))
 
         super().__init__(
@@ -202,7 +245,8 @@ class BEiTTransformerEncoderLayer(VisionTransformerEncoderLayer):
             act_cfg=act_cfg,
             norm_cfg=norm_cfg,
             attn_cfg=attn_cfg,
-            ffn_cfg=ffn_cfg)
+            ffn_cfg=ffn_cfg,
+            attn_impl=attn_impl)
 
         # NOTE: drop path for stochastic depth, we shall see if
         # this is better than dropout here
@@ -215,7 +259,7 @@ class BEiTTransformerEncoderLayer(VisionTransformerEncoderLayer):
             init_values * torch.ones(embed_dims), requires_grad=True)
 
     def build_attn(self, attn_cfg):
-        self.attn = BEiTAttention(**attn_cfg)
+        self.attn = BEiTAttention(**attn_cfg, attn_impl=self.attn_impl)
 
     def forward(self, x):
         x = x + self.drop_path(self.gamma_1 * self.attn(self.norm1(x)))
@@ -258,6 +302,8 @@ class BEiT(BaseModule):
         pretrained (str, optional): Model pretrained path. Default: None.
         init_values (float): Initialize the values of BEiTAttention and FFN
             with learnable scaling.
+        attn_impl (str): Attention implementation, 'math' or 'sdpa'.
+            Default: 'math'.
         init_cfg (dict or list[dict], optional): Initialization config dict.
             Default: None.
     """
@@ -282,6 +328,7 @@ class BEiT(BaseModule):
                  norm_eval=False,
                  pretrained=None,
                  init_values=0.1,
+                 attn_impl='math',
                  init_cfg=None):
         super().__init__(init_cfg=init_cfg)
         if isinstance(img_size, int):
@@ -319,6 +366,7 @@ class BEiT(BaseModule):
         self.norm_cfg = norm_cfg
         self.patch_norm = patch_norm
         self.init_values = init_values
+        self.attn_impl = attn_impl
         self.window_size = (img_size[0] // patch_size,
                             img_size[1] // patch_size)
         self.patch_shape = self.window_size
@@ -375,7 +423,8 @@ class BEiT(BaseModule):
                     act_cfg=self.act_cfg,
                     norm_cfg=self.norm_cfg,
                     window_size=self.window_size,
-                    init_values=self.init_values))
+                    init_values=self.init_values,
+                    attn_impl=self.attn_impl))
 
     @property
     def norm1(self):
@@ -39,7 +39,7 @@ class MAETransformerEncoderLayer(BEiTTransformerEncoderLayer):
     """
 
     def build_attn(self, attn_cfg):
-        self.attn = MAEAttention(**attn_cfg)
+        self.attn = MAEAttention(**attn_cfg, attn_impl=self.attn_impl)
 
 
 @MODELS.register_module()
@@ -76,6 +76,8 @@ class MAE(BEiT):
         pretrained (str, optional): model pretrained path. Default: None.
         init_values (float): Initialize the values of Attention and FFN
             with learnable scaling. Defaults to 0.1.
+        attn_impl (str): Attention implementation, 'math' or 'sdpa'.
+            Default: 'math'.
         init_cfg (dict or list[dict], optional): Initialization config dict.
             Default: None.
     """
@@ -99,6 +101,7 @@ class MAE(BEiT):
                  norm_eval=False,
                  pretrained=None,
                  init_values=0.1,
+                 attn_impl='math',
                  init_cfg=None):
         super().__init__(
             img_size=img_size,
@@ -120,6 +123,7 @@ class MAE(BEiT):
             norm_eval=norm_eval,
             pretrained=pretrained,
             init_values=init_values,
+            attn_impl=attn_impl,
             init_cfg=init_cfg)
 
         self.cls_token = nn.Parameter(torch.zeros(1, 1, embed_dims))
@@ -147,7 +151,8 @@ class MAE(BEiT):
                     act_cfg=self.act_cfg,
                     norm_cfg=self.norm_cfg,
                     window_size=self.patch_shape,
-                    init_values=self.init_values))
+                    init_values=self.init_values,
+                    attn_impl=self.attn_impl))
 
     def fix_init_weight(self):
         """Rescale the initialization according to layer id.
@@ -13,7 +13,8 @@ from mmengine.model.weight_init import (constant_init, normal_init,
                                         trunc_normal_init)
 
 from mmseg.registry import MODELS
-from ..utils import PatchEmbed, nchw_to_nlc, nlc_to_nchw
+from ..utils import (PatchEmbed, check_attn_impl, nchw_to_nlc, nlc_to_nchw,
+                     sdpa_multihead_attention)
 
 
 class MixFFN(BaseModule):
@@ -112,6 +113,9 @@ class EfficientMultiheadAttention(MultiheadAttention):
             Default: dict(type='LN').
         sr_ratio (int): The ratio of spatial reduction of Efficient Multi-head
             Attention of Segformer. Default: 1.
+        attn_impl (str): 'math' runs ``nn.MultiheadAttention``, 'sdpa' the
+            same projections with ``F.scaled_dot_product_attention``.
+            Default: 'math'.
     """
 
     def __init__(self,
@@ -124,7 +128,8 @@ class EfficientMultiheadAttention(MultiheadAttention):
                  batch_first=True,
                  qkv_bias=False,
                  norm_cfg=dict(type='LN'),
-                 sr_ratio=1):
+                 sr_ratio=1,
+                 attn_impl='math'):
         super().__init__(
             embed_dims,
             num_heads,
@@ -135,6 +140,8 @@ class EfficientMultiheadAttention(MultiheadAttention):
             batch_first=batch_first,
             bias=qkv_bias)
 
+        check_attn_impl(attn_impl)
+        self.attn_impl = attn_impl
         self.sr_ratio = sr_ratio
         if sr_ratio > 1:
             self.sr = Conv2d(
@@ -168,6 +175,11 @@ class EfficientMultiheadAttention(MultiheadAttention):
         if identity is None:
             identity = x_q
 
+        if self.attn_impl == 'sdpa':
+            # x is always batch first here
+            out = sdpa_multihead_attention(self.attn, x_q, x_kv, x_kv)
+            return identity + self.dropout_layer(self.proj_drop(out))
+
         # Because the dataflow('key', 'query', 'value') of
         # ``torch.nn.MultiheadAttention`` is (num_query, batch,
         # embed_dims), We should adjust the shape of dataflow from
@@ -238,6 +250,8 @@ class TransformerEncoderLayer(BaseModule):
             Attention of Segformer. Default: 1.
         with_cp (bool): Use checkpoint or not. Using checkpoint will save
             some memory while slowing down the training speed. Default: False.
+        attn_impl (str): Attention implementation, 'math' or 'sdpa'.
+            Default: 'math'.
     """
 
     def __init__(self,
@@ -252,7 +266,8 @@ class TransformerEncoderLayer(BaseModule):
                  norm_cfg=dict(type='LN'),
                  batch_first=True,
                  sr_ratio=1,
-                 with_cp=False):
+                 with_cp=False,
+                 attn_impl='math'):
         super().__init__()
 
         # The ret[0] of build_norm_layer is norm name.
@@ -267,7 +282,8 @@ class TransformerEncoderLayer(BaseModule):
             batch_first=batch_first,
             qkv_bias=qkv_bias,
             norm_cfg=norm_cfg,
-            sr_ratio=sr_ratio)
+            sr_ratio=sr_ratio,
+            attn_impl=attn_impl)
 
         # The ret[0] of build_norm_layer is norm name.
         self.norm2 = build_norm_layer(norm_cfg, embed_dims)[1]
@@ -335,6 +351,10 @@ class MixVisionTransformer(BaseModule):
             Default: None.
         with_cp (bool): Use checkpoint or not. Using checkpoint will save
             some memory while slowing down the training speed. Default: False.
+        attn_impl (str): Attention implementation. 'math' runs
+            ``nn.MultiheadAttention``, 'sdpa' the fused
+            ``F.scaled_dot_product_attention`` with the same weights.
+            Default: 'math'.
     """
 
     def __init__(self,
@@ -356,7 +376,8 @@ class MixVisionTransformer(BaseModule):
                  norm_cfg=dict(type='LN', eps=1e-6),
                  pretrained=None,
                  init_cfg=None,
-                 with_cp=False):
+                 with_cp=False,
+                 attn_impl='math'):
         super().__init__(init_cfg=init_cfg)
 
         assert not (init_cfg and pretrained), \
@@ -411,7 +432,8 @@ class MixVisionTransformer(BaseModule):
                     act_cfg=act_cfg,
                     norm_cfg=norm_cfg,
                     with_cp=with_cp,
-                    sr_ratio=sr_ratios[i]) for idx in range(num_layer)
+                    sr_ratio=sr_ratios[i],
+                    attn_impl=attn_impl) for idx in range(num_layer)
             ])
             in_channels = embed_dims_i
             # The ret[0] of build_norm_layer is norm name.
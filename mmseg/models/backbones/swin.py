@@ -17,7 +17,9 @@ from mmengine.runner import CheckpointLoader
 from mmengine.utils import to_2tuple
 
 from mmseg.registry import MODELS
+from ..utils.attention import check_attn_impl
 from ..utils.embed import PatchEmbed, PatchMerging
+from ..utils.tensor_cache import TensorCache
 
 
 class WindowMSA(BaseModule):
@@ -35,6 +37,9 @@ class WindowMSA(BaseModule):
         attn_drop_rate (float, optional): Dropout ratio of attention weight.
             Default: 0.0
         proj_drop_rate (float, optional): Dropout ratio of output. Default: 0.
+        attn_impl (str, optional): 'math' computes the attention step by
+            step, 'sdpa' with ``F.scaled_dot_product_attention`` (requires
+            PyTorch >= 2.1). Default: 'math'.
         init_cfg (dict | None, optional): The Config for initialization.
             Default: None.
     """
@@ -47,9 +52,13 @@ class WindowMSA(BaseModule):
                  qk_scale=None,
                  attn_drop_rate=0.,
                  proj_drop_rate=0.,
+                 attn_impl='math',
                  init_cfg=None):
 
         super().__init__(init_cfg=init_cfg)
+        check_attn_impl(attn_impl)
+        self.attn_impl = attn_impl
+        self._bias_cache = TensorCache(max_size=1)
         self.embed_dims = embed_dims
         self.window_size = window_size  # Wh, Ww
         self.num_heads = num_heads
@@ -78,6 +87,30 @@ class WindowMSA(BaseModule):
     def init_weights(self):
         trunc_normal_(self.relative_position_bias_table, std=0.02)
 
+    def _apply(self, fn, *args, **kwargs):
+        # `.to()`, `.cuda()` and `.half()` replace the table
+        self._bias_cache.clear()
+        return super()._apply(fn, *args, **kwargs)
+
+    def get_relative_position_bias(self):
+        """Gather the relative position bias of shape (nH, Wh*Ww, Wh*Ww).
+
+        The bias only depends on the table, so it is cached by
+        :class:`TensorCache` unless gradients flow into the table.
+        """
+        return self._bias_cache.get(None,
+                                    (self.relative_position_bias_table, ),
+                                    self._gather_relative_position_bias)
+
+    def _gather_relative_position_bias(self):
+        relative_position_bias = self.relative_position_bias_table[
+            self.relative_position_index.view(-1)].view(
+                self.window_size[0] * self.window_size[1],
+                self.window_size[0] * self.window_size[1],
+                -1)  # Wh*Ww,Wh*Ww,nH
+        return relative_position_bias.permute(
+            2, 0, 1).contiguous()  # nH, Wh*Ww, Wh*Ww
+
     def forward(self, x, mask=None):
         """
         Args:
@@ -91,17 +124,14 @@ class WindowMSA(BaseModule):
                                   C // self.num_heads).permute(2, 0, 3, 1, 4)
         # make torchscript happy (cannot use tensor as tuple)
         q, k, v = qkv[0], qkv[1], qkv[2]
+        relative_position_bias = self.get_relative_position_bias()
+
+        if self.attn_impl == 'sdpa':
+            return self._sdpa_forward(q, k, v, relative_position_bias, mask)
 
         q = q * self.scale
         attn = (q @ k.transpose(-2, -1))
 
-        relative_position_bias = self.relative_position_bias_table[
-            self.relative_position_index.view(-1)].view(
-                self.window_size[0] * self.window_size[1],
-                self.window_size[0] * self.window_size[1],
-                -1)  # Wh*Ww,Wh*Ww,nH
-        relative_position_bias = relative_position_bias.permute(
-            2, 0, 1).contiguous()  # nH, Wh*Ww, Wh*Ww
         attn = attn + relative_position_bias.unsqueeze(0)
 
         if mask is not None:
@@ -118,6 +148,30 @@ class WindowMSA(BaseModule):
         x = self.proj_drop(x)
         return x
 
+    def _sdpa_forward(self, q, k, v, relative_position_bias, mask):
+        """Fused attention with the bias and the mask as additive mask."""
+        B, _, N, head_dims = q.shape
+        if mask is None:
+            attn_mask = relative_position_bias.unsqueeze(0)
+        else:
+            # the fused kernels take 4D inputs only, so the mask of the nW
+            # windows is repeated for every image
+            nW = mask.shape[0]
+            attn_mask = mask.unsqueeze(1) + relative_position_bias
+            attn_mask = attn_mask.unsqueeze(0).expand(
+                B // nW, -1, -1, -1, -1).reshape(B, self.num_heads, N, N)
+        x = F.scaled_dot_product_attention(
+            q,
+            k,
+            v,
+            attn_mask=attn_mask.to(q.dtype),
+            dropout_p=self.attn_drop.p if self.training else 0.,
+            scale=self.scale)
+        x = x.transpose(1, 2).reshape(B, N, -1)
+        x = self.proj(x)
+        x = self.proj_drop(x)
+        return x
+
     @staticmethod
     def double_step_seq(step1, len1, step2, len2):
         seq1 = torch.arange(0, step1 * len1, step1)
@@ -144,6 +198,8 @@ class ShiftWindowMSA(BaseModule):
             Defaults: 0.
         dropout_layer (dict, optional): The dropout_layer used before output.
             Defaults: dict(type='DropPath', drop_prob=0.).
+        attn_impl (str, optional): Attention implementation of
+            :class:`WindowMSA`. Defaults: 'math'.
         init_cfg (dict, optional): The extra config for initialization.
             Default: None.
     """
@@ -158,12 +214,15 @@ class ShiftWindowMSA(BaseModule):
                  attn_drop_rate=0,
                  proj_drop_rate=0,
                  dropout_layer=dict(type='DropPath', drop_prob=0.),
+                 attn_impl='math',
                  init_cfg=None):
         super().__init__(init_cfg=init_cfg)
 
         self.window_size = window_size
         self.shift_size = shift_size
         assert 0 <= self.shift_size < self.window_size
+        # attention masks of the shifted windows by padded feature size
+        self._mask_cache = TensorCache()
 
         self.w_msa = WindowMSA(
             embed_dims=embed_dims,
@@ -173,10 +232,51 @@ class ShiftWindowMSA(BaseModule):
             qk_scale=qk_scale,
             attn_drop_rate=attn_drop_rate,
             proj_drop_rate=proj_drop_rate,
+            attn_impl=attn_impl,
             init_cfg=None)
 
         self.drop = build_dropout(dropout_layer)
 
+    def _apply(self, fn, *args, **kwargs):
+        self._mask_cache.clear()
+        return super()._apply(fn, *args, **kwargs)
+
+    def get_attn_mask(self, H_pad, W_pad, device, dtype):
+        """Get the attention mask of the shifted windows.
+
+        The mask only depends on the padded feature size, so it is built
+        once per size, device and dtype.
+
+        Returns:
+            Tensor: The mask of shape (nW, window_size**2, window_size**2)
+            with -100 between tokens of different regions and 0 otherwise.
+        """
+        return self._mask_cache.get(
+            (H_pad, W_pad, device, dtype), (),
+            lambda: self._build_attn_mask(H_pad, W_pad, device, dtype))
+
+    def _build_attn_mask(self, H_pad, W_pad, device, dtype):
+        # region index of every row and column: 0 for tokens that are
+        # not rolled over, 1 and 2 for the bands the shift rolls over
+        h_ids = torch.zeros(H_pad, device=device)
+        h_ids[-self.window_size:] = 1
+        h_ids[-self.shift_size:] = 2
+        w_ids = torch.zeros(W_pad, device=device)
+        w_ids[-self.window_size:] = 1
+        w_ids[-self.shift_size:] = 2
+        img_mask = (h_ids[:, None] * 3 + w_ids[None, :]).view(
+            1, H_pad, W_pad, 1)
+
+        # nW, window_size, window_size, 1
+        mask_windows = self.window_partition(img_mask)
+        mask_windows = mask_windows.view(-1,
+                                         self.window_size * self.window_size)
+        attn_mask = mask_windows.unsqueeze(1) - mask_windows.unsqueeze(2)
+        attn_mask = attn_mask.masked_fill(attn_mask != 0,
+                                          float(-100.0)).masked_fill(
+                                              attn_mask == 0, float(0.0))
+        return attn_mask.to(dtype)
+
     def forward(self, query, hw_shape):
         B, L, C = query.shape
         H, W = hw_shape
@@ -196,28 +296,9 @@ class ShiftWindowMSA(BaseModule):
                 shifts=(-self.shift_size, -self.shift_size),
                 dims=(1, 2))
 
-            # calculate attention mask for SW-MSA
-            img_mask = torch.zeros((1, H_pad, W_pad, 1), device=query.device)
-            h_slices = (slice(0, -self.window_size),
-                        slice(-self.window_size,
-                              -self.shift_size), slice(-self.shift_size, None))
-            w_slices = (slice(0, -self.window_size),
-                        slice(-self.window_size,
-                              -self.shift_size), slice(-self.shift_size, None))
-            cnt = 0
-            for h in h_slices:
-                for w in w_slices:
-                    img_mask[:, h, w, :] = cnt
-                    cnt += 1
-
-            # nW, window_size, window_size, 1
-            mask_windows = self.window_partition(img_mask)
-            mask_windows = mask_windows.view(
-                -1, self.window_size * self.window_size)
-            attn_mask = mask_windows.unsqueeze(1) - mask_windows.unsqueeze(2)
-            attn_mask = attn_mask.masked_fill(attn_mask != 0,
-                                              float(-100.0)).masked_fill(
-                                                  attn_mask == 0, float(0.0))
+            # attention mask for SW-MSA
+            attn_mask = self.get_attn_mask(H_pad, W_pad, query.device,
+                                           query.dtype)
         else:
             shifted_query = query
             attn_mask = None
@@ -306,6 +387,8 @@ class SwinBlock(BaseModule):
         with_cp (bool, optional): Use checkpoint or not. Using checkpoint
             will save some memory while slowing down the training speed.
             Default: False.
+        attn_impl (str, optional): Attention implementation of
+            :class:`WindowMSA`, 'math' or 'sdpa'. Default: 'math'.
         init_cfg (dict | list | None, optional): The init config.
             Default: None.
     """
@@ -324,6 +407,7 @@ class SwinBlock(BaseModule):
                  act_cfg=dict(type='GELU'),
                  norm_cfg=dict(type='LN'),
                  with_cp=False,
+                 attn_impl='math',
                  init_cfg=None):
 
         super().__init__(init_cfg=init_cfg)
@@ -341,6 +425,7 @@ class SwinBlock(BaseModule):
             attn_drop_rate=attn_drop_rate,
             proj_drop_rate=drop_rate,
             dropout_layer=dict(type='DropPath', drop_prob=drop_path_rate),
+            attn_impl=attn_impl,
             init_cfg=None)
 
         self.norm2 = build_norm_layer(norm_cfg, embed_dims)[1]
@@ -402,6 +487,8 @@ class SwinBlockSequence(BaseModule):
         with_cp (bool, optional): Use checkpoint or not. Using checkpoint
             will save some memory while slowing down the training speed.
             Default: False.
+        attn_impl (str, optional): Attention implementation of
+            :class:`WindowMSA`, 'math' or 'sdpa'. Default: 'math'.
         init_cfg (dict | list | None, optional): The init config.
             Default: None.
     """
@@ -421,6 +508,7 @@ class SwinBlockSequence(BaseModule):
                  act_cfg=dict(type='GELU'),
                  norm_cfg=dict(type='LN'),
                  with_cp=False,
+                 attn_impl='math',
                  init_cfg=None):
         super().__init__(init_cfg=init_cfg)
 
@@ -446,6 +534,7 @@ class SwinBlockSequence(BaseModule):
                 act_cfg=act_cfg,
                 norm_cfg=norm_cfg,
                 with_cp=with_cp,
+                attn_impl=attn_impl,
                 init_cfg=None)
             self.blocks.append(block)
 
@@ -508,6 +597,9 @@ class SwinTransformer(BaseModule):
         with_cp (bool, optional): Use checkpoint or not. Using checkpoint
             will save some memory while slowing down the training speed.
             Default: False.
+        attn_impl (str, optional): Attention implementation of the window
+            attention. 'math' computes it step by step, 'sdpa' with the fused
+            ``F.scaled_dot_product_attention``. Default: 'math'.
         pretrained (str, optional): model pretrained path. Default: None.
         frozen_stages (int): Stages to be frozen (stop grad and set eval mode).
             -1 means not freezing any parameters.
@@ -536,6 +628,7 @@ class SwinTransformer(BaseModule):
                  act_cfg=dict(type='GELU'),
                  norm_cfg=dict(type='LN'),
                  with_cp=False,
+                 attn_impl='math',
                  pretrained=None,
                  frozen_stages=-1,
                  init_cfg=None):
@@ -622,6 +715,7 @@ class SwinTransformer(BaseModule):
                 act_cfg=act_cfg,
                 norm_cfg=norm_cfg,
                 with_cp=with_cp,
+                attn_impl=attn_impl,
                 init_cfg=None)
             self.stages.append(stage)
             if downsample:
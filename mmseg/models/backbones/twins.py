@@ -15,6 +15,7 @@ from torch.nn.modules.batchnorm import _BatchNorm
 
 from mmseg.models.backbones.mit import EfficientMultiheadAttention
 from mmseg.registry import MODELS
+from ..utils.attention import check_attn_impl
 from ..utils.embed import PatchEmbed
 
 
@@ -47,6 +48,8 @@ class GlobalSubsampledAttention(EfficientMultiheadAttention):
             Default: dict(type='LN').
         sr_ratio (int): The ratio of spatial reduction of GSA of PCPVT.
             Default: 1.
+        attn_impl (str): Attention implementation, 'math' or 'sdpa'.
+            Default: 'math'.
         init_cfg (dict, optional): The Config for initialization.
             Defaults to None.
     """
@@ -61,6 +64,7 @@ class GlobalSubsampledAttention(EfficientMultiheadAttention):
                  qkv_bias=True,
                  norm_cfg=dict(type='LN'),
                  sr_ratio=1,
+                 attn_impl='math',
                  init_cfg=None):
         super().__init__(
             embed_dims,
@@ -72,6 +76,7 @@ class GlobalSubsampledAttention(EfficientMultiheadAttention):
             qkv_bias=qkv_bias,
             norm_cfg=norm_cfg,
             sr_ratio=sr_ratio,
+            attn_impl=attn_impl,
             init_cfg=init_cfg)
 
 
@@ -95,6 +100,8 @@ class GSAEncoderLayer(BaseModule):
         norm_cfg (dict): Config dict for normalization layer.
             Default: dict(type='LN').
         sr_ratio (float): Kernel_size of conv in Attention modules. Default: 1.
+        attn_impl (str): Attention implementation, 'math' or 'sdpa'.
+            Default: 'math'.
         init_cfg (dict, optional): The Config for initialization.
             Defaults to None.
     """
@@ -111,6 +118,7 @@ class GSAEncoderLayer(BaseModule):
                  act_cfg=dict(type='GELU'),
                  norm_cfg=dict(type='LN'),
                  sr_ratio=1.,
+                 attn_impl='math',
                  init_cfg=None):
         super().__init__(init_cfg=init_cfg)
 
@@ -123,7 +131,8 @@ class GSAEncoderLayer(BaseModule):
             dropout_layer=dict(type='DropPath', drop_prob=drop_path_rate),
             qkv_bias=qkv_bias,
             norm_cfg=norm_cfg,
-            sr_ratio=sr_ratio)
+            sr_ratio=sr_ratio,
+            attn_impl=attn_impl)
 
         self.norm2 = build_norm_layer(norm_cfg, embed_dims, postfix=2)[1]
         self.ffn = FFN(
@@ -159,6 +168,8 @@ class LocallyGroupedSelfAttention(BaseModule):
             Default: 0.0
         proj_drop_rate (float, optional): Dropout ratio of output. Default: 0.
         window_size(int): Window size of LSA. Default: 1.
+        attn_impl (str): 'math' computes the attention step by step, 'sdpa'
+            with ``F.scaled_dot_product_attention``. Default: 'math'.
         init_cfg (dict, optional): The Config for initialization.
             Defaults to None.
     """
@@ -171,8 +182,11 @@ class LocallyGroupedSelfAttention(BaseModule):
                  attn_drop_rate=0.,
                  proj_drop_rate=0.,
                  window_size=1,
+                 attn_impl='math',
                  init_cfg=None):
         super().__init__(init_cfg=init_cfg)
+        check_attn_impl(attn_impl)
+        self.attn_impl = attn_impl
 
         assert embed_dims % num_heads == 0, f'dim {embed_dims} should be ' \
                                             f'divided by num_heads ' \
@@ -225,13 +239,32 @@ class LocallyGroupedSelfAttention(BaseModule):
                                   self.num_heads, c // self.num_heads).permute(
                                       3, 0, 1, 4, 2, 5)
         q, k, v = qkv[0], qkv[1], qkv[2]
-        # [B, _h*_w, n_head, window_size*window_size, window_size*window_size]
-        attn = (q @ k.transpose(-2, -1)) * self.scale
-        attn = attn + attn_mask.unsqueeze(2)
-        attn = attn.softmax(dim=-1)
-        attn = self.attn_drop(attn)
-        attn = (attn @ v).transpose(2, 3).reshape(b, _h, _w, self.window_size,
-                                                  self.window_size, c)
+        if self.attn_impl == 'sdpa':
+            # the fused kernels take 4D inputs, fold the windows into batch
+            num_windows, length = _h * _w, self.window_size**2
+            q, k, v = (
+                t.reshape(b * num_windows, self.num_heads, length, -1)
+                for t in (q, k, v))
+            attn_mask = attn_mask.expand(b, -1, -1, -1)
+            attn_mask = attn_mask.reshape(b * num_windows, 1, length, length)
+            attn = F.scaled_dot_product_attention(
+                q,
+                k,
+                v,
+                attn_mask=attn_mask.to(q.dtype),
+                dropout_p=self.attn_drop.p if self.training else 0.,
+                scale=self.scale)
+            attn = attn.view(b, num_windows, self.num_heads, length, -1)
+        else:
+            # [B, _h*_w, n_head, window_size*window_size,
+            #  window_size*window_size]
+            attn = (q @ k.transpose(-2, -1)) * self.scale
+            attn = attn + attn_mask.unsqueeze(2)
+            attn = attn.softmax(dim=-1)
+            attn = self.attn_drop(attn)
+            attn = attn @ v
+        attn = attn.transpose(2, 3).reshape(b, _h, _w, self.window_size,
+                                            self.window_size, c)
         x = attn.transpose(2, 3).reshape(b, _h * self.window_size,
                                          _w * self.window_size, c)
         if pad_r > 0 or pad_b > 0:
@@ -265,6 +298,8 @@ class LSAEncoderLayer(BaseModule):
         norm_cfg (dict): Config dict for normalization layer.
             Default: dict(type='LN').
         window_size (int): Window size of LSA. Default: 1.
+        attn_impl (str): Attention implementation, 'math' or 'sdpa'.
+            Default: 'math'.
         init_cfg (dict, optional): The Config for initialization.
             Defaults to None.
     """
@@ -282,6 +317,7 @@ class LSAEncoderLayer(BaseModule):
                  act_cfg=dict(type='GELU'),
                  norm_cfg=dict(type='LN'),
                  window_size=1,
+                 attn_impl='math',
                  init_cfg=None):
 
         super().__init__(init_cfg=init_cfg)
@@ -290,7 +326,7 @@ class LSAEncoderLayer(BaseModule):
         self.attn = LocallyGroupedSelfAttention(embed_dims, num_heads,
                                                 qkv_bias, qk_scale,
                                                 attn_drop_rate, drop_rate,
-                                                window_size)
+                                                window_size, attn_impl)
 
         self.norm2 = build_norm_layer(norm_cfg, embed_dims, postfix=2)[1]
         self.ffn = FFN(
@@ -381,6 +417,8 @@ class PCPVT(BaseModule):
         norm_after_stage（bool): Add extra norm. Default False.
         init_cfg (dict, optional): The Config for initialization.
             Defaults to None.
+        attn_impl (str): Attention implementation, 'math' or 'sdpa'.
+            Default: 'math'.
     """
 
     def __init__(self,
@@ -400,7 +438,8 @@ class PCPVT(BaseModule):
                  sr_ratios=[8, 4, 2, 1],
                  norm_after_stage=False,
                  pretrained=None,
-                 init_cfg=None):
+                 init_cfg=None,
+                 attn_impl='math'):
         super().__init__(init_cfg=init_cfg)
         assert not (init_cfg and pretrained), \
             'init_cfg and pretrained cannot be set at the same time'
@@ -454,7 +493,8 @@ class PCPVT(BaseModule):
                     qkv_bias=qkv_bias,
                     act_cfg=dict(type='GELU'),
                     norm_cfg=dict(type='LN'),
-                    sr_ratio=sr_ratios[k]) for i in range(depths[k])
+                    sr_ratio=sr_ratios[k],
+                    attn_impl=attn_impl) for i in range(depths[k])
             ])
             self.layers.append(_block)
             cur += depths[k]
@@ -542,6 +582,8 @@ class SVT(PCPVT):
         strides (list): Strides in patch-Embedding modules. Default: (2, 2, 2)
         init_cfg (dict, optional): The Config for initialization.
             Defaults to None.
+        attn_impl (str): Attention implementation, 'math' or 'sdpa'.
+            Default: 'math'.
     """
 
     def __init__(self,
@@ -562,12 +604,13 @@ class SVT(PCPVT):
                  windiow_sizes=[7, 7, 7],
                  norm_after_stage=True,
                  pretrained=None,
-                 init_cfg=None):
+                 init_cfg=None,
+                 attn_impl='math'):
         super().__init__(in_channels, embed_dims, patch_sizes, strides,
                          num_heads, mlp_ratios, out_indices, qkv_bias,
                          drop_rate, attn_drop_rate, drop_path_rate, norm_cfg,
                          depths, sr_ratios, norm_after_stage, pretrained,
-                         init_cfg)
+                         init_cfg, attn_impl)
         # transformer encoder
         dpr = [
             x.item() for x in torch.linspace(0, drop_path_rate, sum(depths))
@@ -585,4 +628,5 @@ class SVT(PCPVT):
                             attn_drop_rate=attn_drop_rate,
                             drop_path_rate=dpr[sum(depths[:k])+i],
                             qkv_bias=qkv_bias,
-                            window_size=windiow_sizes[k])
+                            window_size=windiow_sizes[k],
+                            attn_impl=attn_impl)
@@ -16,7 +16,8 @@ from torch.nn.modules.batchnorm import _BatchNorm
 from torch.nn.modules.utils import _pair as to_2tuple
 
 from mmseg.registry import MODELS
-from ..utils import PatchEmbed, resize
+from ..utils import (PatchEmbed, SDPAMultiheadAttention, TensorCache,
+                     check_attn_impl, resize)
 
 
 class TransformerEncoderLayer(BaseModule):
@@ -43,6 +44,10 @@ class TransformerEncoderLayer(BaseModule):
             or (n, batch, embed_dim). Default: True.
         with_cp (bool): Use checkpoint or not. Using checkpoint will save
             some memory while slowing down the training speed. Default: False.
+        attn_impl (str): Attention implementation. 'math' runs
+            ``nn.MultiheadAttention``, 'sdpa' the fused
+            ``F.scaled_dot_product_attention`` with the same weights.
+            Default: 'math'.
     """
 
     def __init__(self,
@@ -59,8 +64,11 @@ class TransformerEncoderLayer(BaseModule):
                  batch_first=True,
                  attn_cfg=dict(),
                  ffn_cfg=dict(),
-                 with_cp=False):
+                 with_cp=False,
+                 attn_impl='math'):
         super().__init__()
+        check_attn_impl(attn_impl)
+        self.attn_impl = attn_impl
 
         self.norm1_name, norm1 = build_norm_layer(
             norm_cfg, embed_dims, postfix=1)
@@ -94,7 +102,10 @@ class TransformerEncoderLayer(BaseModule):
         self.with_cp = with_cp
 
     def build_attn(self, attn_cfg):
-        self.attn = MultiheadAttention(**attn_cfg)
+        if self.attn_impl == 'sdpa':
+            self.attn = SDPAMultiheadAttention(**attn_cfg)
+        else:
+            self.attn = MultiheadAttention(**attn_cfg)
 
     def build_ffn(self, ffn_cfg):
         self.ffn = FFN(**ffn_cfg)
@@ -177,6 +188,10 @@ class VisionTransformer(BaseModule):
             some memory while slowing down the training speed. Default: False.
         frozen_exclude (List): List of parameters that are not to be frozen.
             Default: ["all"], "all" means there are no frozen parameters.
+        attn_impl (str): Attention implementation. 'math' runs
+            ``nn.MultiheadAttention``, 'sdpa' the fused
+            ``F.scaled_dot_product_attention`` with the same weights.
+            Default: 'math'.
         pretrained (str, optional): model pretrained path. Default: None.
         init_cfg (dict or list[dict], optional): Initialization config dict.
             Default: None.
@@ -210,6 +225,7 @@ class VisionTransformer(BaseModule):
                  norm_eval=False,
                  with_cp=False,
                  frozen_exclude=['all'],
+                 attn_impl='math',
                  pretrained=None,
                  init_cfg=None):
         super().__init__(init_cfg=init_cfg)
@@ -266,6 +282,8 @@ class VisionTransformer(BaseModule):
         self.pos_embed = nn.Parameter(
             torch.zeros(1, num_patches + 1, embed_dims))
         self.drop_after_pos = nn.Dropout(p=drop_rate)
+        # pos_embed resized to the feature sizes seen at inference
+        self._pos_embed_cache = TensorCache()
         self.pre_norm = pre_norm
 
         if self.pre_norm:
@@ -301,7 +319,8 @@ class VisionTransformer(BaseModule):
                     act_cfg=act_cfg,
                     norm_cfg=norm_cfg,
                     with_cp=with_cp,
-                    batch_first=True))
+                    batch_first=True,
+                    attn_impl=attn_impl))
 
         self.final_norm = final_norm
         if final_norm:
@@ -319,6 +338,10 @@ class VisionTransformer(BaseModule):
     def norm1(self):
         return getattr(self, self.norm1_name)
 
+    def _apply(self, fn, *args, **kwargs):
+        self._pos_embed_cache.clear()
+        return super()._apply(fn, *args, **kwargs)
+
     def init_weights(self):
         if isinstance(self.init_cfg, dict) and \
                 self.init_cfg.get('type') in ['Pretrained', 'Pretrained_Part']:
@@ -385,7 +408,8 @@ class VisionTransformer(BaseModule):
         """Positioning embeding method.
 
         Resize the pos_embed, if the input image size doesn't match
-            the training size.
+            the training size. The resized pos_embed is cached per
+            ``hw_shape`` unless gradients flow into pos_embed.
         Args:
             patched_img (torch.Tensor): The patched image, it should be
                 shape of [B, L1, C].
@@ -407,9 +431,15 @@ class VisionTransformer(BaseModule):
                 raise ValueError(
                     'Unexpected shape of pos_embed, got {}.'.format(
                         pos_embed.shape))
-            pos_embed = self.resize_pos_embed(pos_embed, hw_shape,
-                                              (pos_h, pos_w),
-                                              self.interpolate_mode)
+            hw_shape = tuple(hw_shape)
+
+            def resize():
+                return self.resize_pos_embed(pos_embed, hw_shape,
+                                             (pos_h, pos_w),
+                                             self.interpolate_mode)
+
+            pos_embed = self._pos_embed_cache.get(hw_shape, (pos_embed, ),
+                                                  resize)
         return self.drop_after_pos(patched_img + pos_embed)
 
     @staticmethod
@@ -0,0 +1,206 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from typing import List, Sequence, Tuple
+
+import torch
+import torch.nn as nn
+from torch import Tensor
+
+from mmseg.registry import MODELS
+from mmseg.structures import SegDataSample
+
+SEG_FIELDS = ('gt_sem_seg', 'gt_edge_map', 'gt_depth_map')
+
+
+def bgr_to_hsv(img: Tensor) -> Tensor:
+    """Convert (N, 3, H, W) BGR images in [0, 255] to HSV.
+
+    The ranges follow ``mmcv.bgr2hsv`` on uint8 images: H in [0, 180),
+    S and V in [0, 255].
+    """
+    b, g, r = img.unbind(1)
+    max_c, max_idx = img.max(1)
+    min_c = img.min(1)[0]
+    delta = max_c - min_c
+    safe_delta = delta.clamp(min=1e-6)
+    # max_idx is 0 for b, 1 for g and 2 for r
+    h = torch.where(
+        max_idx == 2, ((g - b) / safe_delta) % 6,
+        torch.where(max_idx == 1, (b - r) / safe_delta + 2,
+                    (r - g) / safe_delta + 4))
+    h = torch.where(delta > 0, h * 30, torch.zeros_like(h))
+    s = torch.where(max_c > 0, delta / max_c.clamp(min=1e-6) * 255,
+                    torch.zeros_like(max_c))
+    return torch.stack([h, s, max_c], dim=1)
+
+
+def hsv_to_bgr(img: Tensor) -> Tensor:
+    """Inverse of :func:`bgr_to_hsv`."""
+    h, s, v = img.unbind(1)
+    h = h / 30
+    s = s / 255
+    sector = torch.floor(h)
+    f = h - sector
+    sector = sector.long() % 6
+    p = v * (1 - s)
+    q = v * (1 - s * f)
+    t = v * (1 - s * (1 - f))
+    index = sector.unsqueeze(1)
+    r = torch.stack([v, q, p, p, t, v], dim=1).gather(1, index)
+    g = torch.stack([t, v, v, q, p, p], dim=1).gather(1, index)
+    b = torch.stack([p, p, t, v, v, q], dim=1).gather(1, index)
+    return torch.cat([b, g, r], dim=1)
+
+
+@MODELS.register_module()
+class BatchPhotoMetricDistortion(nn.Module):
+    """Batched :class:`PhotoMetricDistortion` on the training device.
+
+    Every sample of the stacked batch draws its own parameters. Each
+    distortion is applied with a probability of ``prob``, and the random
+    contrast is applied either first or last:
+
+    1. random brightness
+    2. random contrast (mode 0)
+    3. random saturation
+    4. random hue
+    5. random contrast (mode 1)
+
+    Saturation and hue are changed in a single HSV round trip, and values
+    stay float32 between the steps instead of being rounded to uint8.
+
+    Args:
+        brightness_delta (int): delta of brightness.
+        contrast_range (tuple): range of contrast.
+        saturation_range (tuple): range of saturation.
+        hue_delta (int): delta of hue.
+        prob (float): probability of each distortion. Defaults to 0.5.
+    """
+
+    def __init__(self,
+                 brightness_delta: int = 32,
+                 contrast_range: Sequence[float] = (0.5, 1.5),
+                 saturation_range: Sequence[float] = (0.5, 1.5),
+                 hue_delta: int = 18,
+                 prob: float = 0.5):
+        super().__init__()
+        self.brightness_delta = brightness_delta
+        self.contrast_lower, self.contrast_upper = contrast_range
+        self.saturation_lower, self.saturation_upper = saturation_range
+        self.hue_delta = hue_delta
+        self.prob = prob
+
+    def _random(self, num: int, low: float, high: float, default: float,
+                device: torch.device) -> Tensor:
+        """Per-sample values in [low, high), ``default`` if not applied."""
+        values = torch.empty(num, 1, 1, device=device).uniform_(low, high)
+        applied = torch.rand(num, 1, 1, device=device) < self.prob
+        return torch.where(applied, values, torch.full_like(values, default))
+
+    def forward(
+        self, inputs: Tensor, data_samples: List[SegDataSample]
+    ) -> Tuple[Tensor, List[SegDataSample]]:
+        """Distort a batch of BGR images with values in [0, 255].
+
+        Args:
+            inputs (Tensor): Images of shape (N, 3, H, W).
+            data_samples (list[:obj:`SegDataSample`]): The data samples,
+                returned unchanged.
+
+        Returns:
+            tuple: The distorted images and the data samples.
+        """
+        assert inputs.dim() == 4 and inputs.size(1) == 3, \
+            f'expected (N, 3, H, W) images, but got {tuple(inputs.shape)}'
+        num, device = inputs.size(0), inputs.device
+        img = inputs.float()
+
+        beta = self._random(num, -self.brightness_delta, self.brightness_delta,
+                            0., device)
+        img = (img + beta.unsqueeze(1)).clamp_(0, 255)
+
+        alpha = self._random(num, self.contrast_lower, self.contrast_upper, 1.,
+                             device).unsqueeze(1)
+        contrast_first = torch.rand(num, 1, 1, 1, device=device) < 0.5
+        img = (img * torch.where(contrast_first, alpha,
+                                 torch.ones_like(alpha))).clamp_(0, 255)
+
+        hsv = bgr_to_hsv(img)
+        saturation = self._random(num, self.saturation_lower,
+                                  self.saturation_upper, 1., device)
+        hue_shift = torch.randint(
+            -self.hue_delta, self.hue_delta, (num, 1, 1),
+            device=device).float()
+        hue_shift = torch.where(
+            torch.rand(num, 1, 1, device=device) < self.prob, hue_shift,
+            torch.zeros_like(hue_shift))
+        h = (hsv[:, 0] + hue_shift) % 180
+        s = (hsv[:, 1] * saturation).clamp_(0, 255)
+        img = hsv_to_bgr(torch.stack([h, s, hsv[:, 2]], dim=1))
+
+        img = (img * torch.where(contrast_first, torch.ones_like(alpha),
+                                 alpha)).clamp_(0, 255)
+        return img, data_samples
+
+    def __repr__(self):
+        repr_str = self.__class__.__name__
+        repr_str += (f'(brightness_delta={self.brightness_delta}, '
+                     f'contrast_range=({self.contrast_lower}, '
+                     f'{self.contrast_upper}), '
+                     f'saturation_range=({self.saturation_lower}, '
+                     f'{self.saturation_upper}), '
+                     f'hue_delta={self.hue_delta}, prob={self.prob})')
+        return repr_str
+
+
+@MODELS.register_module()
+class BatchRandomFlip(nn.Module):
+    """Batched :class:`RandomFlip` on the training device.
+
+    Flips each sample of the stacked batch with probability ``prob`` together
+    with its segmentation maps in the data sample (e.g. the 16x16 PatchNet
+    label grid), which may have a different size than the image.
+
+    Args:
+        prob (float): The flipping probability. Defaults to 0.5.
+        direction (str): 'horizontal' or 'vertical'.
+            Defaults to 'horizontal'.
+    """
+
+    def __init__(self, prob: float = 0.5, direction: str = 'horizontal'):
+        super().__init__()
+        assert 0 <= prob <= 1
+        assert direction in ('horizontal', 'vertical')
+        self.prob = prob
+        self.direction = direction
+        self.dim = -1 if direction == 'horizontal' else -2
+
+    def forward(
+        self, inputs: Tensor, data_samples: List[SegDataSample]
+    ) -> Tuple[Tensor, List[SegDataSample]]:
+        """Flip a batch of images and their data samples.
+
+        Args:
+            inputs (Tensor): Images of shape (N, C, H, W).
+            data_samples (list[:obj:`SegDataSample`]): The data samples.
+
+        Returns:
+            tuple: The flipped images and data samples.
+        """
+        flip = torch.rand(inputs.size(0), device=inputs.device) < self.prob
+        inputs = torch.where(
+            flip.view(-1, 1, 1, 1), inputs.flip(self.dim), inputs)
+        for data_sample, flipped in zip(data_samples, flip.tolist()):
+            if flipped:
+                for key in SEG_FIELDS:
+                    if key in data_sample:
+                        seg = getattr(data_sample, key)
+                        seg.data = seg.data.flip(self.dim)
+            data_sample.set_metainfo(
+                dict(
+                    flip=flipped,
+                    flip_direction=self.direction if flipped else None))
+        return inputs, data_samples
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(prob={self.prob}, '
+                f"direction='{self.direction}')")
@@ -1,8 +1,9 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from numbers import Number
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import torch
+import torch.nn as nn
 from mmengine.model import BaseDataPreprocessor
 
 from mmseg.registry import MODELS
@@ -47,7 +48,12 @@ class SegDataPreProcessor(BaseDataPreprocessor):
             Defaults to False.
         rgb_to_bgr (bool): whether to convert image from RGB to RGB.
             Defaults to False.
-        batch_augments (list[dict], optional): Batch-level augmentations
+        batch_augments (list[dict], optional): Batch-level augmentations,
+            e.g. ``BatchPhotoMetricDistortion`` and ``BatchRandomFlip``.
+            During training they are applied in order to the stacked batch
+            of raw pixel values on the target device, before the color
+            conversion and normalization. All images of a batch must have
+            the same size. Defaults to None.
         test_cfg (dict, optional): The padding size config in testing, if not
             specify, will use `size` and `size_divisor` params as default.
             Defaults to None, only supports keys `size` or `size_divisor`.
@@ -89,8 +95,11 @@ class SegDataPreProcessor(BaseDataPreprocessor):
         else:
             self._enable_normalize = False
 
-        # TODO: support batch augmentations.
-        self.batch_augments = batch_augments
+        if batch_augments:
+            self.batch_augments = nn.ModuleList(
+                [MODELS.build(aug) for aug in batch_augments])
+        else:
+            self.batch_augments = None
 
         # Support different padding methods in testing
         self.test_cfg = test_cfg
@@ -109,6 +118,8 @@ class SegDataPreProcessor(BaseDataPreprocessor):
         data = self.cast_data(data)  # type: ignore
         inputs = data['inputs']
         data_samples = data.get('data_samples', None)
+        if training and self.batch_augments is not None:
+            inputs, data_samples = self._batch_augment(inputs, data_samples)
         # TODO: whether normalize should be after stack_batch
         if self.channel_conversion and inputs[0].size(0) == 3:
             inputs = [_input[[2, 1, 0], ...] for _input in inputs]
@@ -127,10 +138,6 @@ class SegDataPreProcessor(BaseDataPreprocessor):
                 size_divisor=self.size_divisor,
                 pad_val=self.pad_val,
                 seg_pad_val=self.seg_pad_val)
-
-            if self.batch_augments is not None:
-                inputs, data_samples = self.batch_augments(
-                    inputs, data_samples)
         else:
             img_size = inputs[0].shape[1:]
             assert all(input_.shape[1:] == img_size for input_ in inputs),  \
@@ -149,3 +156,15 @@ class SegDataPreProcessor(BaseDataPreprocessor):
                 inputs = torch.stack(inputs, dim=0)
 
         return dict(inputs=inputs, data_samples=data_samples)
+
+    def _batch_augment(self, inputs: List[torch.Tensor],
+                       data_samples: list) -> Tuple[List[torch.Tensor], list]:
+        """Run the batch augmentations on the stacked raw images."""
+        img_size = inputs[0].shape
+        assert all(input_.shape == img_size for input_ in inputs), \
+            'The image size in a batch should be the same to apply ' \
+            '`batch_augments`.'
+        batch_inputs = torch.stack(inputs).float()
+        for batch_aug in self.batch_augments:
+            batch_inputs, data_samples = batch_aug(batch_inputs, data_samples)
+        return list(batch_inputs.unbind(0)), data_samples
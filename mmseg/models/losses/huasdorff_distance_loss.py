@@ -4,10 +4,10 @@ master/code/train_LA_HD.py (Apache-2.0 License)"""
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from scipy.ndimage import distance_transform_edt as distance
 from torch import Tensor
 
 from mmseg.registry import MODELS
+from ..utils import distance_transform_edt
 from .utils import get_class_weight, weighted_loss
 
 
@@ -25,13 +25,10 @@ def compute_dtm(img_gt: Tensor, pred: Tensor) -> Tensor:
     """
 
     fg_dtm = torch.zeros_like(pred)
-    out_shape = pred.shape
-    for b in range(out_shape[0]):  # batch size
-        for c in range(1, out_shape[1]):  # default 0 channel is background
-            posmask = img_gt[b].byte()
-            if posmask.any():
-                posdis = distance(posmask)
-                fg_dtm[b][c] = torch.from_numpy(posdis)
+    # the map is the same for every class, computed once for the batch on
+    # the device of img_gt. Default 0 channel is background.
+    posdis = distance_transform_edt(img_gt.byte())
+    fg_dtm[:, 1:] = posdis.unsqueeze(1).to(fg_dtm)
 
     return fg_dtm
 
@@ -138,10 +135,10 @@ class HuasdorffDisstanceLoss(nn.Module):
         target = target * valid_mask
 
         with torch.no_grad():
-            gt_dtm = compute_dtm(target.cpu(), pred_soft)
+            gt_dtm = compute_dtm(target, pred_soft)
             gt_dtm = gt_dtm.float()
             seg_dtm2 = compute_dtm(
-                pred_soft.argmax(dim=1, keepdim=False).cpu(), pred_soft)
+                pred_soft.argmax(dim=1, keepdim=False), pred_soft)
             seg_dtm2 = seg_dtm2.float()
 
         loss_hd = self.loss_weight * hd_loss(
@@ -1,5 +1,7 @@
 import logging
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple, Union
+import mmcv
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -13,7 +15,7 @@ from .base import BaseSegmentor
 from mmseg.models.segmentors.base import BaseSegmentor
 from mmengine.structures import PixelData
 from mmseg.structures import SegDataSample
-from mmseg.models.utils import resize
+from mmseg.models.utils import PatchInputPreprocessor, resize
 
 
 @MODELS.register_module()
@@ -71,6 +73,9 @@ class Patch_EncoderDecoder(BaseSegmentor):
             Defaults to None.
         init_cfg (dict, optional): The weight initialized config for
             :class:`BaseModule`.
+        severity_thresholds (Sequence[float]): Thresholds on the sigmoid
+            corruption score separating clean, blur and blockage patches,
+            exactly 2 increasing values. Defaults to (0.33, 0.66).
     """  # noqa: E501
 
     def __init__(self,
@@ -83,8 +88,8 @@ class Patch_EncoderDecoder(BaseSegmentor):
                  data_preprocessor: OptConfigType = None,
                  pretrained: Optional[str] = None,
                  init_cfg: OptMultiConfig = None,
-                 corruption_threshold=0.3
-                 ):
+                 corruption_threshold=0.3,
+                 severity_thresholds: Sequence[float] = (0.33, 0.66)):
         super().__init__(
             data_preprocessor=data_preprocessor, init_cfg=init_cfg)
         if pretrained is not None:
@@ -99,9 +104,41 @@ class Patch_EncoderDecoder(BaseSegmentor):
         self.corruption_threshold=corruption_threshold
         self.train_cfg = train_cfg
         self.test_cfg = test_cfg
+        self._init_label_lut(severity_thresholds)
 
         assert self.with_decode_head
 
+    def _init_label_lut(self, severity_thresholds: Sequence[float]) -> None:
+        """Build the (severity, type) -> label look-up table.
+
+        The corruption score is bucketized into severities by
+        ``severity_thresholds`` (0: clean, 1: blur, 2: blockage, ...) and
+        combined with the contamination type predicted by the seg branch
+        (1: raindrop, 2: dust, 3: snow) into the 7 dataset classes
+        ``2 * (type - 1) + severity``. Clean patches and type 0 map to 0.
+        The classes only have blur and blockage, so exactly 2 thresholds
+        are supported.
+        """
+        assert len(severity_thresholds) == 2, \
+            'severity_thresholds should be (blur, blockage) thresholds, ' \
+            f'but got {severity_thresholds}'
+        assert list(severity_thresholds) == sorted(severity_thresholds), \
+            'severity_thresholds should be increasing'
+        num_severities = len(severity_thresholds) + 1
+        num_types = max(self.num_classes, 4)
+        severity = torch.arange(num_severities).view(-1, 1)
+        seg_type = torch.arange(num_types).view(1, -1)
+        label_lut = 2 * (seg_type - 1) + severity
+        valid = (severity > 0) & (seg_type >= 1) & (seg_type <= 3)
+        label_lut = torch.where(valid, label_lut, torch.zeros_like(label_lut))
+        self.num_types = num_types
+        self.register_buffer(
+            'severity_thresholds',
+            torch.tensor(severity_thresholds, dtype=torch.float32),
+            persistent=False)
+        self.register_buffer(
+            'label_lut', label_lut.view(-1).to(torch.uint8), persistent=False)
+
     def _init_decode_head(self, decode_head: ConfigType) -> None:
         """Initialize ``decode_head``"""
         self.decode_head = MODELS.build(decode_head)
@@ -133,27 +170,71 @@ class Patch_EncoderDecoder(BaseSegmentor):
         x = self.extract_feat(inputs)
         seg_out, corruption_outs = self.decode_head.predict(x, batch_img_metas,
                                               self.test_cfg)
-        prediction_result = torch.zeros_like(corruption_outs)
-        seg_out = seg_out.argmax(dim=1, keepdim=True)
-        corruption_outs = corruption_outs.sigmoid()
+        return self.fuse_labels(seg_out, corruption_outs)
+
+    def fuse_labels(self, seg_out: Tensor, corruption_outs: Tensor) -> Tensor:
+        """Fuse the type logits and corruption logits into patch labels.
+
+        Args:
+            seg_out (Tensor): Contamination type logits of shape
+                (N, num_classes, H, W).
+            corruption_outs (Tensor): Corruption logits of shape
+                (N, 1, H, W).
+
+        Returns:
+            Tensor: The patch labels with shape (N, 1, H, W) and dtype uint8.
+        """
+        # thresholds are compared in fp32 under autocast as well
+        return self.fuse_scores(seg_out, corruption_outs.float().sigmoid())
+
+    def fuse_scores(self, type_scores: Tensor, scores: Tensor) -> Tensor:
+        """Fuse type scores and sigmoid corruption scores into patch labels.
+
+        Unlike :meth:`fuse_labels` it takes the corruption scores after the
+        sigmoid, so that scores averaged over several predictions, e.g. by
+        :class:`SegTTAModel`, can be fused.
+
+        Args:
+            type_scores (Tensor): Contamination type logits or probabilities
+                of shape (N, num_classes, H, W).
+            scores (Tensor): Sigmoid corruption scores of shape
+                (N, 1, H, W).
+
+        Returns:
+            Tensor: The patch labels with shape (N, 1, H, W) and dtype uint8.
+        """
+        scores = scores.float().contiguous()
+        if torch.jit.is_tracing():
+            # bucketize has no ONNX symbolic, count the passed thresholds
+            thresholds = self.severity_thresholds.view(1, -1, 1, 1)
+            severity = (scores >= thresholds).sum(dim=1, keepdim=True)
+        else:
+            severity = torch.bucketize(
+                scores, self.severity_thresholds, right=True)
+        index = severity.mul_(self.num_types).add_(
+            type_scores.argmax(dim=1, keepdim=True))
+        return self.label_lut[index]
 
-        #Clean인 곳
-        mask_clean = (corruption_outs < 0.33)
-        prediction_result[mask_clean] = 0
+    def forward_labels(self, inputs: Tensor) -> Tuple[Tensor, Tensor]:
+        """Predict the patch labels and contamination scores of images.
 
-        #Blur인 곳
-        mask_Blur = (corruption_outs >= 0.33) & (corruption_outs < 0.66)
-        prediction_result[mask_Blur & (seg_out == 1)] = 1
-        prediction_result[mask_Blur & (seg_out == 2)] = 3
-        prediction_result[mask_Blur & (seg_out == 3)] = 5
+        A forward without image meta information that can be traced into a
+        single graph for deployment, see
+        ``tools/deployment/patchnet2export.py``.
 
-        #Blockage인 곳
-        mask_Blockage = (corruption_outs >= 0.66) & (corruption_outs <= 1)
-        prediction_result[mask_Blockage & (seg_out == 1)] = 2
-        prediction_result[mask_Blockage & (seg_out == 2)] = 4
-        prediction_result[mask_Blockage & (seg_out == 3)] = 6
+        Args:
+            inputs (Tensor): Normalized images with shape (N, 3, H, W).
 
-        return prediction_result
+        Returns:
+            tuple[Tensor, Tensor]: The patch labels with shape (N, 16, 16)
+            and dtype uint8, and the ratio of contaminated patches of each
+            image with shape (N, ).
+        """
+        x = self.extract_feat(inputs)
+        seg_out, corruption_outs = self.decode_head.forward(x)
+        labels = self.fuse_labels(seg_out, corruption_outs).squeeze(1)
+        scores = (labels > 0).flatten(1).float().mean(dim=1)
+        return labels, scores
 
     def _decode_head_forward_train(self, inputs: List[Tensor],
                                    data_samples: SampleList) -> dict:
@@ -322,6 +403,160 @@ class Patch_EncoderDecoder(BaseSegmentor):
         seg_logits = self.inference(inputs, batch_img_metas)
         return self.postprocess_result(seg_logits, data_samples)
 
+    def _frames_to_inputs(self,
+                          frames: Union[np.ndarray, Sequence[np.ndarray]],
+                          size: Optional[Tuple[int, int]] = None) -> Tensor:
+        """Stack BGR frames into a normalized NCHW tensor on the model device.
+
+        This applies the same channel conversion and normalization as
+        ``self.data_preprocessor`` without building ``SegDataSample`` or
+        running the test pipeline.
+
+        If ``test_cfg.preprocess`` is set, frames are resized straight to
+        ``preprocess.size`` with ``preprocess.interpolation`` and, on CPU,
+        resized and normalized in one pass by
+        :class:`PatchInputPreprocessor` unless ``preprocess.fused_normalize``
+        is False.
+        """
+        preprocessor = self.data_preprocessor
+        preprocess_cfg = (self.test_cfg or dict()).get('preprocess', None)
+        interpolation = 'bilinear'
+        if preprocess_cfg is not None:
+            size = size or tuple(preprocess_cfg['size'])
+            interpolation = preprocess_cfg.get('interpolation', 'bilinear')
+            if preprocess_cfg.get('fused_normalize', True) and \
+                    preprocessor.device.type == 'cpu':
+                patch_input = self._get_patch_input_preprocessor(
+                    tuple(size), interpolation)
+                return torch.from_numpy(patch_input(frames))
+
+        if size is not None:
+            frames = [
+                frame if frame.shape[1::-1] == tuple(size) else mmcv.imresize(
+                    frame, tuple(size), interpolation=interpolation)
+                for frame in frames
+            ]
+        if not isinstance(frames, np.ndarray):
+            assert all(frame.shape == frames[0].shape for frame in frames), \
+                'All frames should have the same shape, please set `size` ' \
+                'to resize them.'
+            frames = np.stack(frames)
+        assert frames.ndim == 4 and frames.shape[-1] == 3, \
+            f'frames should have shape (N, H, W, 3), but got {frames.shape}'
+
+        # move uint8 data to the device, it is 4x smaller than float32
+        inputs = torch.from_numpy(np.ascontiguousarray(frames)).to(
+            preprocessor.device)
+        inputs = inputs.permute(0, 3, 1, 2)
+        if getattr(preprocessor, 'channel_conversion', False):
+            inputs = inputs.flip(1)
+        inputs = inputs.float()
+        if getattr(preprocessor, '_enable_normalize', False):
+            inputs = (inputs - preprocessor.mean) / preprocessor.std
+        return inputs.contiguous()
+
+    def _get_patch_input_preprocessor(
+            self, size: Tuple[int, int],
+            interpolation: str) -> PatchInputPreprocessor:
+        """Get the fused resize and normalize step of the given input size."""
+        patch_input = getattr(self, '_patch_input', None)
+        if patch_input is None or patch_input.size != size or \
+                patch_input.interpolation != interpolation:
+            preprocessor = self.data_preprocessor
+            mean = std = None
+            if getattr(preprocessor, '_enable_normalize', False):
+                mean = preprocessor.mean.view(-1).tolist()
+                std = preprocessor.std.view(-1).tolist()
+            patch_input = PatchInputPreprocessor(
+                size,
+                mean=mean,
+                std=std,
+                bgr_to_rgb=getattr(preprocessor, 'channel_conversion', False),
+                interpolation=interpolation)
+            self._patch_input = patch_input
+        return patch_input
+
+    @torch.no_grad()
+    def predict_batch(self,
+                      frames: Union[np.ndarray, Sequence[np.ndarray]],
+                      size: Optional[Tuple[int, int]] = None,
+                      batch_size: Optional[int] = None) -> np.ndarray:
+        """Predict the patch label grids of a batch of frames.
+
+        A fast path for scoring videos and image folders. The frames are
+        stacked straight into a normalized tensor and the fused labels of
+        :meth:`encode_decode` are returned as an array, skipping the test
+        pipeline, ``SegDataSample``/``PixelData`` packing and
+        :meth:`postprocess_result`.
+
+        Args:
+            frames (np.ndarray | Sequence[np.ndarray]): BGR uint8 frames,
+                either an array of shape (N, H, W, 3) or a sequence of
+                (H, W, 3) arrays.
+            size (tuple[int], optional): Target size ``(w, h)`` that frames
+                are resized to before stacking. If None, ``size`` of
+                ``test_cfg.preprocess`` is used if set, otherwise all frames
+                must already have the same shape. Defaults to None.
+            batch_size (int, optional): Maximum number of frames of a forward
+                pass. Defaults to None, which forwards all frames at once.
+
+        Returns:
+            np.ndarray: The label grids with shape (N, 16, 16) and dtype
+            uint8.
+        """
+        num_frames = len(frames)
+        if num_frames == 0:
+            return np.zeros((0, 16, 16), dtype=np.uint8)
+        if batch_size is None:
+            batch_size = num_frames
+        results = []
+        for start in range(0, num_frames, batch_size):
+            inputs = self._frames_to_inputs(frames[start:start + batch_size],
+                                            size)
+            batch_img_metas = [
+                dict(
+                    ori_shape=inputs.shape[2:],
+                    img_shape=inputs.shape[2:],
+                    pad_shape=inputs.shape[2:],
+                    padding_size=[0, 0, 0, 0])
+            ] * inputs.shape[0]
+            labels = self.inference(inputs, batch_img_metas)
+            results.append(labels.round().squeeze(1).to(torch.uint8).cpu())
+        return torch.cat(results).numpy()
+
+    @torch.no_grad()
+    def predict_scores(
+            self,
+            frames: Union[np.ndarray, Sequence[np.ndarray]],
+            size: Optional[Tuple[int, int]] = None,
+            batch_size: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Predict the per-patch scores that :meth:`fuse_labels` turns into
+        labels.
+
+        Used to filter the scores over time before fusing them, e.g. for
+        video streams. The arguments are the same as :meth:`predict_batch`.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The contamination type
+            probabilities with shape (N, num_classes, 16, 16) and the sigmoid
+            corruption scores with shape (N, 16, 16), both float32.
+        """
+        num_frames = len(frames)
+        if num_frames == 0:
+            return (np.zeros((0, self.num_classes, 16, 16), dtype=np.float32),
+                    np.zeros((0, 16, 16), dtype=np.float32))
+        if batch_size is None:
+            batch_size = num_frames
+        type_probs, scores = [], []
+        for start in range(0, num_frames, batch_size):
+            inputs = self._frames_to_inputs(frames[start:start + batch_size],
+                                            size)
+            x = self.extract_feat(inputs)
+            seg_out, corruption_outs = self.decode_head.forward(x)
+            type_probs.append(seg_out.float().softmax(dim=1).cpu())
+            scores.append(corruption_outs.float().sigmoid().squeeze(1).cpu())
+        return torch.cat(type_probs).numpy(), torch.cat(scores).numpy()
+
     def _forward(self,
                  inputs: Tensor,
                  data_samples: OptSampleList = None) -> Tensor:
@@ -346,6 +581,15 @@ class Patch_EncoderDecoder(BaseSegmentor):
         If h_crop > h_img or w_crop > w_img, the small patch will be used to
         decode without padding.
 
+        The crops are forwarded together in batches of at most
+        ``test_cfg.max_crop_batch`` crops (all crops at once if not set).
+        Every crop yields a grid of type and corruption logits whose cells
+        cover ``crop_size / grid`` pixels, so the logits are accumulated into
+        one cell grid over the whole image with a single ``index_add_`` per
+        batch, with crop origins rounded to whole cells. Overlapping cells are
+        averaged, the grid is pooled to the patch grid of the image and fused
+        into labels as in :meth:`encode_decode`.
+
         Args:
             inputs (tensor): the tensor should have a shape NxCxHxW,
                 which contains all images in the batch.
@@ -356,18 +600,22 @@ class Patch_EncoderDecoder(BaseSegmentor):
                 `mmseg/datasets/pipelines/formatting.py:PackSegInputs`.
 
         Returns:
-            Tensor: The segmentation results, seg_logits from model of each
-                input image.
+            Tensor: The patch labels with shape (N, 1, H, W) and dtype uint8.
         """
+        seg_logits = self._slide_logits(inputs, batch_img_metas)
+        return self.fuse_labels(seg_logits[:, :-1], seg_logits[:, -1:])
 
+    def _slide_logits(self, inputs: Tensor,
+                      batch_img_metas: List[dict]) -> Tensor:
+        """The averaged type and corruption logits of
+        :meth:`slide_inference` before fusing, with shape
+        (N, num_classes + 1, H, W)."""
         h_stride, w_stride = self.test_cfg.stride
         h_crop, w_crop = self.test_cfg.crop_size
         batch_size, _, h_img, w_img = inputs.size()
-        out_channels = self.out_channels
         h_grids = max(h_img - h_crop + h_stride - 1, 0) // h_stride + 1
         w_grids = max(w_img - w_crop + w_stride - 1, 0) // w_stride + 1
-        preds = inputs.new_zeros((batch_size, out_channels, h_img, w_img))
-        count_mat = inputs.new_zeros((batch_size, 1, h_img, w_img))
+        windows = []
         for h_idx in range(h_grids):
             for w_idx in range(w_grids):
                 y1 = h_idx * h_stride
@@ -376,20 +624,55 @@ class Patch_EncoderDecoder(BaseSegmentor):
                 x2 = min(x1 + w_crop, w_img)
                 y1 = max(y2 - h_crop, 0)
                 x1 = max(x2 - w_crop, 0)
-                crop_img = inputs[:, :, y1:y2, x1:x2]
-                # change the image shape to patch shape
-                batch_img_metas[0]['img_shape'] = crop_img.shape[2:]
-                # the output of encode_decode is seg logits tensor map
-                # with shape [N, C, H, W]
-                crop_seg_logit = self.encode_decode(crop_img, batch_img_metas)
-                preds += F.pad(crop_seg_logit,
-                               (int(x1), int(preds.shape[3] - x2), int(y1),
-                                int(preds.shape[2] - y2)))
-
-                count_mat[:, :, y1:y2, x1:x2] += 1
+                windows.append((y1, y2, x1, x2))
+        max_crop_batch = self.test_cfg.get('max_crop_batch', None)
+        # each forward takes the same windows of all images in the batch
+        windows_per_batch = len(windows) if not max_crop_batch else max(
+            max_crop_batch // batch_size, 1)
+
+        preds = cell_index = None
+        indices = []
+        for start in range(0, len(windows), windows_per_batch):
+            batch_windows = windows[start:start + windows_per_batch]
+            crop_imgs = torch.cat([
+                inputs[:, :, y1:y2, x1:x2] for y1, y2, x1, x2 in batch_windows
+            ])
+            seg_out, corruption_outs = self.decode_head.forward(
+                self.extract_feat(crop_imgs))
+            crop_logits = torch.cat([seg_out, corruption_outs], dim=1).float()
+            num_logits, h_cells, w_cells = crop_logits.shape[1:]
+            if preds is None:
+                # all crops have the same size, clipped to the image
+                cell_h = min(h_crop, h_img) / h_cells
+                cell_w = min(w_crop, w_img) / w_cells
+                h_grid = max(round(h_img / cell_h), h_cells)
+                w_grid = max(round(w_img / cell_w), w_cells)
+                cell_index = (
+                    torch.arange(h_cells, device=inputs.device).view(-1, 1) *
+                    w_grid +
+                    torch.arange(w_cells, device=inputs.device)).view(-1)
+                preds = crop_logits.new_zeros(
+                    (batch_size, num_logits, h_grid * w_grid))
+            index = torch.cat([
+                cell_index +
+                min(round(y1 / cell_h), h_grid - h_cells) * w_grid +
+                min(round(x1 / cell_w), w_grid - w_cells)
+                for y1, _, x1, _ in batch_windows
+            ])
+            # (windows * N, C, h, w) -> (N, C, windows * h * w)
+            crop_logits = crop_logits.view(
+                len(batch_windows), batch_size, num_logits, -1)
+            crop_logits = crop_logits.permute(1, 2, 0, 3).reshape(
+                batch_size, num_logits, -1)
+            preds.index_add_(2, index, crop_logits)
+            indices.append(index)
+        count_mat = torch.bincount(
+            torch.cat(indices), minlength=preds.shape[2]).to(preds)
         assert (count_mat == 0).sum() == 0
-        seg_logits = preds / count_mat
-
+        seg_logits = (preds / count_mat).view(batch_size, num_logits, h_grid,
+                                              w_grid)
+        if (h_grid, w_grid) != (h_cells, w_cells):
+            seg_logits = F.adaptive_avg_pool2d(seg_logits, (h_cells, w_cells))
         return seg_logits
 
     def whole_inference(self, inputs: Tensor,
@@ -443,6 +726,30 @@ class Patch_EncoderDecoder(BaseSegmentor):
             seg_logit = self.whole_inference(inputs, batch_img_metas)
         return seg_logit
 
+    def inference_logits(self, inputs: Tensor,
+                         batch_img_metas: List[dict]) -> Tensor:
+        """The raw type and corruption logits of :meth:`inference`.
+
+        The labels of :meth:`inference` can not be averaged, so test-time
+        augmentation (:class:`SegTTAModel`) merges these logits and fuses the
+        result with :meth:`fuse_scores`.
+
+        Args:
+            inputs (Tensor): The input image of shape (N, 3, H, W).
+            batch_img_metas (List[dict]): List of image metainfo.
+
+        Returns:
+            Tensor: The type logits and the corruption logit concatenated
+            along the channels, with shape (N, num_classes + 1, h, w) and
+            dtype float32.
+        """
+        if self.test_cfg.get('mode', 'whole') == 'slide':
+            return self._slide_logits(inputs, batch_img_metas)
+        x = self.extract_feat(inputs)
+        seg_out, corruption_outs = self.decode_head.predict(
+            x, batch_img_metas, self.test_cfg)
+        return torch.cat([seg_out, corruption_outs], dim=1).float()
+
     def aug_test(self, inputs, batch_img_metas, rescale=True):
         """Test with augmentations.
 
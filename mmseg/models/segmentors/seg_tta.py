@@ -1,16 +1,195 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-from typing import List
+from collections import defaultdict
+from typing import Dict, List, Optional, Union
 
 import torch
+import torch.nn as nn
 from mmengine.model import BaseTTAModel
 from mmengine.structures import PixelData
+from torch import Tensor
 
 from mmseg.registry import MODELS
 from mmseg.utils import SampleList
+from ..utils import resize
+from .depth_estimator import DepthEstimator
+from .patch_encoder_decoder import Patch_EncoderDecoder
 
 
 @MODELS.register_module()
 class SegTTAModel(BaseTTAModel):
+    """Test-time augmentation of segmentors.
+
+    Instead of running :meth:`test_step` of the module once per augmented
+    view and merging the post-processed ``SegDataSample`` of the views,
+    the views with the same input shapes (e.g. the flipped and unflipped
+    views of a scale) are forwarded in one batch. Their logits are cropped
+    to the unpadded image, unflipped and resized to the original shape on
+    the device and their probabilities are added to one accumulator per
+    image.
+
+    :class:`Patch_EncoderDecoder` predicts fused labels that can not be
+    averaged. For it the type probabilities and corruption scores of the
+    views are averaged on the patch grid and fused into labels afterwards
+    by :meth:`Patch_EncoderDecoder.fuse_scores`.
+
+    Modules without ``inference`` and depth estimators fall back to
+    :meth:`BaseTTAModel.test_step` and :meth:`merge_preds`.
+
+    Args:
+        module (dict or nn.Module): Tested model.
+        data_preprocessor (dict or nn.Module, optional): If the model does
+            not define ``data_preprocessor``, it will be the default value
+            for the model.
+        max_batch_pixels (int, optional): The maximum number of input pixels
+            (N * H * W) of a forward, to bound the memory of large views.
+            At least one image is forwarded at a time. Defaults to None,
+            which forwards all views of the same shape at once.
+    """
+
+    def __init__(self,
+                 module: Union[dict, nn.Module],
+                 data_preprocessor: Union[dict, nn.Module, None] = None,
+                 max_batch_pixels: Optional[int] = None):
+        super().__init__(module, data_preprocessor)
+        self.max_batch_pixels = max_batch_pixels
+
+    def test_step(self, data):
+        """Get the merged predictions of the augmented data.
+
+        Args:
+            data (dict): Augmented data batch sampled from the dataloader,
+                ``inputs`` and ``data_samples`` are lists of the batches of
+                every augmentation.
+
+        Returns:
+            SampleList: Merged predictions.
+        """
+        if not isinstance(data, dict) or \
+                not hasattr(self.module, 'inference') or \
+                isinstance(self.module, DepthEstimator):
+            return super().test_step(data)
+
+        num_augs = len(data['inputs'])
+        # group the augmentations by the input shapes of all images, e.g.
+        # the flips of a scale, so that they are padded to the same shape
+        groups = defaultdict(list)
+        for idx, inputs in enumerate(data['inputs']):
+            shapes = tuple(tuple(img.shape[-2:]) for img in inputs)
+            groups[shapes].append(idx)
+
+        accumulators: Dict[int, Tensor] = {}
+        grid_shape = None
+        for aug_indices in groups.values():
+            inputs, data_samples, image_indices = [], [], []
+            for idx in aug_indices:
+                aug_data = self.module.data_preprocessor(
+                    dict(
+                        inputs=data['inputs'][idx],
+                        data_samples=data['data_samples'][idx]), False)
+                inputs.append(aug_data['inputs'])
+                data_samples.extend(aug_data['data_samples'])
+                image_indices.extend(range(len(aug_data['inputs'])))
+            inputs = torch.cat(inputs)
+
+            num_pixels = inputs.shape[2] * inputs.shape[3]
+            batch_size = len(inputs) if self.max_batch_pixels is None else \
+                max(self.max_batch_pixels // num_pixels, 1)
+            for start in range(0, len(inputs), batch_size):
+                end = start + batch_size
+                batch_img_metas = [
+                    data_sample.metainfo
+                    for data_sample in data_samples[start:end]
+                ]
+                if isinstance(self.module, Patch_EncoderDecoder):
+                    seg_logits = self.module.inference_logits(
+                        inputs[start:end], batch_img_metas)
+                    # the patch grid does not depend on the input size
+                    if grid_shape is None:
+                        grid_shape = seg_logits.shape[2:]
+                    out_shapes = [grid_shape] * len(seg_logits)
+                else:
+                    seg_logits = self.module.inference(inputs[start:end],
+                                                       batch_img_metas)
+                    out_shapes = [
+                        img_meta['ori_shape'] for img_meta in batch_img_metas
+                    ]
+                self._accumulate(accumulators, seg_logits, inputs.shape[2:],
+                                 batch_img_metas, out_shapes,
+                                 image_indices[start:end])
+
+        predictions = []
+        for image_idx, data_sample in enumerate(data['data_samples'][0]):
+            probs = accumulators[image_idx] / num_augs
+            if isinstance(self.module, Patch_EncoderDecoder):
+                seg_pred = self.module.fuse_scores(probs[None, :-1],
+                                                   probs[None, -1:])[0]
+            elif self.module.out_channels == 1:
+                threshold = self.module.decode_head.threshold
+                seg_pred = (probs > threshold).to(probs)
+            else:
+                seg_pred = probs.argmax(dim=0, keepdim=True)
+            data_sample.set_data({
+                'seg_logits': PixelData(data=probs),
+                'pred_sem_seg': PixelData(data=seg_pred)
+            })
+            predictions.append(data_sample)
+        return predictions
+
+    def _accumulate(self, accumulators: Dict[int, Tensor], seg_logits: Tensor,
+                    input_shape: torch.Size, batch_img_metas: List[dict],
+                    out_shapes: List[tuple], image_indices: List[int]):
+        """Undo the augmentations of a batch of views and add their
+        probabilities to the accumulators of their images."""
+        rows = defaultdict(list)
+        for row, image_idx in enumerate(image_indices):
+            rows[image_idx].append(row)
+        H, W = input_shape
+        h, w = seg_logits.shape[2:]
+        for image_idx, image_rows in rows.items():
+            # views of an image in a batch have the same scale and padding
+            img_meta = batch_img_metas[image_rows[0]]
+            logits = seg_logits[image_rows]
+            padding_size = img_meta.get('img_padding_size',
+                                        img_meta.get('padding_size', [0] * 4))
+            # padding is given in input pixels, logits may be smaller
+            left, right, top, bottom = padding_size
+            left, right = round(left * w / W), round(right * w / W)
+            top, bottom = round(top * h / H), round(bottom * h / H)
+            logits = logits[:, :, top:h - bottom, left:w - right]
+            for direction, dim in (('horizontal', 3), ('vertical', 2)):
+                flipped = [
+                    i for i, row in enumerate(image_rows)
+                    if batch_img_metas[row].get('flip', False)
+                    and batch_img_metas[row].get('flip_direction') == direction
+                ]
+                if flipped:
+                    # indexing by rows copied the logits, flip in place
+                    logits[flipped] = logits[flipped].flip(dims=(dim, ))
+            out_shape = tuple(out_shapes[image_rows[0]][:2])
+            if tuple(logits.shape[2:]) != out_shape:
+                logits = resize(
+                    logits,
+                    size=out_shape,
+                    mode='bilinear',
+                    align_corners=self.module.align_corners,
+                    warning=False)
+            probs = self._to_probs(logits).sum(dim=0)
+            if image_idx in accumulators:
+                accumulators[image_idx] += probs
+            else:
+                accumulators[image_idx] = probs
+
+    def _to_probs(self, logits: Tensor) -> Tensor:
+        """Probabilities of logits of shape (N, C, H, W) to average."""
+        logits = logits.float()
+        if isinstance(self.module, Patch_EncoderDecoder):
+            # type probabilities and the sigmoid corruption score
+            return torch.cat(
+                [logits[:, :-1].softmax(dim=1), logits[:, -1:].sigmoid()],
+                dim=1)
+        if self.module.out_channels > 1:
+            return logits.softmax(dim=1)
+        return logits.sigmoid()
 
     def merge_preds(self, data_samples_list: List[SampleList]) -> SampleList:
         """Merge predictions of enhanced data to one prediction.
@@ -24,14 +203,17 @@ class SegTTAModel(BaseTTAModel):
         """
         predictions = []
         for data_samples in data_samples_list:
-            seg_logits = data_samples[0].seg_logits.data
-            logits = torch.zeros(seg_logits.shape).to(seg_logits)
+            logits = None
             for data_sample in data_samples:
                 seg_logit = data_sample.seg_logits.data
                 if self.module.out_channels > 1:
-                    logits += seg_logit.softmax(dim=0)
+                    probs = seg_logit.softmax(dim=0)
+                else:
+                    probs = seg_logit.sigmoid()
+                if logits is None:
+                    logits = probs
                 else:
-                    logits += seg_logit.sigmoid()
+                    logits += probs
             logits /= len(data_samples)
             if self.module.out_channels == 1:
                 seg_pred = (logits > self.module.decode_head.threshold
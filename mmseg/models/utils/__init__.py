@@ -1,9 +1,13 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+from .attention import (SDPAMultiheadAttention, check_attn_impl,
+                        sdpa_multihead_attention)
 from .basic_block import BasicBlock, Bottleneck
+from .distance_transform import distance_transform_edt
 from .embed import PatchEmbed
 from .encoding import Encoding
 from .inverted_residual import InvertedResidual, InvertedResidualV3
 from .make_divisible import make_divisible
+from .patch_input import PatchInputPreprocessor
 from .point_sample import get_uncertain_point_coords_with_randomness
 from .ppm import DAPPM, PAPPM
 from .res_layer import ResLayer
@@ -11,6 +15,7 @@ from .se_layer import SELayer
 from .self_attention_block import SelfAttentionBlock
 from .shape_convert import (nchw2nlc2nchw, nchw_to_nlc, nlc2nchw2nlc,
                             nlc_to_nchw)
+from .tensor_cache import TensorCache
 from .up_conv_block import UpConvBlock
 
 # isort: off
@@ -23,5 +28,7 @@ __all__ = [
     'nchw_to_nlc', 'nlc_to_nchw', 'nchw2nlc2nchw', 'nlc2nchw2nlc', 'Encoding',
     'Upsample', 'resize', 'DAPPM', 'PAPPM', 'BasicBlock', 'Bottleneck',
     'cross_attn_layer', 'LayerNorm2d', 'MLP',
-    'get_uncertain_point_coords_with_randomness'
+    'get_uncertain_point_coords_with_randomness', 'PatchInputPreprocessor',
+    'TensorCache', 'SDPAMultiheadAttention', 'check_attn_impl',
+    'sdpa_multihead_attention', 'distance_transform_edt'
 ]
@@ -0,0 +1,119 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from typing import Optional
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from mmcv.cnn.bricks.transformer import MultiheadAttention
+from mmengine.utils import digit_version
+from torch import Tensor
+
+ATTN_IMPLS = ('math', 'sdpa')
+
+
+def check_attn_impl(attn_impl: str) -> None:
+    """Check the attention implementation of a transformer backbone.
+
+    'math' computes the attention step by step as the original
+    implementation. 'sdpa' calls ``F.scaled_dot_product_attention``, which
+    dispatches to the fused flash/memory-efficient kernels (on CPU as well)
+    and does not materialize the attention weights when it can.
+
+    Args:
+        attn_impl (str): 'math' or 'sdpa'.
+    """
+    assert attn_impl in ATTN_IMPLS, \
+        f'attn_impl should be one of {ATTN_IMPLS}, but got {attn_impl}'
+    if attn_impl == 'sdpa':
+        assert digit_version(torch.__version__) >= digit_version('2.1'), \
+            'attn_impl="sdpa" requires PyTorch >= 2.1'
+
+
+def sdpa_multihead_attention(attn: nn.MultiheadAttention, query: Tensor,
+                             key: Tensor, value: Tensor) -> Tensor:
+    """``nn.MultiheadAttention`` forward with the fused attention kernel.
+
+    The input and output projections use the weights of ``attn``, so the
+    result matches ``attn(query, key, value)[0]`` and checkpoints are shared
+    between both paths.
+
+    Args:
+        attn (nn.MultiheadAttention): The attention module.
+        query (Tensor): Query of shape (B, L, C).
+        key (Tensor): Key of shape (B, S, C).
+        value (Tensor): Value of shape (B, S, C).
+
+    Returns:
+        Tensor: The output of shape (B, L, C).
+    """
+    assert attn._qkv_same_embed_dim and attn.bias_k is None and \
+        not attn.add_zero_attn, \
+        'only the default nn.MultiheadAttention is supported'
+    B, L, C = query.shape
+    num_heads = attn.num_heads
+    weight, bias = attn.in_proj_weight, attn.in_proj_bias
+    if query is key and key is value:
+        q, k, v = F.linear(query, weight, bias).chunk(3, dim=-1)
+    else:
+        w_q, w_kv = weight.split([C, 2 * C])
+        b_q = b_kv = None
+        if bias is not None:
+            b_q, b_kv = bias.split([C, 2 * C])
+        q = F.linear(query, w_q, b_q)
+        if key is value:
+            k, v = F.linear(key, w_kv, b_kv).chunk(2, dim=-1)
+        else:
+            w_k, w_v = w_kv.chunk(2)
+            b_k = b_v = None
+            if b_kv is not None:
+                b_k, b_v = b_kv.chunk(2)
+            k = F.linear(key, w_k, b_k)
+            v = F.linear(value, w_v, b_v)
+    # (B, num_heads, L, head_dims)
+    q, k, v = (
+        t.unflatten(-1, (num_heads, -1)).transpose(1, 2) for t in (q, k, v))
+    out = F.scaled_dot_product_attention(
+        q, k, v, dropout_p=attn.dropout if attn.training else 0.)
+    out = out.transpose(1, 2).reshape(B, L, C)
+    return F.linear(out, attn.out_proj.weight, attn.out_proj.bias)
+
+
+class SDPAMultiheadAttention(MultiheadAttention):
+    """``MultiheadAttention`` of mmcv running on
+    ``F.scaled_dot_product_attention``.
+
+    It has the same arguments and parameters as the mmcv module and falls
+    back to it when masks or positional encodings are given.
+    """
+
+    def forward(self,
+                query: Tensor,
+                key: Optional[Tensor] = None,
+                value: Optional[Tensor] = None,
+                identity: Optional[Tensor] = None,
+                query_pos: Optional[Tensor] = None,
+                key_pos: Optional[Tensor] = None,
+                attn_mask: Optional[Tensor] = None,
+                key_padding_mask: Optional[Tensor] = None,
+                **kwargs) -> Tensor:
+        if attn_mask is not None or key_padding_mask is not None or \
+                query_pos is not None or key_pos is not None:
+            return super().forward(query, key, value, identity, query_pos,
+                                   key_pos, attn_mask, key_padding_mask,
+                                   **kwargs)
+        if key is None:
+            key = query
+        if value is None:
+            value = key
+        if identity is None:
+            identity = query
+        if not self.batch_first:
+            # keep shared inputs shared, the projections are fused for them
+            key_t = key.transpose(0, 1)
+            value = key_t if value is key else value.transpose(0, 1)
+            query = key_t if query is key else query.transpose(0, 1)
+            key = key_t
+        out = sdpa_multihead_attention(self.attn, query, key, value)
+        if not self.batch_first:
+            out = out.transpose(0, 1)
+        return identity + self.dropout_layer(self.proj_drop(out))
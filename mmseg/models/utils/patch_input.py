@@ -0,0 +1,81 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from typing import Optional, Sequence, Tuple, Union
+
+import cv2
+import mmcv
+import numpy as np
+
+
+class PatchInputPreprocessor:
+    """Resize BGR frames to the network input and normalize them in one pass.
+
+    PatchNet only predicts a coarse label grid, so frames can be resized
+    straight to the network input size instead of going through the
+    full-resolution ``Resize`` of the test pipeline. Channel conversion and
+    ``(x - mean) / std`` are folded into a per-channel 256 entry float
+    look-up table, which ``cv2.LUT`` applies while converting the resized
+    uint8 frame to float32. The planes are then written into the NCHW output
+    in the channel order expected by the model.
+
+    Args:
+        size (tuple[int]): Network input size ``(w, h)``.
+        mean (Sequence[float], optional): The pixel mean of R, G, B channels.
+            Defaults to None, which skips normalization.
+        std (Sequence[float], optional): The pixel standard deviation of R, G,
+            B channels. Defaults to None.
+        bgr_to_rgb (bool): Whether to convert the BGR frames to RGB.
+            Defaults to False.
+        interpolation (str): Interpolation method of ``mmcv.imresize``.
+            ``'area'`` gives anti-aliased results when shrinking frames by a
+            large factor. Defaults to 'bilinear'.
+    """
+
+    def __init__(self,
+                 size: Tuple[int, int],
+                 mean: Optional[Sequence[float]] = None,
+                 std: Optional[Sequence[float]] = None,
+                 bgr_to_rgb: bool = False,
+                 interpolation: str = 'bilinear'):
+        assert len(size) == 2, f'size should be (w, h), but got {size}'
+        self.size = tuple(size)
+        self.interpolation = interpolation
+        self.bgr_to_rgb = bgr_to_rgb
+        # output channel c is read from input channel src_channels[c]
+        self.src_channels = (2, 1, 0) if bgr_to_rgb else (0, 1, 2)
+        values = np.arange(256, dtype=np.float64)
+        lut = np.stack([values] * 3, axis=1)
+        if mean is not None:
+            assert std is not None, 'std should be set together with mean'
+            # mean and std are given in the output channel order
+            for out_c, src_c in enumerate(self.src_channels):
+                lut[:, src_c] = (values - mean[out_c]) / std[out_c]
+        self._lut = np.ascontiguousarray(lut[None].astype(np.float32))
+
+    def __call__(self,
+                 frames: Union[np.ndarray, Sequence[np.ndarray]],
+                 out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Preprocess a batch of frames.
+
+        Args:
+            frames (np.ndarray | Sequence[np.ndarray]): BGR uint8 frames,
+                either an array of shape (N, H, W, 3) or a sequence of
+                (H, W, 3) arrays of any size.
+            out (np.ndarray, optional): Output buffer of shape (N, 3, h, w)
+                and dtype float32. Defaults to None.
+
+        Returns:
+            np.ndarray: Normalized inputs of shape (N, 3, h, w).
+        """
+        w, h = self.size
+        if out is None:
+            out = np.empty((len(frames), 3, h, w), dtype=np.float32)
+        for i, frame in enumerate(frames):
+            assert frame.dtype == np.uint8 and frame.ndim == 3, \
+                'frames should be uint8 arrays of shape (H, W, 3)'
+            if frame.shape[1::-1] != self.size:
+                frame = mmcv.imresize(
+                    frame, self.size, interpolation=self.interpolation)
+            normalized = cv2.LUT(frame, self._lut)
+            for out_c, src_c in enumerate(self.src_channels):
+                out[i, out_c] = normalized[..., src_c]
+        return out
@@ -0,0 +1,77 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from collections import OrderedDict
+from typing import Callable, Hashable, Sequence
+
+import torch
+from torch import Tensor
+
+
+class TensorCache:
+    """A small LRU cache of tensors computed from parameters.
+
+    Some inputs of a forward pass only depend on the parameters and the input
+    resolution, e.g. position embeddings resized to the feature size or the
+    gathered relative position bias. They are constant at inference and can
+    be computed once per resolution.
+
+    An entry is looked up by ``key`` and the state of ``params``: the
+    parameter objects, their version counters, devices and dtypes. In-place
+    updates (optimizer steps, ``load_state_dict``) bump the version counter
+    and replacing a parameter (``.to()``, ``.half()``) changes the object, so
+    stale entries are never returned. Nothing is cached while gradients flow
+    into one of the parameters, as the result is part of the autograd graph.
+
+    Modules owning a cache should clear it in ``_apply`` to free the entries
+    of replaced parameters.
+
+    Args:
+        max_size (int): Maximum number of entries. Default: 8.
+
+    Examples:
+        >>> cache = TensorCache()
+        >>> table = torch.nn.Parameter(torch.randn(4, 2))
+        >>> with torch.no_grad():
+        ...     doubled = cache.get('doubled', (table, ), lambda: table * 2)
+        ...     assert cache.get('doubled', (table, ), None) is doubled
+    """
+
+    def __init__(self, max_size: int = 8):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get(self, key: Hashable, params: Sequence[Tensor],
+            compute: Callable[[], Tensor]) -> Tensor:
+        """Get the cached result of ``compute`` or compute and cache it.
+
+        Args:
+            key (Hashable): The key of the result apart from the parameters,
+                e.g. the feature size.
+            params (Sequence[Tensor]): The parameters the result depends on.
+            compute (Callable): Computes the result without arguments.
+
+        Returns:
+            Tensor: The result.
+        """
+        if torch.is_grad_enabled() and any(p.requires_grad for p in params):
+            return compute()
+        # tensors made under inference mode can not be used in autograd
+        key = (key, torch.is_inference_mode_enabled())
+        state = tuple((p._version, p.device, p.dtype) for p in params)
+        entry = self._entries.get(key)
+        # the entry holds the parameters, so their ids can not be reused
+        if entry is not None and entry[1] == state and all(
+                a is b for a, b in zip(entry[0], params)):
+            self._entries.move_to_end(key)
+            return entry[2]
+        value = compute()
+        self._entries[key] = (tuple(params), state, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return value
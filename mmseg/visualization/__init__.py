@@ -1,4 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+from .display_resizer import DisplayResizer
 from .local_visualizer import SegLocalVisualizer
+from .patch_overlay import PatchOverlayRenderer
 
-__all__ = ['SegLocalVisualizer']
+__all__ = ['SegLocalVisualizer', 'PatchOverlayRenderer', 'DisplayResizer']
@@ -0,0 +1,84 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+
+class DisplayResizer:
+    """Shrink frames to a display size into reused buffers.
+
+    Reductions by 2x or more are done by repeated 2x ``INTER_AREA`` halving,
+    which OpenCV runs as a fast 2x2 box filter, and the remaining factor
+    below 2 by a bilinear resize. No source pixel is skipped, so the result
+    is close to a smooth (area) resize at a fraction of its cost.
+
+    The intermediate and output arrays are kept between calls and only
+    reallocated when the frame or target size changes.
+
+    Examples:
+        >>> import numpy as np
+        >>> from mmseg.visualization import DisplayResizer
+        >>> resizer = DisplayResizer()
+        >>> img = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        >>> size = DisplayResizer.fit_size((1920, 1080), (640, 480))
+        >>> resizer(img, size).shape
+        (360, 640, 3)
+    """
+
+    def __init__(self):
+        self._buffers: List[np.ndarray] = []
+
+    @staticmethod
+    def fit_size(frame_size: Tuple[int, int],
+                 box_size: Tuple[float, float]) -> Tuple[int, int]:
+        """The largest ``(w, h)`` of the frame aspect ratio within a box.
+
+        Args:
+            frame_size (tuple[int]): Frame size ``(w, h)``.
+            box_size (tuple[float]): Display box size ``(w, h)``.
+        """
+        frame_w, frame_h = frame_size
+        scale = min(box_size[0] / frame_w, box_size[1] / frame_h)
+        return max(1, round(frame_w * scale)), max(1, round(frame_h * scale))
+
+    def _get_buffer(self, index: int, width: int, height: int,
+                    frame: np.ndarray) -> np.ndarray:
+        shape = (height, width) + frame.shape[2:]
+        while len(self._buffers) <= index:
+            self._buffers.append(None)
+        buffer = self._buffers[index]
+        if buffer is None or buffer.shape != shape \
+                or buffer.dtype != frame.dtype:
+            buffer = np.empty(shape, dtype=frame.dtype)
+            self._buffers[index] = buffer
+        return buffer
+
+    def __call__(self, frame: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+        """Resize a frame to ``size``.
+
+        Args:
+            frame (np.ndarray): Image of shape (H, W) or (H, W, C).
+            size (tuple[int]): Target size ``(w, h)``.
+
+        Returns:
+            np.ndarray: The resized frame. It is a buffer of the resizer and
+            is overwritten by the next call.
+        """
+        width, height = size
+        src = frame
+        index = 1
+        while src.shape[1] >= 2 * width and src.shape[0] >= 2 * height:
+            half_w, half_h = src.shape[1] // 2, src.shape[0] // 2
+            dst = self._get_buffer(index, half_w, half_h, frame)
+            cv2.resize(
+                src, (half_w, half_h), dst=dst, interpolation=cv2.INTER_AREA)
+            src = dst
+            index += 1
+        out = self._get_buffer(0, width, height, frame)
+        if src.shape[:2] == (height, width):
+            np.copyto(out, src)
+        else:
+            cv2.resize(
+                src, (width, height), dst=out, interpolation=cv2.INTER_LINEAR)
+        return out
@@ -0,0 +1,159 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# label -> (BGR color, alpha) of the contamination overlay used by the GUI.
+DEFAULT_PATCH_STYLES = {
+    1: ((180, 98, 0), 0.5),
+    2: ((95, 44, 0), 0.7),
+}
+
+# ``INTER_NEAREST`` may pick the previous source pixel on patch boundaries
+# because of floating point rounding, ``INTER_NEAREST_EXACT`` does not.
+_NEAREST = getattr(cv2, 'INTER_NEAREST_EXACT', cv2.INTER_NEAREST)
+
+
+class PatchOverlayRenderer:
+    """Blend a coarse patch label grid onto a full resolution image.
+
+    The label grid predicted by PatchNet (16x16 by default) is converted to
+    per-patch inverse alpha and pre-multiplied color look-up tables, which are
+    upsampled to the patch region of the frame and blended with it in two
+    full-frame OpenCV operations:
+
+    .. code:: text
+
+        out = img * (1 - alpha) + color * alpha
+
+    Every patch covers ``(H // grid_h, W // grid_w)`` pixels starting from the
+    top-left corner. Remaining border pixels, as well as patches whose label
+    has no style, are left untouched. This matches blending each patch with
+    ``cv2.addWeighted`` up to rounding.
+
+    The upsampled planes are written into buffers that are cached per frame
+    resolution, so that playing a video does not allocate per frame.
+
+    Args:
+        styles (dict, optional): Mapping from label to ``(color, alpha)``
+            where ``color`` is a BGR tuple and ``alpha`` the opacity of the
+            color in ``[0, 1]``. Defaults to ``DEFAULT_PATCH_STYLES``.
+        grid_size (tuple[int]): Size ``(h, w)`` of the label grid.
+            Defaults to (16, 16).
+        max_cache_size (int): Number of frame resolutions whose buffers are
+            cached. Defaults to 4.
+
+    Examples:
+        >>> import numpy as np
+        >>> from mmseg.visualization import PatchOverlayRenderer
+        >>> renderer = PatchOverlayRenderer()
+        >>> img = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        >>> seg_map = np.random.randint(0, 3, (16, 16))
+        >>> vis_img = renderer.render(img, seg_map)
+    """
+
+    def __init__(self,
+                 styles: Optional[Dict[int, Tuple[Sequence[int],
+                                                  float]]] = None,
+                 grid_size: Tuple[int, int] = (16, 16),
+                 max_cache_size: int = 4):
+        if styles is None:
+            styles = DEFAULT_PATCH_STYLES
+        assert len(grid_size) == 2, \
+            f'grid_size should be (h, w), but got {grid_size}'
+        self.grid_size = tuple(grid_size)
+        self.max_cache_size = max_cache_size
+        self._buffer_cache: Dict[Tuple[int, int], Tuple[np.ndarray,
+                                                        np.ndarray]] = dict()
+        self.set_styles(styles)
+
+    def set_styles(self, styles: Dict[int, Tuple[Sequence[int],
+                                                 float]]) -> None:
+        """Rebuild the label look-up tables.
+
+        Args:
+            styles (dict): Mapping from label to ``(color, alpha)``.
+        """
+        num_labels = max(styles.keys()) + 1 if len(styles) else 1
+        # unstyled labels keep the image: inverse alpha 255 and no color
+        inv_alpha_lut = np.full((num_labels, 3), 255, dtype=np.uint8)
+        color_lut = np.zeros((num_labels, 3), dtype=np.uint8)
+        for label, (color, alpha) in styles.items():
+            assert label >= 0, f'label should be non-negative, got {label}'
+            assert 0 <= alpha <= 1, f'alpha should be in [0, 1], got {alpha}'
+            inv_alpha_lut[label] = np.rint((1 - alpha) * 255)
+            color_lut[label] = np.rint(
+                np.asarray(color[:3], dtype=np.float64) * alpha)
+        self.styles = dict(styles)
+        self._inv_alpha_lut = inv_alpha_lut
+        self._color_lut = color_lut
+
+    def _get_buffers(self, height: int,
+                     width: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the cached upsampling buffers of a patch region size."""
+        key = (height, width)
+        buffers = self._buffer_cache.get(key)
+        if buffers is None:
+            if len(self._buffer_cache) >= self.max_cache_size:
+                self._buffer_cache.pop(next(iter(self._buffer_cache)))
+            buffers = (np.empty((height, width, 3), dtype=np.uint8),
+                       np.empty((height, width, 3), dtype=np.uint8))
+            self._buffer_cache[key] = buffers
+        return buffers
+
+    def render(self,
+               image: np.ndarray,
+               seg_map: np.ndarray,
+               out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Draw the patch labels onto an image.
+
+        Args:
+            image (np.ndarray): The BGR image to draw on with shape (H, W, 3)
+                and dtype uint8.
+            seg_map (np.ndarray): The label grid with shape ``grid_size``.
+            out (np.ndarray, optional): Output buffer with the same shape and
+                dtype as ``image``. It may be ``image`` itself to blend in
+                place. Defaults to None, which allocates a new image.
+
+        Returns:
+            np.ndarray: The blended image.
+        """
+        assert image.ndim == 3 and image.shape[2] == 3, \
+            f'image should have shape (H, W, 3), but got {image.shape}'
+        grid_h, grid_w = self.grid_size
+        seg_map = np.asarray(seg_map)
+        assert seg_map.size == grid_h * grid_w, \
+            f'seg_map should have {self.grid_size} patches, ' \
+            f'but got {seg_map.shape}'
+        # predictions may come as float tensors converted to numpy
+        seg_map = seg_map.reshape(grid_h, grid_w).astype(np.intp)
+        if out is None:
+            out = image.copy()
+        elif out is not image:
+            out[...] = image
+
+        num_labels = len(self._color_lut)
+        styled = (seg_map >= 0) & (seg_map < num_labels)
+        styled[styled] = self._inv_alpha_lut[seg_map[styled], 0] != 255
+        patch_h, patch_w = image.shape[0] // grid_h, image.shape[1] // grid_w
+        if not styled.any() or patch_h == 0 or patch_w == 0:
+            return out
+        labels = np.where(styled, seg_map, 0)
+        inv_alpha = np.where(styled[..., None], self._inv_alpha_lut[labels],
+                             255).astype(np.uint8)
+        color = self._color_lut[labels] * styled[..., None].astype(np.uint8)
+
+        height, width = patch_h * grid_h, patch_w * grid_w
+        inv_alpha_map, color_map = self._get_buffers(height, width)
+        cv2.resize(
+            inv_alpha, (width, height),
+            dst=inv_alpha_map,
+            interpolation=_NEAREST)
+        cv2.resize(
+            color, (width, height), dst=color_map, interpolation=_NEAREST)
+
+        region = out[:height, :width]
+        cv2.multiply(region, inv_alpha_map, dst=region, scale=1 / 255.)
+        cv2.add(region, color_map, dst=region)
+        return out
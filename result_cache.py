@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+NUM_CLASSES = 7
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'hyundai_gui', 'results')
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """파일 크기와 앞/뒤 chunk_size 바이트로 계산한 빠른 해시.
+
+    수 GB 영상 전체를 읽지 않고도 같은 파일인지 구분하기 위한 용도입니다.
+    """
+    if path is None or not os.path.isfile(path):
+        return 'none'
+    size = os.path.getsize(path)
+    sha1 = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        sha1.update(f.read(chunk_size))
+        if size > chunk_size:
+            f.seek(max(size - chunk_size, chunk_size))
+            sha1.update(f.read(chunk_size))
+    return sha1.hexdigest()
+
+
+def signature_hash(signature):
+    """결과에 영향을 주는 설정(dict)의 해시. 키 순서와 무관합니다."""
+    text = json.dumps(signature or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class VideoResultCache:
+    """(영상 해시, 체크포인트 해시, 모델 설정 해시)별로 프레임 추론 결과를 디스크에 저장하는 캐시.
+
+    cache_dir/<영상 해시>_<체크포인트 해시>_<설정 해시>/ 아래에 memmap 배열로 저장됩니다.
+    설정(signature)은 모델 config, severity_thresholds, 정밀도, 백엔드처럼 같은
+    체크포인트로도 결과를 바꾸는 값들입니다. (MMSegWrapper.result_signature)
+
+        seg_maps.npy  uint8[N, 16, 16]   프레임별 패치 결과
+        counts.npy    uint16[N, 7]       클래스별 패치 개수
+        levels.npy    float32[N]         오염도 (오염 패치 비율)
+        valid.npy     bool[N]            결과가 저장된 프레임
+        meta.json     영상/체크포인트 경로, 설정, 프레임 수
+
+    같은 영상을 다시 열거나 슬라이더로 이동할 때 저장된 프레임은 모델을 거치지 않고
+    바로 결과를 돌려줍니다. 여러 스레드에서 get/put을 호출해도 됩니다.
+    """
+
+    def __init__(self, video_path, checkpoint_path, num_frames, cache_dir=DEFAULT_CACHE_DIR,
+                 grid_size=(16, 16), signature=None):
+        assert num_frames > 0, 'num_frames must be positive'
+        self.video_path = video_path
+        self.checkpoint_path = checkpoint_path
+        self.num_frames = int(num_frames)
+        self.grid_size = tuple(grid_size)
+        # json으로 저장했다 읽은 값과 비교할 수 있도록 정규화
+        self.signature = json.loads(
+            json.dumps(signature or {}, sort_keys=True, ensure_ascii=False, default=str))
+        self.key = (f'{file_fingerprint(video_path)[:16]}_{file_fingerprint(checkpoint_path)[:16]}'
+                    f'_{signature_hash(self.signature)[:16]}')
+        self.cache_path = os.path.join(cache_dir, self.key)
+        self.__lock = threading.Lock()
+        os.makedirs(self.cache_path, exist_ok=True)
+
+        meta_file = os.path.join(self.cache_path, 'meta.json')
+        reuse = False
+        if os.path.isfile(meta_file):
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            reuse = (meta.get('num_frames') == self.num_frames
+                     and tuple(meta.get('grid_size', ())) == self.grid_size
+                     and meta.get('signature') == self.signature)
+        mode = 'r+' if reuse else 'w+'
+        self.seg_maps = self.__open('seg_maps.npy', mode, np.uint8, (self.num_frames, ) + self.grid_size)
+        self.counts = self.__open('counts.npy', mode, np.uint16, (self.num_frames, NUM_CLASSES))
+        self.levels = self.__open('levels.npy', mode, np.float32, (self.num_frames, ))
+        self.valid = self.__open('valid.npy', mode, np.bool_, (self.num_frames, ))
+        if not reuse:
+            with open(meta_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'video_path': os.path.abspath(video_path) if video_path else None,
+                    'checkpoint_path': checkpoint_path,
+                    'signature': self.signature,
+                    'num_frames': self.num_frames,
+                    'grid_size': list(self.grid_size)
+                }, f, ensure_ascii=False, indent=4)
+
+    def __open(self, name, mode, dtype, shape):
+        return np.lib.format.open_memmap(
+            os.path.join(self.cache_path, name), mode=mode, dtype=dtype, shape=shape)
+
+    def __contains__(self, frame_index):
+        return 0 <= frame_index < self.num_frames and bool(self.valid[frame_index])
+
+    @property
+    def num_cached(self):
+        return int(np.count_nonzero(self.valid))
+
+    def get(self, frame_index):
+        """저장된 결과를 MMSegWrapper.infer와 같은 형식의 dict로 반환. 없으면 None"""
+        with self.__lock:
+            if frame_index not in self:
+                return None
+            seg_map = np.array(self.seg_maps[frame_index])
+            class_counts = np.array(self.counts[frame_index])
+            level = float(self.levels[frame_index])
+        # put에서 저장한 클래스별 개수로 np.unique(seg_map, return_counts=True)와 같은 값 구성
+        unique = np.flatnonzero(class_counts)
+        return {
+            'seg_map': seg_map,
+            'unique_values': unique.astype(seg_map.dtype),
+            'counts': class_counts[unique].astype(np.int64),
+            'contamination_level': level
+        }
+
+    def put(self, frame_index, result_dict):
+        if not 0 <= frame_index < self.num_frames:
+            return
+        seg_map = np.asarray(result_dict['seg_map']).reshape(self.grid_size)
+        seg_map = np.rint(seg_map).astype(np.uint8)
+        counts = np.bincount(seg_map.ravel(), minlength=NUM_CLASSES)[:NUM_CLASSES]
+        with self.__lock:
+            self.seg_maps[frame_index] = seg_map
+            self.counts[frame_index] = counts
+            self.levels[frame_index] = np.count_nonzero(seg_map) / seg_map.size
+            # 결과를 모두 쓴 뒤에 valid를 표시
+            self.valid[frame_index] = True
+
+    def flush(self):
+        with self.__lock:
+            for array in (self.seg_maps, self.counts, self.levels, self.valid):
+                array.flush()
+
+    def close(self):
+        self.flush()
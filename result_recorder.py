@@ -0,0 +1,220 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+NUM_CLASSES = 7
+DEFAULT_RECORD_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'hyundai_gui', 'records')
+
+# TXT 결과에 표시할 레이블 이름
+LABEL_MAP = {0: "Clean", 1: "Rain blur", 2: "Rain blockage"}
+
+
+def format_time(seconds):
+    hrs = int(seconds // 3600)
+    mins = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    return f"{hrs:02}:{mins:02}:{secs:02}"
+
+
+class ResultRecorder:
+    """프레임별 추론 결과를 고정 크기 레코드로 디스크에 이어 쓰는 컬럼 기록기.
+
+    컬럼마다 하나의 바이너리 파일에 append 하며, chunk_size개 레코드를 메모리 버퍼에
+    모았다가 한 번에 씁니다. 재생 시간이 길어져도 메모리 사용량은 chunk 크기로 고정됩니다.
+
+        time.bin    float64           영상 시간 (초)
+        frame.bin   int64             프레임 번호
+        level.bin   float32           오염도 (오염 패치 비율)
+        counts.bin  uint16[7]         클래스별 패치 개수
+        grid.bin    uint8[16, 16]     패치 결과
+
+    JSON/CSV/TXT 결과 파일은 export / export_async로 기록된 컬럼을 읽어 만듭니다.
+    append는 GUI 스레드, export는 백그라운드 스레드에서 동시에 호출해도 됩니다.
+
+    Args:
+        record_dir: 기록 디렉토리를 만들 상위 경로
+        chunk_size: 디스크에 한 번에 쓸 레코드 수
+        grid_size: 패치 결과 크기
+    """
+
+    def __init__(self, record_dir=DEFAULT_RECORD_DIR, chunk_size=256, grid_size=(16, 16)):
+        os.makedirs(record_dir, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=time.strftime('%Y%m%d_%H%M%S_'), dir=record_dir)
+        self.chunk_size = chunk_size
+        self.columns = {
+            'time': (np.float64, ()),
+            'frame': (np.int64, ()),
+            'level': (np.float32, ()),
+            'counts': (np.uint16, (NUM_CLASSES, )),
+            'grid': (np.uint8, tuple(grid_size)),
+        }
+        self.__chunk = {name: np.zeros((chunk_size, ) + shape, dtype=dtype)
+                        for name, (dtype, shape) in self.columns.items()}
+        self.__files = {name: open(os.path.join(self.path, f'{name}.bin'), 'ab')
+                        for name in self.columns}
+        self.__pending = 0
+        self.__written = 0
+        self.__exports = 0
+        self.__closed = False
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return self.__written + self.__pending
+
+    def append(self, time_sec, frame_index, level, seg_map):
+        """결과 한 프레임을 기록합니다."""
+        seg_map = np.asarray(seg_map)
+        with self.__lock:
+            i = self.__pending
+            self.__chunk['time'][i] = time_sec
+            self.__chunk['frame'][i] = frame_index
+            self.__chunk['level'][i] = level
+            self.__chunk['grid'][i] = seg_map
+            self.__chunk['counts'][i] = np.bincount(
+                self.__chunk['grid'][i].ravel(), minlength=NUM_CLASSES)[:NUM_CLASSES]
+            self.__pending += 1
+            if self.__pending == self.chunk_size:
+                self.__flush()
+
+    def __flush(self):
+        if self.__pending == 0:
+            return
+        for name, f in self.__files.items():
+            f.write(self.__chunk[name][:self.__pending].tobytes())
+            f.flush()
+        self.__written += self.__pending
+        self.__pending = 0
+
+    def flush(self):
+        with self.__lock:
+            self.__flush()
+
+    def read(self, names=None, stop=None):
+        """기록된 컬럼을 읽기 전용 memmap으로 반환 (복사 없음). stop: 읽을 레코드 수"""
+        with self.__lock:
+            self.__flush()
+            count = self.__written if stop is None else min(stop, self.__written)
+        data = {}
+        for name in names or self.columns:
+            dtype, shape = self.columns[name]
+            if count == 0:
+                data[name] = np.zeros((0, ) + shape, dtype=dtype)
+            else:
+                data[name] = np.memmap(os.path.join(self.path, f'{name}.bin'), dtype=dtype,
+                                       mode='r', shape=(count, ) + shape)
+        return data
+
+    def time_range(self):
+        """(첫 프레임 시간, 마지막 프레임 시간). 기록이 없으면 None"""
+        times = self.read(['time'])['time']
+        if len(times) == 0:
+            return None
+        return float(times[0]), float(times[-1])
+
+    def export(self, json_file=None, csv_file=None, txt_file=None):
+        """현재까지 기록된 결과를 JSON/CSV/TXT 파일로 저장합니다."""
+        data = self.read()
+        if json_file:
+            export_json(data, json_file)
+        if csv_file:
+            export_csv(data, csv_file)
+        if txt_file:
+            export_txt(data, txt_file)
+
+    def export_async(self, callback=None, **files):
+        """export를 백그라운드 스레드에서 실행합니다.
+
+        호출 시점까지 기록된 결과만 저장하며, 끝나면 callback(error)을 호출합니다.
+        (error는 성공하면 None) 저장 중에 close해도 기록 파일은 저장이 끝난 뒤 지워집니다.
+        """
+        with self.__lock:
+            self.__flush()
+            stop = self.__written
+            self.__exports += 1
+
+        def worker():
+            error = None
+            try:
+                data = self.read(stop=stop)
+                if files.get('json_file'):
+                    export_json(data, files['json_file'])
+                if files.get('csv_file'):
+                    export_csv(data, files['csv_file'])
+                if files.get('txt_file'):
+                    export_txt(data, files['txt_file'])
+                del data
+            except Exception as e:
+                error = e
+            finally:
+                with self.__lock:
+                    self.__exports -= 1
+                    remove = self.__closed and self.__exports == 0
+                if remove:
+                    shutil.rmtree(self.path, ignore_errors=True)
+            if callback is not None:
+                callback(error)
+
+        thread = threading.Thread(target=worker, name='ResultExport', daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """기록을 끝내고 디렉토리를 지웁니다. 진행 중인 export가 있으면 끝난 뒤 지웁니다."""
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+            self.__flush()
+            for f in self.__files.values():
+                f.close()
+            remove = self.__exports == 0
+        if remove:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+def iter_records(data):
+    """컬럼 데이터를 기존 __frame_data와 같은 형식의 dict로 하나씩 변환"""
+    for i in range(len(data['time'])):
+        counts = data['counts'][i]
+        labels = np.flatnonzero(counts)
+        yield {
+            'time': float(data['time'][i]),
+            'contamination_level': float(data['level'][i]),
+            'patch_counts': {str(label): int(counts[label]) for label in labels},
+            'patch_array': data['grid'][i].tolist()
+        }
+
+
+def export_json(data, json_file):
+    # 레코드 단위로 써서 전체 리스트를 메모리에 만들지 않음 (json.dump(indent=4)와 같은 형식)
+    with open(json_file, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for i, record in enumerate(iter_records(data)):
+            text = json.dumps(record, ensure_ascii=False, indent=4)
+            f.write((',\n' if i else '\n') + '\n'.join('    ' + line for line in text.split('\n')))
+        f.write('\n]' if len(data['time']) else ']')
+
+
+def export_csv(data, csv_file):
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        # 헤더 작성
+        writer.writerow(['Time (s)', 'Contamination Level (%)', 'Frame Number'])
+        # 데이터 작성
+        for t, ratio, frame_num in zip(data['time'], data['level'], data['frame']):
+            writer.writerow([f"{t:.2f}", f"{ratio * 100:.2f}", int(frame_num)])
+
+
+def export_txt(data, txt_file):
+    with open(txt_file, 'w', encoding='utf-8') as f:
+        for t, contamination, counts in zip(data['time'], data['level'], data['counts']):
+            counts_str = ', '.join([f"{LABEL_MAP.get(int(k), 'unknown')}: {counts[k]}"
+                                    for k in np.flatnonzero(counts)])
+            f.write("-------------------------------------------------------------------------------------------------------\n")
+            f.write(f"Time: {format_time(t)}, Contamination Level: {contamination:.2%}, Patch Counts: {counts_str}\n")
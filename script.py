@@ -1,10 +1,19 @@
+import hashlib
+import json
 import os
 import sys
 from pathlib import Path
 import mmcv
 import cv2
 import numpy as np
-from mmseg.apis import init_model, inference_model
+import torch
+from mmengine.model.utils import revert_sync_batchnorm
+from mmseg.apis import inference_context, init_model, inference_model
+from mmseg.models.utils import PatchInputPreprocessor
+from mmseg.visualization import PatchOverlayRenderer
+
+BACKENDS = ('pytorch', 'torchscript', 'onnxruntime')
+IMG_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
 
 
 def open_directory(path):
@@ -17,22 +26,150 @@ def open_directory(path):
     else:
         print("Unsupported operating system.")
 
+class ExportedPatchNet:
+    """tools/deployment/patchnet2export.py로 변환한 모델을 CPU에서 실행합니다.
+
+    Patch_EncoderDecoder.predict_batch와 같은 방식으로 호출할 수 있습니다.
+    전처리 정보(입력 크기, mean/std)는 모델 파일 옆의 .json에서 읽습니다.
+
+    Args:
+        model_file: TorchScript(.pt) 또는 ONNX(.onnx) 파일
+        backend: 'torchscript' 또는 'onnxruntime'
+        num_threads: CPU 스레드 수. None이면 런타임 기본값
+    """
+
+    def __init__(self, model_file, backend='torchscript', num_threads=None):
+        with open(os.path.splitext(model_file)[0] + '.json', 'r') as f:
+            meta = json.load(f)
+        self.backend = backend
+        self.input_size = tuple(meta['input_size'])
+        self.preprocessor = PatchInputPreprocessor(
+            self.input_size, mean=meta['mean'], std=meta['std'],
+            bgr_to_rgb=meta['bgr_to_rgb'])
+        if backend == 'torchscript':
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            self.model = torch.jit.load(model_file, map_location='cpu')
+        elif backend == 'onnxruntime':
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            self.model = ort.InferenceSession(
+                model_file, options, providers=['CPUExecutionProvider'])
+        else:
+            raise ValueError(f'Unsupported backend: {backend}')
+
+    def forward(self, inputs):
+        """정규화된 (N, 3, H, W) float32 입력 -> (labels, scores) numpy"""
+        if self.backend == 'torchscript':
+            with torch.inference_mode():
+                labels, scores = self.model(torch.from_numpy(inputs))
+            return labels.numpy(), scores.numpy()
+        return tuple(self.model.run(None, {'input': inputs}))
+
+    def predict_batch(self, frames, size=None, batch_size=None):
+        """(N, 16, 16) uint8 반환. 입력 크기는 변환할 때의 크기로 고정되어 size는 무시합니다."""
+        num_frames = len(frames)
+        if num_frames == 0:
+            return np.zeros((0, 16, 16), dtype=np.uint8)
+        batch_size = batch_size or num_frames
+        results = []
+        for start in range(0, num_frames, batch_size):
+            inputs = self.preprocessor(frames[start:start + batch_size])
+            results.append(self.forward(inputs)[0])
+        return np.concatenate(results).astype(np.uint8)
+
+
 class MMSegWrapper:
-    def __init__(self):
+    """PatchNet 추론 래퍼.
+
+    Args:
+        backend: 'pytorch' (config + checkpoint), 'torchscript', 'onnxruntime'
+        config_file, checkpoint_file: pytorch 백엔드에서 사용할 파일
+        model_file: torchscript/onnxruntime 백엔드에서 사용할 변환된 모델 파일
+        device: pytorch 백엔드의 device. None이면 GPU가 있으면 'cuda:0', 없으면 'cpu'
+        precision: pytorch 백엔드의 추론 정밀도. 'fp32', 'bf16'(CPU), 'fp16'(GPU)
+        channels_last: pytorch 백엔드의 weight를 channels_last 메모리 형식으로 변환
+        reference_dir: 정밀도 검증용 이미지 폴더. 지정하면 fp32 결과와 16x16 레이블
+            일치율을 비교하고, min_agreement보다 낮으면 fp32로 되돌립니다
+        min_agreement: 허용하는 최소 레이블 일치율
+    """
+
+    def __init__(self, backend='pytorch', config_file='configs/patchnet/0920/r34_1.py',
+                 checkpoint_file='out_downlr.pth', model_file=None, device=None,
+                 precision='fp32', channels_last=False, reference_dir=None,
+                 min_agreement=0.99):
+        assert backend in BACKENDS, f'Unsupported backend: {backend}'
+        assert backend == 'pytorch' or precision == 'fp32', \
+            'precision is only supported by the pytorch backend'
         self.model = None
+        self.backend = backend
+        self.config_file = config_file
+        self.checkpoint_file = checkpoint_file
+        self.model_file = model_file
+        if device is None:
+            device = 'cuda:0' if torch.cuda.is_available() else 'cpu'
+        self.device = device
+        self.precision = precision
+        self.channels_last = channels_last
+        self.reference_dir = reference_dir
+        self.min_agreement = min_agreement
+        self.overlay_renderer = PatchOverlayRenderer(styles={
+            1: ((180, 98, 0), 0.5),  # 레이블 1은 50% 불투명
+            2: ((95, 44, 0), 0.7)  # 레이블 2는 70% 불투명
+        })
         self.download_model()
 
     def download_model(self):
-        config_file = 'configs/patchnet/0920/r34_1.py'
         #checkpoint_file = '/mnt/PatchModel/sota_for_gui.pth'
         #checkpoint_file = 'in_20images.pth'
-        checkpoint_file = 'out_downlr.pth'
-        self.model = init_model(config_file, checkpoint_file, device='cuda:0')
+        if self.backend != 'pytorch':
+            assert self.model_file, f'model_file is required for the {self.backend} backend'
+            # 결과 캐시는 변환된 모델 파일 기준으로 구분
+            self.checkpoint_file = self.model_file
+            self.model = ExportedPatchNet(self.model_file, self.backend)
+            return
+        self.model = init_model(self.config_file, self.checkpoint_file, device=self.device,
+                                precision=self.precision, channels_last=self.channels_last)
+        if self.device == 'cpu':
+            self.model = revert_sync_batchnorm(self.model)
+        if self.precision != 'fp32' and self.reference_dir:
+            agreement = self.label_agreement(self.reference_dir)
+            print(f'{self.precision} label agreement: {agreement * 100:.2f}%')
+            if agreement < self.min_agreement:
+                print(f'Label agreement is below {self.min_agreement * 100:.2f}%, '
+                      f'falling back to fp32.')
+                self.precision = self.model.precision = 'fp32'
+
+    def result_signature(self):
+        """같은 체크포인트라도 추론 결과를 바꾸는 설정. VideoResultCache의 키에 사용합니다."""
+        signature = {'backend': self.backend, 'precision': self.precision}
+        if self.backend == 'pytorch' and self.model is not None:
+            model_cfg = json.dumps(self.model.cfg.model, sort_keys=True, default=str)
+            signature['config'] = hashlib.sha1(model_cfg.encode()).hexdigest()
+            thresholds = getattr(self.model, 'severity_thresholds', None)
+            if thresholds is not None:
+                signature['severity_thresholds'] = [round(t, 6) for t in thresholds.tolist()]
+        return signature
+
+    def label_agreement(self, reference_dir, batch_size=8):
+        """reference_dir 이미지들에서 현재 정밀도와 fp32의 16x16 레이블 일치율 계산"""
+        img_files = sorted(p for p in Path(reference_dir).iterdir()
+                           if p.suffix.lower() in IMG_EXTENSIONS)
+        assert img_files, f'No reference images in {reference_dir}'
+        frames = [mmcv.imread(str(p)) for p in img_files]
+        with inference_context(self.model, 'fp32'):
+            expected = self.model.predict_batch(
+                frames, size=(512, 512), batch_size=batch_size)
+        with inference_context(self.model):
+            labels = self.model.predict_batch(
+                frames, size=(512, 512), batch_size=batch_size)
+        return float((labels == expected).mean())
 
     def get_result(self, src):
         if self.model:
             try:
-                result_dict = {}
                 if isinstance(src, str):  # src가 파일 경로인 경우
                     ext = Path(src).suffix
                     save_dir = '/mnt/4tb/hyundai/data/val'
@@ -45,42 +182,10 @@ class MMSegWrapper:
                 else:
                     raise Exception('Unsupported input type.')
 
-                original_size = img.shape[:2]
-                resized_img = cv2.resize(img, (512, 512))
-                result = inference_model(self.model, resized_img)
-                seg_map = result.pred_sem_seg.data.cpu().numpy().squeeze()
-
-                result_dict['seg_map'] = seg_map
-                unique, counts = np.unique(seg_map, return_counts=True)
-                result_dict['unique_values'] = unique
-                result_dict['counts'] = counts
-                #print("Unique values and their counts in the 16x16 result array:")
-                #for u, c in zip(unique, counts):
-                #    print(f"Value: {u}, Count: {c}")
-
-                patch_height = original_size[0] // 16
-                patch_width = original_size[1] // 16
-
-                visualized_img = img.copy()
-                color_map = {
-                    1: (180, 98, 0),  # 반투명한 빨간색
-                    2: (95, 44, 0)  # 불투명한 빨간색
-                }
-
-                for i in range(16):
-                    for j in range(16):
-                        label = seg_map[i, j]
-                        if label in color_map:
-                            x_start = j * patch_width
-                            y_start = i * patch_height
-                            x_end = x_start + patch_width
-                            y_end = y_start + patch_height
-
-                            overlay = visualized_img[y_start:y_end, x_start:x_end].copy()
-                            overlay[:, :, :3] = color_map[label][:3]
-
-                            alpha = 0.5 if label == 1 else 0.7  # 레이블 1은 30% 불투명, 레이블 2는 70% 불투명
-                            cv2.addWeighted(overlay, alpha, visualized_img[y_start:y_end, x_start:x_end], 1 - alpha, 0, visualized_img[y_start:y_end, x_start:x_end])
+                result_dict = self.infer(img)
+                seg_map = result_dict['seg_map']
+
+                visualized_img = self.overlay_renderer.render(img, seg_map)
 
                 if dst_filename: 
                     #import pdb; pdb.set_trace() # 파일 경로가 주어졌을 때만 저장
@@ -95,6 +200,58 @@ class MMSegWrapper:
         else:
             raise Exception('You have to call download_model first.')
 
+    def infer(self, img):
+        """모델 추론만 수행합니다. 오버레이 없이 result_dict만 반환"""
+        if not self.model:
+            raise Exception('You have to call download_model first.')
+        result_dict = {}
+        if self.backend != 'pytorch':
+            seg_map = self.model.predict_batch([img])[0]
+        elif (self.model.test_cfg or {}).get('preprocess'):
+            # config의 preprocess 설정대로 네트워크 입력 크기로 바로 resize + 정규화
+            with inference_context(self.model):
+                seg_map = self.model.predict_batch([img])[0]
+        else:
+            resized_img = cv2.resize(img, (512, 512))
+            result = inference_model(self.model, resized_img)
+            seg_map = result.pred_sem_seg.data.cpu().numpy().squeeze()
+
+        result_dict['seg_map'] = seg_map
+        unique, counts = np.unique(seg_map, return_counts=True)
+        result_dict['unique_values'] = unique
+        result_dict['counts'] = counts
+        return result_dict
+
+    def infer_scores(self, img):
+        """seg_map을 만들기 전의 패치별 점수 (type 확률 (C, 16, 16), corruption 점수 (16, 16))
+
+        pytorch 백엔드에서만 사용할 수 있습니다. 변환된 모델은 레이블만 출력합니다.
+        """
+        if not self.model:
+            raise Exception('You have to call download_model first.')
+        assert self.backend == 'pytorch', \
+            f'scores are not available with the {self.backend} backend'
+        size = None if (self.model.test_cfg or {}).get('preprocess') else (512, 512)
+        with inference_context(self.model):
+            type_probs, scores = self.model.predict_scores([img], size=size)
+        return type_probs[0], scores[0]
+
+    def render(self, img, result_dict):
+        """추론 결과(seg_map)를 원본 이미지 위에 오버레이합니다."""
+        return self.overlay_renderer.render(img, result_dict['seg_map'])
+
+    def predict_batch(self, frames, batch_size=None):
+        """여러 프레임의 16x16 결과를 한 번에 계산합니다. (N, 16, 16) uint8 반환"""
+        if self.model:
+            if self.backend != 'pytorch':
+                return self.model.predict_batch(
+                    frames, size=(512, 512), batch_size=batch_size)
+            with inference_context(self.model):
+                return self.model.predict_batch(
+                    frames, size=(512, 512), batch_size=batch_size)
+        else:
+            raise Exception('You have to call download_model first.')
+
 if __name__ == "__main__":
     # 테스트할 이미지 경로
     img_path = '/mnt/4tb/hyundai/data/val'
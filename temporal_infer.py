@@ -0,0 +1,165 @@
+import threading
+
+import cv2
+import numpy as np
+
+
+class PatchScoreFilter:
+    """패치별 점수를 시간 방향으로 필터링해 16x16 레이블을 만듭니다.
+
+    오염은 천천히 변하므로 프레임마다 독립적으로 나온 점수 대신
+    - type 확률과 corruption 점수의 지수 이동 평균 (EMA)
+    - corruption 점수의 hysteresis: threshold + margin을 넘어야 심각도가 올라가고,
+      threshold - margin 아래로 내려가야 심각도가 내려갑니다
+    로 레이블이 프레임마다 깜빡이는 것을 막습니다.
+    레이블은 Patch_EncoderDecoder.fuse_labels와 같은 (severity, type) 테이블로 만듭니다.
+
+    Args:
+        label_lut: (severity * num_types + type) -> 레이블 테이블
+        num_types: label_lut의 type 개수
+        thresholds: clean/blur/blockage를 나누는 corruption 점수 threshold
+        alpha: 새 프레임의 EMA 가중치. 1이면 필터링하지 않음
+        margin: hysteresis 폭. 0이면 threshold만 사용
+    """
+
+    def __init__(self, label_lut, num_types, thresholds, alpha=0.3, margin=0.05):
+        assert 0 < alpha <= 1, 'alpha must be in (0, 1]'
+        self.label_lut = np.asarray(label_lut, dtype=np.uint8)
+        self.num_types = num_types
+        self.thresholds = np.asarray(thresholds, dtype=np.float32)
+        self.alpha = alpha
+        self.margin = margin
+        self.reset()
+
+    def reset(self):
+        self.type_probs = None
+        self.scores = None
+        self.severity = None
+
+    def __count(self, scores, thresholds):
+        return (scores[..., None] >= thresholds).sum(-1)
+
+    def update(self, type_probs, scores):
+        """type 확률 (C, H, W)과 corruption 점수 (H, W)로 필터 상태를 갱신하고 레이블 (H, W) 반환"""
+        if self.scores is None:
+            self.type_probs = type_probs.astype(np.float32)
+            self.scores = scores.astype(np.float32)
+            self.severity = self.__count(self.scores, self.thresholds)
+        else:
+            self.type_probs += self.alpha * (type_probs - self.type_probs)
+            self.scores += self.alpha * (scores - self.scores)
+            # 점수가 hysteresis 구간 안에 있으면 이전 심각도를 유지
+            lower = self.__count(self.scores, self.thresholds + self.margin)
+            upper = self.__count(self.scores, self.thresholds - self.margin)
+            self.severity = np.clip(self.severity, lower, upper)
+        seg_type = self.type_probs.argmax(0)
+        return self.label_lut[self.severity * self.num_types + seg_type]
+
+
+class FrameChangeGate:
+    """프레임이 충분히 바뀌지 않았으면 추론을 건너뛰도록 판단합니다.
+
+    프레임을 size 크기의 grayscale로 축소한 signature를 마지막으로 추론한 프레임의
+    signature와 비교해 평균 절대 차이 (0~255)가 threshold 이하이면 건너뜁니다.
+    이전 프레임이 아니라 마지막으로 추론한 프레임과 비교하므로 천천히 쌓이는 변화도
+    언젠가는 추론됩니다. max_skip번 연속으로 건너뛰면 변화와 상관없이 추론합니다.
+
+    Args:
+        threshold: 추론할 평균 절대 차이
+        size: signature 크기 (w, h)
+        max_skip: 최대 연속 skip 수
+    """
+
+    def __init__(self, threshold=2.0, size=(32, 32), max_skip=30):
+        self.threshold = threshold
+        self.size = tuple(size)
+        self.max_skip = max_skip
+        self.reset()
+
+    def reset(self):
+        self.signature = None
+        self.num_skipped = 0
+
+    def signature_of(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def should_infer(self, frame):
+        signature = self.signature_of(frame)
+        if (self.signature is not None and self.num_skipped < self.max_skip
+                and np.abs(signature - self.signature).mean() <= self.threshold):
+            self.num_skipped += 1
+            return False
+        self.signature = signature
+        self.num_skipped = 0
+        return True
+
+
+class TemporalInference:
+    """연속된 프레임 (재생 중인 영상, 실시간 스트림)을 위한 MMSegWrapper 추론 레이어.
+
+    - gate_threshold를 지정하면 FrameChangeGate로 변화가 작은 프레임은 모델을 거치지 않고
+      마지막 결과를 돌려줍니다 (result_dict['skipped'] = True).
+    - pytorch 백엔드에서는 PatchScoreFilter로 패치 점수를 필터링해 레이블을 만듭니다.
+      변환된 모델 (torchscript/onnxruntime)은 점수를 출력하지 않으므로 gate만 적용됩니다.
+
+    결과는 이전 프레임들에 따라 달라지므로 탐색 (슬라이더, 처음/끝으로 이동)이나
+    새 영상/스트림을 시작할 때 reset()을 호출해야 합니다.
+    여러 스레드에서 호출해도 되지만 프레임 순서대로 호출해야 합니다.
+
+    Args:
+        wrapper: MMSegWrapper
+        alpha, margin: PatchScoreFilter 설정
+        gate_threshold: FrameChangeGate threshold. None이면 모든 프레임을 추론
+        max_skip: FrameChangeGate 최대 연속 skip 수
+    """
+
+    def __init__(self, wrapper, alpha=0.3, margin=0.05, gate_threshold=None, max_skip=30):
+        self.wrapper = wrapper
+        self.filter = None
+        if wrapper.backend == 'pytorch':
+            model = wrapper.model
+            self.filter = PatchScoreFilter(
+                model.label_lut.cpu().numpy(), model.num_types,
+                model.severity_thresholds.cpu().numpy(), alpha=alpha, margin=margin)
+        self.gate = None
+        if gate_threshold is not None:
+            self.gate = FrameChangeGate(gate_threshold, max_skip=max_skip)
+        self.num_inferred = 0
+        self.num_skipped = 0
+        self.__last_result = None
+        self.__lock = threading.Lock()
+
+    def reset(self):
+        with self.__lock:
+            if self.filter is not None:
+                self.filter.reset()
+            if self.gate is not None:
+                self.gate.reset()
+            self.__last_result = None
+
+    def infer(self, frame):
+        """MMSegWrapper.infer와 같은 형식의 result_dict에 'skipped'를 추가해 반환"""
+        with self.__lock:
+            if (self.gate is not None and not self.gate.should_infer(frame)
+                    and self.__last_result is not None):
+                self.num_skipped += 1
+                return dict(self.__last_result, skipped=True)
+
+            if self.filter is not None:
+                type_probs, scores = self.wrapper.infer_scores(frame)
+                seg_map = self.filter.update(type_probs, scores)
+            else:
+                seg_map = self.wrapper.infer(frame)['seg_map']
+            unique, counts = np.unique(seg_map, return_counts=True)
+            result_dict = {'seg_map': seg_map, 'unique_values': unique, 'counts': counts,
+                           'skipped': False}
+            self.__last_result = result_dict
+            self.num_inferred += 1
+            return dict(result_dict)
+
+    def summary(self):
+        total = self.num_inferred + self.num_skipped
+        skip_ratio = self.num_skipped / total * 100 if total else 0
+        return (f'temporal inference: {self.num_inferred} inferred, {self.num_skipped} skipped '
+                f'({skip_ratio:.1f}%)')
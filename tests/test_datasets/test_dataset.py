@@ -1,17 +1,21 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import json
 import os
 import os.path as osp
 import tempfile
 
+import numpy as np
 import pytest
 
 from mmseg.datasets import (ADE20KDataset, BaseSegDataset, BDD100KDataset,
                             CityscapesDataset, COCOStuffDataset,
-                            DecathlonDataset, DSDLSegDataset, ISPRSDataset,
-                            LIPDataset, LoveDADataset, MapillaryDataset_v1,
-                            MapillaryDataset_v2, NYUDataset, PascalVOCDataset,
-                            PotsdamDataset, REFUGEDataset, SynapseDataset,
-                            iSAIDDataset)
+                            DecathlonDataset, DSDLSegDataset, HyundaeDataset,
+                            ISPRSDataset, LIPDataset, LoveDADataset,
+                            MapillaryDataset_v1, MapillaryDataset_v2,
+                            NYUDataset, PascalVOCDataset, PotsdamDataset,
+                            REFUGEDataset, SynapseDataset, iSAIDDataset)
+from mmseg.datasets.patch_label_cache import build_patch_label_cache
+from mmseg.datasets.transforms import LoadAnnotations
 from mmseg.registry import DATASETS
 from mmseg.utils import get_classes, get_palette
 
@@ -473,3 +477,55 @@ def test_nyu_dataset():
     data = dataset[0]
     assert data.get('depth_map_path', None) is not None
     assert data.get('category_id', -1) == 26
+
+
+def test_hyundae_ann_cache(tmp_path):
+    img_dir = tmp_path / 'img_dir'
+    ann_dir = tmp_path / 'ann_dir'
+    img_dir.mkdir()
+    ann_dir.mkdir()
+    rng = np.random.RandomState(0)
+    for i in range(3):
+        (img_dir / f'{i}.png').touch()
+        patch = np.stack(
+            [rng.randint(0, 4, (16, 16)),
+             rng.randint(0, 3, (16, 16))],
+            axis=-1)
+        with open(ann_dir / f'{i}.json', 'w') as f:
+            json.dump(dict(patch=patch.tolist()), f)
+    data_prefix = dict(img_path=str(img_dir), seg_map_path=str(ann_dir))
+    dataset = HyundaeDataset(data_prefix=data_prefix, lazy_init=True)
+    cache_dir = str(tmp_path / 'ann_cache')
+    build_patch_label_cache(dataset.load_data_list(), cache_dir)
+
+    dataset = HyundaeDataset(data_prefix=data_prefix, ann_cache=cache_dir)
+    load = LoadAnnotations()
+    for data_info in dataset.load_data_list():
+        assert data_info['seg_map_cache'][1] == int(
+            osp.basename(data_info['img_path'])[0])
+        cached = load(dict(data_info, seg_fields=[]))['gt_seg_map']
+        data_info.pop('seg_map_cache')
+        expected = load(dict(data_info, seg_fields=[]))['gt_seg_map']
+        assert cached.dtype == np.uint8
+        assert not cached.flags.writeable
+        np.testing.assert_array_equal(cached, expected)
+
+    # a changed annotation falls back to the json file
+    with open(ann_dir / '1.json', 'w') as f:
+        json.dump(dict(patch=np.zeros((16, 16, 2), int).tolist()), f)
+    data_list = HyundaeDataset(
+        data_prefix=data_prefix, ann_cache=cache_dir).load_data_list()
+    assert 'seg_map_cache' not in data_list[1]
+    assert 'seg_map_cache' in data_list[0]
+    assert 'seg_map_cache' in data_list[2]
+    results = load(dict(data_list[1], seg_fields=[]))
+    assert (results['gt_seg_map'] == 0).all()
+
+    # corrupted labels disable the cache
+    labels = np.load(osp.join(cache_dir, 'labels.npy'), mmap_mode='r+')
+    labels[0, 0, 0] += 1
+    labels.flush()
+    del labels
+    data_list = HyundaeDataset(
+        data_prefix=data_prefix, ann_cache=cache_dir).load_data_list()
+    assert all('seg_map_cache' not in info for info in data_list)
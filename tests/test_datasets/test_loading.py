@@ -7,12 +7,13 @@ import mmcv
 import numpy as np
 from mmcv.transforms import LoadImageFromFile
 
+from mmseg.datasets.image_cache import build_image_cache
 from mmseg.datasets.transforms import LoadAnnotations  # noqa
 from mmseg.datasets.transforms import (LoadBiomedicalAnnotation,
                                        LoadBiomedicalData,
                                        LoadBiomedicalImageFromFile,
-                                       LoadDepthAnnotation,
-                                       LoadImageFromNDArray)
+                                       LoadDepthAnnotation, LoadImageFromCache,
+                                       LoadImageFromNDArray, LoadPatchNetInput)
 
 
 class TestLoading:
@@ -228,6 +229,72 @@ class TestLoading:
                                    "imdecode_backend='cv2', "
                                    'backend_args=None)')
 
+    def test_load_patchnet_input(self):
+        filename = osp.join(self.data_prefix, 'color.jpg')
+        transform = LoadPatchNetInput(scale=(128, 64))
+        results = transform(dict(img_path=filename))
+        assert results['img'].shape == (64, 128, 3)
+        assert results['img'].dtype == np.uint8
+        assert results['img_shape'] == (64, 128)
+        assert results['ori_shape'] == (288, 512)
+        assert results['scale_factor'] == (0.25, 64 / 288)
+
+        # reduced JPEG decoding is close to a full decode and resize
+        expected = mmcv.imresize(mmcv.imread(filename), (128, 64))
+        diff = np.abs(results['img'].astype(int) - expected.astype(int))
+        assert diff.mean() < 8
+
+        transform = LoadPatchNetInput(scale=(128, 64), reduced_decode=False)
+        results = transform(dict(img_path=filename))
+        np.testing.assert_array_equal(results['img'], expected)
+
+        # frames given as arrays
+        img = np.random.randint(0, 256, (96, 160, 3), dtype=np.uint8)
+        transform = LoadPatchNetInput(scale=(32, 32), interpolation='area')
+        results = transform(dict(img=img))
+        assert results['img_path'] is None
+        assert results['img'].shape == (32, 32, 3)
+        assert results['ori_shape'] == (96, 160)
+        np.testing.assert_array_equal(
+            results['img'], mmcv.imresize(img, (32, 32), interpolation='area'))
+
+        assert repr(transform) == ('LoadPatchNetInput(scale=(32, 32), '
+                                   "interpolation='area', "
+                                   'reduced_decode=True, '
+                                   'backend_args=None)')
+
+    def test_load_image_from_cache(self):
+        color = osp.join(self.data_prefix, 'color.jpg')
+        gray = osp.join(self.data_prefix, 'gray.jpg')
+        cache_dir = tempfile.mkdtemp()
+        cache = build_image_cache([dict(img_path=color)],
+                                  cache_dir,
+                                  scale=(128, 64),
+                                  shard_size=1)
+        assert len(cache) == 1
+
+        transform = LoadImageFromCache(cache_dir)
+        results = transform(dict(img_path=color))
+        expected = mmcv.imresize(
+            mmcv.imread(color), (128, 64), interpolation='area')
+        np.testing.assert_array_equal(results['img'], expected)
+        assert results['img'].flags.writeable
+        assert results['img_shape'] == (64, 128)
+        assert results['ori_shape'] == (288, 512)
+        assert results['scale_factor'] == (0.25, 64 / 288)
+
+        # images missing from the cache are decoded and resized
+        results = transform(dict(img_path=gray))
+        assert results['img'].shape == (64, 128, 3)
+        assert results['ori_shape'] == mmcv.imread(gray).shape[:2]
+
+        transform = LoadImageFromCache(cache_dir, to_float32=True)
+        assert transform(dict(img_path=color))['img'].dtype == np.float32
+        assert repr(transform) == ('LoadImageFromCache('
+                                   f"cache_dir='{cache_dir}', "
+                                   "to_float32=True, check='stat', "
+                                   'backend_args=None)')
+
     def test_load_biomedical_img(self):
         results = dict(
             img_path=osp.join(self.data_prefix, 'biomedical.nii.gz'))
@@ -0,0 +1,99 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from unittest import TestCase
+
+import numpy as np
+import torch
+from mmengine.structures import PixelData
+
+from mmseg.evaluation import IoUMetric, PatchContaminationMetric
+from mmseg.structures import SegDataSample
+
+CLASSES = ('clean', 'raindrop_blur', 'raindrop_blockage', 'dust_blur',
+           'dust_blockage', 'snow_blur', 'snow_blockage')
+
+
+class TestPatchContaminationMetric(TestCase):
+
+    def _demo_data_samples(self, batch_size=4, grid_size=(16, 16)):
+        data_samples = []
+        for _ in range(batch_size):
+            data_sample = SegDataSample()
+            gt = torch.randint(0, len(CLASSES), (1, ) + grid_size)
+            gt[0, 0, :4] = 255
+            pred = torch.randint(0, len(CLASSES), (1, ) + grid_size)
+            data_sample.gt_sem_seg = PixelData(data=gt)
+            data_sample.pred_sem_seg = PixelData(data=pred)
+            data_samples.append(data_sample.to_dict())
+        return data_samples
+
+    def test_evaluate(self):
+        batches = [self._demo_data_samples() for _ in range(3)]
+
+        metric = PatchContaminationMetric()
+        metric.dataset_meta = dict(classes=CLASSES)
+        iou_metric = IoUMetric(iou_metrics=['mIoU', 'mDice', 'mFscore'])
+        iou_metric.dataset_meta = dict(classes=CLASSES)
+        for data_samples in batches:
+            metric.process([0] * len(data_samples), data_samples)
+            iou_metric.process([0] * len(data_samples), data_samples)
+        res = metric.evaluate(12)
+        ref = iou_metric.evaluate(12)
+        for key in ('aAcc', 'mIoU', 'mAcc', 'mFscore', 'mPrecision',
+                    'mRecall'):
+            self.assertAlmostEqual(res[key], ref[key], places=2)
+
+        # reference for the merged levels and the frame ratio
+        gts = np.stack([
+            s['gt_sem_seg']['data'].numpy() for b in batches for s in b
+        ]).reshape(12, -1)
+        preds = np.stack([
+            s['pred_sem_seg']['data'].numpy() for b in batches for s in b
+        ]).reshape(12, -1)
+        valid = gts != 255
+        type_gt = np.where(gts > 0, (gts - 1) // 2 + 1, 0)[valid]
+        type_pred = np.where(preds > 0, (preds - 1) // 2 + 1, 0)[valid]
+        self.assertAlmostEqual(
+            res['type_aAcc'],
+            np.round((type_gt == type_pred).mean() * 100, 2),
+            places=2)
+        ious = [((type_gt == c) & (type_pred == c)).sum() /
+                ((type_gt == c) | (type_pred == c)).sum() for c in range(4)]
+        self.assertAlmostEqual(
+            res['type_mIoU'], np.round(np.mean(ious) * 100, 2), places=2)
+        sev_gt = np.where(gts > 0, (gts - 1) % 2 + 1, 0)[valid]
+        sev_pred = np.where(preds > 0, (preds - 1) % 2 + 1, 0)[valid]
+        self.assertAlmostEqual(
+            res['severity_aAcc'],
+            np.round((sev_gt == sev_pred).mean() * 100, 2),
+            places=2)
+
+        ratio_gt = ((gts > 0) & valid).sum(1) / valid.sum(1)
+        ratio_pred = ((preds > 0) & valid).sum(1) / valid.sum(1)
+        error = ratio_pred - ratio_gt
+        self.assertAlmostEqual(
+            res['ratio_MAE'],
+            np.round(np.abs(error).mean() * 100, 2),
+            places=2)
+        self.assertAlmostEqual(
+            res['ratio_RMSE'],
+            np.round(np.sqrt((error**2).mean()) * 100, 2),
+            places=2)
+
+        # the state is reset after evaluation
+        data_samples = self._demo_data_samples()
+        for data_sample in data_samples:
+            data_sample['pred_sem_seg']['data'] = data_sample['gt_sem_seg'][
+                'data'].clone()
+        metric.process([0] * 4, data_samples)
+        res = metric.evaluate(4)
+        self.assertEqual(res['aAcc'], 100.)
+        self.assertEqual(res['type_mIoU'], 100.)
+        self.assertEqual(res['ratio_MAE'], 0.)
+
+    def test_prefix(self):
+        metric = PatchContaminationMetric(prefix='patch')
+        metric.dataset_meta = dict(classes=CLASSES)
+        metric.process([0] * 2, self._demo_data_samples(2))
+        res = metric.evaluate(2)
+        self.assertIn('patch/mIoU', res)
+        self.assertIn('patch/severity_mIoU', res)
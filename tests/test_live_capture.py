@@ -0,0 +1,217 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import threading
+
+import numpy as np
+import pytest
+
+from live_capture import (FrameRingBuffer, LiveCapture, RecordingRanges,
+                          SyntheticSource)
+
+
+def _ring(capacity):
+    source = SyntheticSource(size=(32, 24))
+    ring = FrameRingBuffer(capacity, source.frame_shape)
+
+    def write(num_frames=1):
+        for _ in range(num_frames):
+            ring.write(lambda slot: source.read(slot)[0])
+
+    return ring, write
+
+
+def test_synthetic_source():
+    source = SyntheticSource(size=(32, 24))
+    assert source.isOpened()
+    ret, first = source.read()
+    assert ret and first.shape == (24, 32, 3)
+    image = np.zeros_like(first)
+    ret, second = source.read(image)
+    # reads into the given array and the frames move
+    assert second is image
+    assert not np.array_equal(first, second)
+
+
+def test_consumer_policies():
+    with pytest.raises(AssertionError):
+        FrameRingBuffer(1, (4, 4, 3))
+    ring, write = _ring(4)
+    latest = ring.register('display', 'latest')
+    ordered = ring.register('recording', 'drop_oldest')
+    with pytest.raises(AssertionError):
+        ring.register('other', 'drop_newest')
+    write(10)
+
+    # latest skips to the newest frame
+    assert latest.lag == 10
+    with latest.get() as ref:
+        assert ref.seq == 9
+        np.testing.assert_array_equal(ref.array, ring.slots[ref.slot])
+    assert latest.dropped == 9
+    assert latest.consumed == 1
+    assert latest.lag == 0
+    assert latest.get(timeout=0.01) is None
+
+    # drop_oldest reads in order from the oldest frame still in the ring
+    seqs = []
+    for _ in range(4):
+        with ordered.get() as ref:
+            seqs.append(ref.seq)
+    assert seqs == [6, 7, 8, 9]
+    assert ordered.dropped == 6
+    assert ordered.consumed == 4
+    assert ordered.lag == 0
+
+    write(2)
+    assert latest.lag == 2 and ordered.lag == 2
+    assert ring.summary() == {
+        'captured': 12,
+        'producer_waits': 0,
+        'consumers': {
+            'display': dict(policy='latest', consumed=1, dropped=9, lag=2),
+            'recording':
+            dict(policy='drop_oldest', consumed=4, dropped=6, lag=2)
+        }
+    }
+    ring.unregister('display')
+    assert list(ring.consumers) == ['recording']
+
+
+def test_pinned_slots_are_skipped():
+    ring, write = _ring(3)
+    consumer = ring.register('recording', 'drop_oldest')
+    write(3)
+    ref = consumer.get()
+    assert ref.seq == 0
+    pinned = ref.array.copy()
+
+    # the oldest frame is pinned, the next oldest is overwritten instead
+    write(2)
+    assert sorted(ring.seqs.tolist()) == [0, 3, 4]
+    assert ring.seqs[ref.slot] == 0
+    np.testing.assert_array_equal(ref.array, pinned)
+    assert ring.producer_waits == 0
+
+    # once released, the slot is the oldest one again
+    ref.release()
+    ref.release()
+    write()
+    assert sorted(ring.seqs.tolist()) == [3, 4, 5]
+    with consumer.get() as ref:
+        assert ref.seq == 3
+    assert consumer.dropped == 2
+
+
+def test_producer_waits_for_pinned_slots():
+    ring, write = _ring(2)
+    consumer = ring.register('recording', 'drop_oldest')
+    write(2)
+    refs = [consumer.get(), consumer.get()]
+    assert [ref.seq for ref in refs] == [0, 1]
+
+    # every slot is pinned, the producer waits for a release
+    thread = threading.Thread(target=write)
+    thread.start()
+    thread.join(0.05)
+    assert thread.is_alive()
+    assert ring.write_seq == 2
+    assert ring.producer_waits == 1
+
+    refs[1].release()
+    thread.join(1)
+    assert not thread.is_alive()
+    assert ring.write_seq == 3
+    # the pinned frame is kept
+    assert ring.seqs[refs[0].slot] == 0
+    refs[0].release()
+
+    # close wakes a waiting producer
+    write()
+    refs = [consumer.get(timeout=1), consumer.get(timeout=1)]
+    assert [ref.seq for ref in refs] == [2, 3]
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(ring.write(lambda slot: True)))
+    thread.start()
+    thread.join(0.05)
+    assert thread.is_alive()
+    ring.close()
+    thread.join(1)
+    assert results == [None]
+    assert ring.producer_waits == 2
+
+
+def test_drain_after_close():
+    ring, write = _ring(4)
+    consumer = ring.register('recording', 'drop_oldest')
+    latest = ring.register('display', 'latest')
+    write(3)
+    ring.close()
+    assert ring.closed
+    # no more frames are written, the ones in the ring can still be read
+    assert ring.write(lambda slot: True) is None
+    seqs = []
+    while True:
+        ref = consumer.get(timeout=1)
+        if ref is None:
+            break
+        with ref:
+            seqs.append(ref.seq)
+    assert seqs == [0, 1, 2]
+    with latest.get(timeout=1) as ref:
+        assert ref.seq == 2
+    assert latest.get(timeout=1) is None
+
+
+def test_live_capture():
+    capture = LiveCapture(
+        'synthetic', capacity=4, realtime=False, size=(32, 24))
+    assert capture.isOpened()
+    assert capture.frame_shape == (24, 32, 3)
+    consumer = capture.register('recording', 'drop_oldest')
+    capture.start()
+    seqs = []
+    while len(seqs) < 20:
+        with consumer.get(timeout=1) as ref:
+            seqs.append(ref.seq)
+    capture.stop()
+    assert not capture.is_running()
+    assert seqs == sorted(seqs)
+    assert seqs[-1] + 1 - consumer.dropped == len(seqs)
+    summary = capture.summary()
+    assert summary['captured'] >= 20
+    assert summary['consumers']['recording']['consumed'] == 20
+
+
+def test_recording_ranges():
+    ranges = RecordingRanges()
+    assert not ranges.active
+    assert 0 not in ranges
+    ranges.stop(3)
+    assert 3 not in ranges
+
+    ranges.start(2)
+    assert ranges.active
+    # an open range contains every later frame
+    assert 1 not in ranges and 2 in ranges and 100 in ranges
+    ranges.start(4)
+    ranges.stop(5)
+    assert not ranges.active
+    recorded = [seq for seq in range(7) if seq in ranges]
+    assert recorded == [2, 3, 4]
+
+    # frames read after a pause are recorded as they were captured
+    ring, write = _ring(8)
+    consumer = ring.register('recording', 'drop_oldest')
+    ranges = RecordingRanges()
+    ranges.start(ring.write_seq)
+    write(3)
+    ranges.stop(ring.write_seq)
+    write(2)
+    ranges.start(ring.write_seq)
+    write()
+    recorded = []
+    while consumer.lag:
+        with consumer.get() as ref:
+            if ref.seq in ranges:
+                recorded.append(ref.seq)
+    assert recorded == [0, 1, 2, 5]
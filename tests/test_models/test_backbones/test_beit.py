@@ -114,6 +114,23 @@ def test_beit_backbone():
     assert feat[-1].shape == (1, 768, 14, 14)
 
 
+def test_beit_relative_position_bias_cache():
+    model = BEiT(img_size=(32, 32), embed_dims=32, num_layers=1, num_heads=2)
+    model.init_weights()
+    model.eval()
+    attn = model.layers[0].attn
+    imgs = torch.randn(1, 3, 32, 32)
+    with torch.no_grad():
+        out = model(imgs)
+        bias = attn.get_relative_position_bias()
+        assert attn.get_relative_position_bias() is bias
+        assert bias.shape == (2, 5, 5)
+        attn.relative_position_bias_table.add_(1)
+        assert torch.allclose(attn.get_relative_position_bias(), bias + 1)
+        attn.relative_position_bias_table.sub_(1)
+        assert torch.allclose(model(imgs)[-1], out[-1])
+
+
 def test_beit_init():
     path = 'PATH_THAT_DO_NOT_EXIST'
     # Test all combinations of pretrained and init_cfg
@@ -183,3 +200,30 @@ def test_beit_init():
     # init_cfg=123, whose type is unsupported
     with pytest.raises(AssertionError):
         model = BEiT(pretrained=123, init_cfg=123)
+
+
+def test_beit_sdpa():
+    with pytest.raises(AssertionError):
+        BEiT(attn_impl='flash')
+
+    cfg = dict(
+        img_size=(64, 64),
+        embed_dims=64,
+        num_layers=2,
+        num_heads=4,
+        out_indices=(0, 1))
+    model = BEiT(**cfg)
+    # the relative position bias table is initialized with zeros
+    for layer in model.layers:
+        layer.attn.relative_position_bias_table.data.normal_()
+    model.eval()
+    sdpa_model = BEiT(**cfg, attn_impl='sdpa')
+    # checkpoints are shared between the implementations
+    sdpa_model.load_state_dict(model.state_dict())
+    sdpa_model.eval()
+    temp = torch.randn((2, 3, 64, 64))
+    with torch.no_grad():
+        outs = model(temp)
+        sdpa_outs = sdpa_model(temp)
+    for out, sdpa_out in zip(outs, sdpa_outs):
+        assert torch.allclose(out, sdpa_out, atol=1e-4)
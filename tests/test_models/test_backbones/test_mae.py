@@ -184,3 +184,25 @@ def test_mae_init():
     # init_cfg=123, whose type is unsupported
     with pytest.raises(AssertionError):
         model = MAE(pretrained=123, init_cfg=123)
+
+
+def test_mae_sdpa():
+    cfg = dict(
+        img_size=(64, 64),
+        embed_dims=64,
+        num_layers=2,
+        num_heads=4,
+        out_indices=(0, 1))
+    model = MAE(**cfg)
+    model.eval()
+    sdpa_model = MAE(**cfg, attn_impl='sdpa')
+    assert sdpa_model.layers[0].attn.attn_impl == 'sdpa'
+    # checkpoints are shared between the implementations
+    sdpa_model.load_state_dict(model.state_dict())
+    sdpa_model.eval()
+    temp = torch.randn((2, 3, 64, 64))
+    with torch.no_grad():
+        outs = model(temp)
+        sdpa_outs = sdpa_model(temp)
+    for out, sdpa_out in zip(outs, sdpa_outs):
+        assert torch.allclose(out, sdpa_out, atol=1e-4)
@@ -120,3 +120,33 @@ def test_mit_init():
     # init_cfg=123, whose type is unsupported
     with pytest.raises(AssertionError):
         MixVisionTransformer(pretrained=123, init_cfg=123)
+
+
+def test_mit_sdpa():
+    with pytest.raises(AssertionError):
+        MixVisionTransformer(attn_impl='flash')
+
+    cfg = dict(embed_dims=32, num_heads=[1, 2, 5, 8])
+    model = MixVisionTransformer(**cfg)
+    model.eval()
+    sdpa_model = MixVisionTransformer(**cfg, attn_impl='sdpa')
+    # checkpoints are shared between the implementations
+    sdpa_model.load_state_dict(model.state_dict())
+    sdpa_model.eval()
+    temp = torch.randn((2, 3, 61, 75))
+    with torch.no_grad():
+        outs = model(temp)
+        sdpa_outs = sdpa_model(temp)
+    for out, sdpa_out in zip(outs, sdpa_outs):
+        assert torch.allclose(out, sdpa_out, atol=1e-4)
+
+    # query and key of different lengths
+    attn = EfficientMultiheadAttention(embed_dims=64, num_heads=4, sr_ratio=2)
+    attn.eval()
+    sdpa_attn = EfficientMultiheadAttention(
+        embed_dims=64, num_heads=4, sr_ratio=2, attn_impl='sdpa')
+    sdpa_attn.load_state_dict(attn.state_dict())
+    sdpa_attn.eval()
+    x = torch.randn(2, 8 * 8, 64)
+    with torch.no_grad():
+        assert torch.allclose(attn(x, (8, 8)), sdpa_attn(x, (8, 8)), atol=1e-5)
@@ -2,7 +2,8 @@
 import pytest
 import torch
 
-from mmseg.models.backbones.swin import SwinBlock, SwinTransformer
+from mmseg.models.backbones.swin import (ShiftWindowMSA, SwinBlock,
+                                         SwinTransformer, WindowMSA)
 
 
 def test_swin_block():
@@ -98,3 +99,88 @@ def test_swin_transformer():
     model.init_weights()
     model.train()
     model(temp)
+
+
+def _loop_attn_mask(window_size, shift_size, H_pad, W_pad):
+    """Reference mask built region by region."""
+    img_mask = torch.zeros((1, H_pad, W_pad, 1))
+    slices = (slice(0, -window_size), slice(-window_size, -shift_size),
+              slice(-shift_size, None))
+    cnt = 0
+    for h in slices:
+        for w in slices:
+            img_mask[:, h, w, :] = cnt
+            cnt += 1
+    mask_windows = img_mask.view(1, H_pad // window_size, window_size,
+                                 W_pad // window_size, window_size, 1)
+    mask_windows = mask_windows.permute(0, 1, 3, 2, 4, 5)
+    mask_windows = mask_windows.reshape(-1, window_size * window_size)
+    attn_mask = mask_windows.unsqueeze(1) - mask_windows.unsqueeze(2)
+    attn_mask = attn_mask.masked_fill(attn_mask != 0, -100.)
+    return attn_mask.masked_fill(attn_mask == 0, 0.)
+
+
+def test_shift_window_msa_cache():
+    msa = ShiftWindowMSA(
+        embed_dims=32, num_heads=4, window_size=7, shift_size=3)
+    for H_pad, W_pad in [(7, 7), (14, 21), (56, 56)]:
+        attn_mask = msa.get_attn_mask(H_pad, W_pad, torch.device('cpu'),
+                                      torch.float32)
+        assert torch.equal(attn_mask, _loop_attn_mask(7, 3, H_pad, W_pad))
+        # built once per size
+        assert msa.get_attn_mask(H_pad, W_pad, torch.device('cpu'),
+                                 torch.float32) is attn_mask
+    msa.half()
+    assert not msa._mask_cache
+
+    # the relative position bias is cached without gradients and follows
+    # in-place updates of the table
+    w_msa = WindowMSA(embed_dims=32, num_heads=4, window_size=(7, 7))
+    w_msa.init_weights()
+    x = torch.randn(2, 49, 32)
+    with torch.no_grad():
+        bias = w_msa.get_relative_position_bias()
+        assert w_msa.get_relative_position_bias() is bias
+        w_msa.relative_position_bias_table.add_(1)
+        new_bias = w_msa.get_relative_position_bias()
+        assert torch.allclose(new_bias, bias + 1)
+    # not cached when the table needs gradients
+    w_msa(x).sum().backward()
+    assert w_msa.relative_position_bias_table.grad is not None
+
+
+@pytest.mark.skipif(
+    not hasattr(torch.nn.functional, 'scaled_dot_product_attention'),
+    reason='requires scaled_dot_product_attention')
+def test_swin_sdpa():
+    with pytest.raises(AssertionError):
+        SwinTransformer(attn_impl='flash')
+
+    model = SwinTransformer(
+        depths=(2, 2), num_heads=(2, 4), out_indices=(0, 1))
+    model.init_weights()
+    model.eval()
+    sdpa_model = SwinTransformer(
+        depths=(2, 2), num_heads=(2, 4), out_indices=(0, 1), attn_impl='sdpa')
+    # checkpoints are shared between the implementations
+    sdpa_model.load_state_dict(model.state_dict())
+    sdpa_model.eval()
+    for m in sdpa_model.modules():
+        if isinstance(m, WindowMSA):
+            assert m.attn_impl == 'sdpa'
+    temp = torch.randn((2, 3, 112, 137))
+    with torch.no_grad():
+        outs = model(temp)
+        sdpa_outs = sdpa_model(temp)
+    for out, sdpa_out in zip(outs, sdpa_outs):
+        assert torch.allclose(out, sdpa_out, atol=1e-4)
+
+    # training with dropout on the attention
+    sdpa_model = SwinTransformer(
+        depths=(2, 2),
+        num_heads=(2, 4),
+        out_indices=(0, 1),
+        attn_drop_rate=0.1,
+        attn_impl='sdpa')
+    sdpa_model.train()
+    sum(out.sum() for out in sdpa_model(temp)).backward()
@@ -169,3 +169,33 @@ def test_conditional_position_encoding_module():
     CPE = ConditionalPositionEncoding(in_channels=32, embed_dims=32, stride=2)
     outs = CPE(torch.randn(1, 3136, 32), (56, 56))
     assert outs.shape == torch.Size([1, 784, 32])
+
+
+def test_twins_sdpa():
+    with pytest.raises(AssertionError):
+        LocallyGroupedSelfAttention(embed_dims=32, attn_impl='flash')
+
+    for backbone in (PCPVT, SVT):
+        cfg = dict(
+            in_channels=3,
+            embed_dims=[32, 64, 128],
+            num_heads=[1, 2, 4],
+            mlp_ratios=[4, 4, 4],
+            depths=[1, 1, 1],
+            sr_ratios=[4, 2, 1],
+            out_indices=(0, 1, 2))
+        if backbone is SVT:
+            cfg['windiow_sizes'] = [4, 4, 4]
+        model = backbone(**cfg)
+        model.eval()
+        sdpa_model = backbone(**cfg, attn_impl='sdpa')
+        # checkpoints are shared between the implementations
+        sdpa_model.load_state_dict(model.state_dict())
+        sdpa_model.eval()
+        # the local windows of SVT are padded
+        temp = torch.randn((2, 3, 70, 90))
+        with torch.no_grad():
+            outs = model(temp)
+            sdpa_outs = sdpa_model(temp)
+        for out, sdpa_out in zip(outs, sdpa_outs):
+            assert torch.allclose(out, sdpa_out, atol=1e-4)
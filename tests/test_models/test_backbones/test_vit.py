@@ -129,6 +129,38 @@ def test_vit_backbone():
     assert x_out.shape == torch.Size([1, 56 * 56, 64])
 
 
+def test_vit_pos_embed_cache():
+    model = VisionTransformer(
+        img_size=(64, 64),
+        patch_size=16,
+        embed_dims=32,
+        num_layers=1,
+        num_heads=2)
+    model.init_weights()
+    model.eval()
+    imgs = torch.randn(1, 3, 96, 128)
+    with torch.no_grad():
+        out = model(imgs)
+        pos_embed = model._pos_embed_cache.get((6, 8), (model.pos_embed, ),
+                                               None)
+        assert torch.equal(
+            pos_embed,
+            model.resize_pos_embed(model.pos_embed, (6, 8), (4, 4),
+                                   model.interpolate_mode))
+        assert torch.equal(model(imgs)[0], out[0])
+
+        # updating the parameter invalidates the cache
+        model.pos_embed.add_(1)
+        assert not torch.equal(model(imgs)[0], out[0])
+
+    # no caching while training pos_embed
+    model.train()
+    model._pos_embed_cache.clear()
+    model(imgs)[0].sum().backward()
+    assert len(model._pos_embed_cache) == 0
+    assert model.pos_embed.grad is not None
+
+
 def test_vit_init():
     path = 'PATH_THAT_DO_NOT_EXIST'
     # Test all combinations of pretrained and init_cfg
@@ -183,3 +215,27 @@ def test_vit_init():
     # init_cfg=123, whose type is unsupported
     with pytest.raises(AssertionError):
         model = VisionTransformer(pretrained=123, init_cfg=123)
+
+
+def test_vit_sdpa():
+    with pytest.raises(AssertionError):
+        VisionTransformer(attn_impl='flash')
+
+    cfg = dict(
+        img_size=(64, 64),
+        embed_dims=64,
+        num_layers=2,
+        num_heads=4,
+        out_indices=(0, 1))
+    model = VisionTransformer(**cfg)
+    model.eval()
+    sdpa_model = VisionTransformer(**cfg, attn_impl='sdpa')
+    # checkpoints are shared between the implementations
+    sdpa_model.load_state_dict(model.state_dict())
+    sdpa_model.eval()
+    temp = torch.randn((2, 3, 64, 80))
+    with torch.no_grad():
+        outs = model(temp)
+        sdpa_outs = sdpa_model(temp)
+    for out, sdpa_out in zip(outs, sdpa_outs):
+        assert torch.allclose(out, sdpa_out, atol=1e-4)
@@ -0,0 +1,130 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import mmcv
+import numpy as np
+import torch
+from mmengine.structures import PixelData
+
+from mmseg.models import (BatchPhotoMetricDistortion, BatchRandomFlip,
+                          SegDataPreProcessor)
+from mmseg.models.batch_augments import bgr_to_hsv, hsv_to_bgr
+from mmseg.structures import SegDataSample
+
+
+def _data_samples(num, size=(16, 16)):
+    data_samples = []
+    for _ in range(num):
+        data_sample = SegDataSample()
+        data_sample.gt_sem_seg = PixelData(
+            data=torch.randint(0, 7, (1, ) + size))
+        data_samples.append(data_sample)
+    return data_samples
+
+
+def test_hsv_conversion():
+    img = np.random.randint(0, 256, (8, 8, 3), dtype=np.uint8)
+    inputs = torch.from_numpy(img).permute(2, 0, 1)[None].float()
+    hsv = bgr_to_hsv(inputs)
+    expected = mmcv.bgr2hsv(img).astype(np.float32)
+    diff = (hsv[0].permute(1, 2, 0).numpy() - expected)
+    # hue wraps around at 180
+    diff[..., 0] = (diff[..., 0] + 90) % 180 - 90
+    assert np.abs(diff).max() <= 1.5
+    assert torch.allclose(hsv_to_bgr(hsv), inputs, atol=1e-3)
+
+
+def test_batch_photo_metric_distortion():
+    inputs = torch.randint(0, 256, (4, 3, 32, 32)).float()
+    data_samples = _data_samples(4)
+
+    # nothing is applied with prob=0
+    transform = BatchPhotoMetricDistortion(prob=0.)
+    outputs, out_samples = transform(inputs, data_samples)
+    assert out_samples is data_samples
+    assert torch.allclose(outputs, inputs, atol=1e-3)
+
+    transform = BatchPhotoMetricDistortion(prob=1.)
+    outputs, _ = transform(inputs, data_samples)
+    assert outputs.shape == inputs.shape
+    assert outputs.min() >= 0 and outputs.max() <= 255
+    # every sample draws its own parameters
+    assert not torch.allclose(outputs[0] - inputs[0], outputs[1] - inputs[1])
+
+    # brightness only
+    transform = BatchPhotoMetricDistortion(
+        contrast_range=(1., 1.),
+        saturation_range=(1., 1.),
+        hue_delta=1,
+        prob=1.)
+    inputs = torch.full((2, 3, 4, 4), 100.)
+    outputs, _ = transform(inputs, data_samples[:2])
+    delta = outputs - inputs
+    assert (delta.abs() <= 32).all()
+    assert torch.allclose(
+        delta, delta[:, :1, :1, :1].expand_as(delta), atol=1e-3)
+
+    assert repr(BatchPhotoMetricDistortion()) == (
+        'BatchPhotoMetricDistortion(brightness_delta=32, '
+        'contrast_range=(0.5, 1.5), saturation_range=(0.5, 1.5), '
+        'hue_delta=18, prob=0.5)')
+
+
+def test_batch_random_flip():
+    inputs = torch.rand(3, 3, 64, 64)
+    data_samples = _data_samples(3)
+    labels = [s.gt_sem_seg.data.clone() for s in data_samples]
+
+    transform = BatchRandomFlip(prob=1.)
+    outputs, data_samples = transform(inputs, data_samples)
+    assert torch.equal(outputs, inputs.flip(-1))
+    for data_sample, label in zip(data_samples, labels):
+        assert torch.equal(data_sample.gt_sem_seg.data, label.flip(-1))
+        assert data_sample.flip
+        assert data_sample.flip_direction == 'horizontal'
+
+    transform = BatchRandomFlip(prob=0., direction='vertical')
+    outputs, data_samples = transform(inputs, data_samples)
+    assert torch.equal(outputs, inputs)
+    assert not data_samples[0].flip
+
+    transform = BatchRandomFlip(prob=1., direction='vertical')
+    outputs, data_samples = transform(inputs, data_samples)
+    assert torch.equal(outputs, inputs.flip(-2))
+    assert torch.equal(data_samples[0].gt_sem_seg.data,
+                       labels[0].flip(-1).flip(-2))
+
+    # a mixed batch keeps images and label grids consistent
+    transform = BatchRandomFlip(prob=0.5)
+    inputs = torch.arange(64.).view(1, 1, 1, 64).repeat(8, 3, 64, 1)
+    data_samples = _data_samples(8)
+    for data_sample in data_samples:
+        data_sample.gt_sem_seg.data = torch.arange(16).view(1, 1, 16).repeat(
+            1, 16, 1)
+    outputs, data_samples = transform(inputs, data_samples)
+    for output, data_sample in zip(outputs, data_samples):
+        image_flipped = bool(output[0, 0, 0] == 63)
+        label_flipped = bool(data_sample.gt_sem_seg.data[0, 0, 0] == 15)
+        assert image_flipped == label_flipped == data_sample.flip
+
+
+def test_data_preprocessor_batch_augments():
+    processor = SegDataPreProcessor(
+        mean=[0, 0, 0],
+        std=[1, 1, 1],
+        bgr_to_rgb=True,
+        size=(32, 32),
+        batch_augments=[dict(type='BatchRandomFlip', prob=1.)])
+    inputs = [torch.randint(0, 256, (3, 32, 32)) for _ in range(2)]
+    data_samples = _data_samples(2)
+    labels = [s.gt_sem_seg.data.clone() for s in data_samples]
+    out = processor(
+        dict(inputs=inputs, data_samples=data_samples), training=True)
+    # flipped before the channel conversion
+    expected = torch.stack(inputs).flip(-1)[:, [2, 1, 0]].float()
+    assert torch.equal(out['inputs'], expected)
+    for data_sample, label in zip(out['data_samples'], labels):
+        assert torch.equal(data_sample.gt_sem_seg.data, label.flip(-1))
+
+    # no batch augmentation in testing
+    out = processor(dict(inputs=inputs, data_samples=_data_samples(2)))
+    assert torch.equal(out['inputs'],
+                       torch.stack(inputs)[:, [2, 1, 0]].float())
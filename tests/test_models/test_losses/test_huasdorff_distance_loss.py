@@ -1,8 +1,10 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import pytest
 import torch
+from scipy.ndimage import distance_transform_edt
 
 from mmseg.models.losses import HuasdorffDisstanceLoss
+from mmseg.models.losses.huasdorff_distance_loss import compute_dtm
 
 
 def test_huasdorff_distance_loss():
@@ -27,3 +29,26 @@ def test_huasdorff_distance_loss():
     # Test loss forward with class_weight
     with pytest.raises(AssertionError):
         loss_class(class_weight=class_weight)(pred, target)
+
+
+def test_compute_dtm():
+    # the previous per sample and class implementation on scipy
+    def scipy_compute_dtm(img_gt, pred):
+        fg_dtm = torch.zeros_like(pred)
+        for b in range(pred.shape[0]):
+            for c in range(1, pred.shape[1]):
+                posmask = img_gt[b].byte()
+                if posmask.any():
+                    fg_dtm[b][c] = torch.from_numpy(
+                        distance_transform_edt(posmask))
+        return fg_dtm
+
+    pred = torch.rand((4, 5, 24, 20)).softmax(dim=1)
+    target = torch.randint(0, 5, (4, 24, 20))
+    target[1] = 0
+    target[2] = 3
+    for img_gt in (target, pred.argmax(dim=1)):
+        assert torch.allclose(
+            compute_dtm(img_gt, pred),
+            scipy_compute_dtm(img_gt, pred),
+            atol=1e-5)
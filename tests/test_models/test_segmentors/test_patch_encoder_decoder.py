@@ -0,0 +1,222 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numpy as np
+import pytest
+import torch
+from mmengine import ConfigDict
+from mmengine.registry import init_default_scope
+
+from mmseg.models import build_segmentor
+
+init_default_scope('mmseg')
+
+
+def _build_patchnet(test_cfg=None):
+    norm_cfg = dict(type='BN', requires_grad=True)
+    cfg = ConfigDict(
+        type='Patch_EncoderDecoder',
+        data_preprocessor=dict(
+            type='SegDataPreProcessor',
+            mean=[123.675, 116.28, 103.53],
+            std=[58.395, 57.12, 57.375],
+            bgr_to_rgb=True),
+        backbone=dict(
+            type='ResNet', depth=10, num_stages=4, norm_cfg=norm_cfg),
+        decode_head=dict(
+            type='PatchnetHead',
+            in_channels=[64, 128, 256, 512],
+            in_index=[0, 1, 2, 3],
+            seg_head=True,
+            corruption_head=True,
+            channels=512,
+            num_classes=3,
+            norm_cfg=norm_cfg,
+            input_transform='multiple_select'),
+        train_cfg=None,
+        test_cfg=test_cfg or dict(mode='whole'))
+    model = build_segmentor(cfg)
+    model.eval()
+    return model
+
+
+def test_predict_batch():
+    model = _build_patchnet()
+    frames = np.random.randint(0, 256, (3, 64, 64, 3), dtype=np.uint8)
+
+    labels = model.predict_batch(frames)
+    assert labels.shape == (3, 16, 16)
+    assert labels.dtype == np.uint8
+    assert labels.max() <= 6
+
+    # consistent with the data preprocessor + predict path
+    data = dict(inputs=[torch.from_numpy(f).permute(2, 0, 1) for f in frames])
+    inputs = model.data_preprocessor(data)['inputs']
+    with torch.no_grad():
+        results = model.predict(inputs)
+    expected = np.stack(
+        [r.pred_sem_seg.data.squeeze(0).numpy() for r in results])
+    np.testing.assert_array_equal(labels, expected)
+
+    # list input, chunked forward and resizing to a fixed shape
+    frame_list = [frames[0], frames[1, :32], frames[2]]
+    chunked = model.predict_batch(frame_list, size=(64, 64), batch_size=2)
+    assert chunked.shape == (3, 16, 16)
+    np.testing.assert_array_equal(chunked[[0, 2]], labels[[0, 2]])
+
+    assert model.predict_batch([]).shape == (0, 16, 16)
+
+
+def _mask_fusion(seg_out, corruption_outs, low=0.33, high=0.66):
+    """Reference label fusion with one boolean mask per class."""
+    prediction = torch.zeros_like(corruption_outs)
+    seg_out = seg_out.argmax(dim=1, keepdim=True)
+    corruption_outs = corruption_outs.sigmoid()
+    blur = (corruption_outs >= low) & (corruption_outs < high)
+    blockage = corruption_outs >= high
+    for seg_type in (1, 2, 3):
+        prediction[blur & (seg_out == seg_type)] = 2 * seg_type - 1
+        prediction[blockage & (seg_out == seg_type)] = 2 * seg_type
+    return prediction
+
+
+def test_fuse_labels():
+    model = _build_patchnet()
+    seg_out = torch.randn(2, 3, 16, 16)
+    corruption_outs = torch.randn(2, 1, 16, 16) * 3
+    labels = model.fuse_labels(seg_out, corruption_outs)
+    assert labels.shape == (2, 1, 16, 16)
+    assert labels.dtype == torch.uint8
+    assert torch.equal(labels.float(), _mask_fusion(seg_out, corruption_outs))
+
+    # configurable thresholds and 4 types, type 3 is snow
+    model = build_segmentor(
+        ConfigDict(
+            type='Patch_EncoderDecoder',
+            backbone=dict(type='ResNet', depth=10, num_stages=4),
+            decode_head=dict(
+                type='PatchnetHead',
+                in_channels=[64, 128, 256, 512],
+                in_index=[0, 1, 2, 3],
+                seg_head=True,
+                corruption_head=True,
+                channels=512,
+                num_classes=4,
+                input_transform='multiple_select'),
+            severity_thresholds=(0.2, 0.5),
+            test_cfg=dict(mode='whole')))
+    seg_out = torch.randn(2, 4, 16, 16)
+    labels = model.fuse_labels(seg_out, corruption_outs)
+    expected = _mask_fusion(seg_out, corruption_outs, 0.2, 0.5)
+    assert torch.equal(labels.float(), expected)
+    assert labels.max() <= 6
+
+    # the labels only have blur and blockage severities
+    for severity_thresholds in ((0.5, ), (0.2, 0.5, 0.8), (0.5, 0.2)):
+        with pytest.raises(AssertionError):
+            model._init_label_lut(severity_thresholds)
+
+
+def test_forward_labels():
+    model = _build_patchnet()
+    inputs = torch.randn(2, 3, 64, 64)
+    with torch.no_grad():
+        labels, scores = model.forward_labels(inputs)
+        expected = model.encode_decode(inputs, None).squeeze(1)
+    assert labels.shape == (2, 16, 16)
+    assert labels.dtype == torch.uint8
+    assert torch.equal(labels, expected)
+    assert torch.allclose(scores, (expected > 0).float().mean(dim=(1, 2)))
+
+    # traced graph used by the deployment export
+    model.forward = model.forward_labels
+    with torch.no_grad():
+        traced = torch.jit.trace(model, inputs)
+        inputs = torch.randn(3, 3, 64, 64)
+        traced_labels, traced_scores = traced(inputs)
+        labels, scores = model.forward_labels(inputs)
+    assert torch.equal(traced_labels, labels)
+    assert torch.allclose(traced_scores, scores)
+
+
+def test_predict_batch_precision():
+    from mmseg.apis import inference_context
+    model = _build_patchnet()
+    frames = np.random.randint(0, 256, (2, 64, 64, 3), dtype=np.uint8)
+    model.precision = 'fp32'
+    with inference_context(model):
+        expected = model.predict_batch(frames)
+        assert torch.is_inference_mode_enabled()
+
+    model.to(memory_format=torch.channels_last)
+    with inference_context(model):
+        labels = model.predict_batch(frames)
+    assert (labels == expected).mean() > 0.95
+
+    model.precision = 'bf16'
+    with inference_context(model):
+        assert torch.is_autocast_cpu_enabled()
+        labels = model.predict_batch(frames)
+    assert labels.shape == (2, 16, 16)
+    assert labels.dtype == np.uint8
+    assert labels.max() <= 6
+    # the model precision can be overridden for reference results
+    with inference_context(model, 'fp32'):
+        assert not torch.is_autocast_cpu_enabled()
+
+
+def test_predict_scores():
+    model = _build_patchnet()
+    frames = np.random.randint(0, 256, (3, 64, 64, 3), dtype=np.uint8)
+    type_probs, scores = model.predict_scores(frames, batch_size=2)
+    assert type_probs.shape == (3, 3, 16, 16)
+    assert scores.shape == (3, 16, 16)
+    np.testing.assert_allclose(type_probs.sum(1), 1, rtol=1e-5)
+
+    # fusing the scores gives the labels of predict_batch
+    labels = model.fuse_labels(
+        torch.from_numpy(type_probs),
+        torch.from_numpy(scores).unsqueeze(1).logit()).squeeze(1)
+    np.testing.assert_array_equal(labels.numpy(), model.predict_batch(frames))
+
+    type_probs, scores = model.predict_scores([])
+    assert type_probs.shape == (0, 3, 16, 16) and scores.shape == (0, 16, 16)
+
+
+def test_slide_inference():
+    model = _build_patchnet(
+        dict(mode='slide', crop_size=(64, 64), stride=(48, 48)))
+    inputs = torch.randn(2, 3, 64, 64)
+    batch_img_metas = [
+        dict(ori_shape=(64, 64), img_shape=(64, 64), pad_shape=(64, 64))
+    ] * 2
+    with torch.no_grad():
+        # a single crop covering the image is the same as whole inference
+        labels = model.slide_inference(inputs, batch_img_metas)
+        expected = model.encode_decode(inputs, batch_img_metas)
+    assert torch.equal(labels, expected)
+
+    # overlapping crops, forwarded all at once or in batches of 3 crops
+    inputs = torch.randn(2, 3, 112, 160)
+    with torch.no_grad():
+        labels = model.slide_inference(inputs, batch_img_metas)
+        model.test_cfg.max_crop_batch = 3
+        chunked = model.slide_inference(inputs, batch_img_metas)
+    assert labels.shape == (2, 1, 16, 16)
+    assert labels.dtype == torch.uint8
+    assert torch.equal(labels, chunked)
+
+    # non-overlapping crops are averaged onto the image patch grid
+    model.test_cfg.stride = (64, 64)
+    model.test_cfg.max_crop_batch = None
+    inputs = torch.randn(1, 3, 128, 128)
+    with torch.no_grad():
+        labels = model.slide_inference(inputs, batch_img_metas[:1])
+        grid = torch.zeros(1, 4, 32, 32)
+        for y in (0, 64):
+            for x in (0, 64):
+                seg_out, corruption_outs = model.decode_head.forward(
+                    model.extract_feat(inputs[:, :, y:y + 64, x:x + 64]))
+                grid[:, :, y // 4:y // 4 + 16, x // 4:x // 4 + 16] = \
+                    torch.cat([seg_out, corruption_outs], dim=1)
+        grid = torch.nn.functional.adaptive_avg_pool2d(grid, (16, 16))
+        expected = model.fuse_labels(grid[:, :-1], grid[:, -1:])
+    assert torch.equal(labels, expected)
@@ -1,4 +1,5 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import copy
 import tempfile
 
 import torch
@@ -9,6 +10,7 @@ from mmengine.structures import PixelData
 
 from mmseg.registry import MODELS
 from mmseg.structures import SegDataSample
+from mmseg.utils import stack_batch
 from .utils import *  # noqa: F401,F403
 
 init_default_scope('mmseg')
@@ -61,3 +63,195 @@ def test_encoder_decoder_tta():
     for data_sample in data_samples:
         data_sample[0].gt_sem_seg.data = torch.randint(0, 2, (1, 10, 10))
     model.test_step(dict(inputs=imgs, data_samples=data_samples))
+
+
+def _tta_data(num_augs, ori_shape=(10, 10), num_classes=19):
+    """Two scales with and without a horizontal flip per image."""
+    inputs, data_samples = [], []
+    for i in range(num_augs):
+        shape = (ori_shape[0] + i // 2 * 4, ori_shape[1] + i // 2 * 4)
+        inputs.append([torch.randn(3, *shape) for _ in range(2)])
+        data_samples.append([
+            SegDataSample(
+                metainfo=dict(
+                    ori_shape=ori_shape,
+                    img_shape=shape,
+                    flip=(i % 2 == 1),
+                    flip_direction='horizontal',
+                    img_path=tempfile.mktemp()),
+                gt_sem_seg=PixelData(
+                    data=torch.randint(0, num_classes, (1, *ori_shape))))
+            for _ in range(2)
+        ])
+    return dict(inputs=inputs, data_samples=data_samples)
+
+
+def test_batched_tta():
+    segmentor_cfg = ConfigDict(
+        type='EncoderDecoder',
+        data_preprocessor=dict(
+            type='SegDataPreProcessor', test_cfg=dict(size_divisor=8)),
+        backbone=dict(type='ExampleBackbone'),
+        decode_head=dict(type='ExampleDecodeHead'),
+        train_cfg=None,
+        test_cfg=dict(mode='whole'))
+    model = MODELS.build(ConfigDict(type='SegTTAModel', module=segmentor_cfg))
+    model.eval()
+    data = _tta_data(4)
+
+    forwards = []
+    inference = model.module.inference
+
+    def count_inference(inputs, batch_img_metas):
+        forwards.append(len(inputs))
+        return inference(inputs, batch_img_metas)
+
+    model.module.inference = count_inference
+    with torch.no_grad():
+        results = model.test_step(copy.deepcopy(data))
+    # the flipped and unflipped views of a scale are forwarded together
+    assert forwards == [4, 4]
+
+    # the same as averaging the post-processed predictions of every view
+    with torch.no_grad():
+        views = [
+            model.module.test_step(
+                dict(inputs=inputs, data_samples=data_samples))
+            for inputs, data_samples in zip(*copy.deepcopy(data).values())
+        ]
+    for i, result in enumerate(results):
+        probs = sum(view[i].seg_logits.data.softmax(dim=0)
+                    for view in views) / len(views)
+        assert result.pred_sem_seg.shape == (10, 10)
+        assert torch.allclose(result.seg_logits.data, probs, atol=1e-5)
+        assert torch.equal(result.pred_sem_seg.data,
+                           probs.argmax(dim=0, keepdim=True))
+        assert 'gt_sem_seg' in result
+
+    # a memory budget of one image per forward
+    forwards.clear()
+    model.max_batch_pixels = 16 * 16
+    with torch.no_grad():
+        chunked = model.test_step(copy.deepcopy(data))
+    assert forwards == [1] * 8
+    for result, chunked_result in zip(results, chunked):
+        assert torch.allclose(result.seg_logits.data,
+                              chunked_result.seg_logits.data)
+
+
+def test_batched_tta_mixed_shapes():
+    segmentor_cfg = ConfigDict(
+        type='EncoderDecoder',
+        data_preprocessor=dict(type='SegDataPreProcessor'),
+        backbone=dict(type='ExampleBackbone'),
+        decode_head=dict(type='ExampleDecodeHead'),
+        train_cfg=None,
+        test_cfg=dict(mode='whole'))
+    model = MODELS.build(ConfigDict(type='SegTTAModel', module=segmentor_cfg))
+    model.eval()
+
+    def pad_forward(data, training=False):
+        # pad images of different shapes in a batch
+        inputs, padded_samples = stack_batch(
+            [img.float() for img in data['inputs']], size_divisor=8)
+        for data_sample, pad_info in zip(data['data_samples'], padded_samples):
+            data_sample.set_metainfo(pad_info)
+        return dict(inputs=inputs, data_samples=data['data_samples'])
+
+    model.module.data_preprocessor.forward = pad_forward
+    # the first image has the same shape at both scales, the second not
+    ori_shapes = [(10, 10), (12, 12)]
+    scales = [[(10, 10), (12, 12)], [(10, 10), (20, 20)]]
+    inputs, data_samples = [], []
+    for i in range(4):
+        shapes = scales[i // 2]
+        inputs.append([torch.randn(3, *shape) for shape in shapes])
+        data_samples.append([
+            SegDataSample(
+                metainfo=dict(
+                    ori_shape=ori_shape,
+                    img_shape=shape,
+                    flip=(i % 2 == 1),
+                    flip_direction='horizontal'))
+            for ori_shape, shape in zip(ori_shapes, shapes)
+        ])
+    data = dict(inputs=inputs, data_samples=data_samples)
+
+    forwards = []
+    inference = model.module.inference
+
+    def count_inference(inputs, batch_img_metas):
+        forwards.append(tuple(inputs.shape))
+        return inference(inputs, batch_img_metas)
+
+    model.module.inference = count_inference
+    with torch.no_grad():
+        results = model.test_step(copy.deepcopy(data))
+    # the scales are padded to different shapes and forwarded separately
+    assert sorted(forwards) == [(4, 3, 16, 16), (4, 3, 24, 24)]
+
+    with torch.no_grad():
+        views = [
+            model.module.test_step(
+                dict(inputs=inputs, data_samples=data_samples))
+            for inputs, data_samples in zip(*copy.deepcopy(data).values())
+        ]
+    for i, result in enumerate(results):
+        probs = sum(view[i].seg_logits.data.softmax(dim=0)
+                    for view in views) / len(views)
+        assert result.pred_sem_seg.shape == ori_shapes[i]
+        assert torch.allclose(result.seg_logits.data, probs, atol=1e-5)
+
+
+def test_patch_encoder_decoder_tta():
+    norm_cfg = dict(type='BN', requires_grad=True)
+    segmentor_cfg = ConfigDict(
+        type='Patch_EncoderDecoder',
+        data_preprocessor=dict(type='SegDataPreProcessor'),
+        backbone=dict(
+            type='ResNet', depth=10, num_stages=4, norm_cfg=norm_cfg),
+        decode_head=dict(
+            type='PatchnetHead',
+            in_channels=[64, 128, 256, 512],
+            in_index=[0, 1, 2, 3],
+            seg_head=True,
+            corruption_head=True,
+            channels=512,
+            num_classes=3,
+            norm_cfg=norm_cfg,
+            input_transform='multiple_select'),
+        train_cfg=None,
+        test_cfg=dict(mode='whole'))
+    model = MODELS.build(ConfigDict(type='SegTTAModel', module=segmentor_cfg))
+    model.eval()
+    data = _tta_data(4, ori_shape=(64, 64), num_classes=7)
+    with torch.no_grad():
+        results = model.test_step(copy.deepcopy(data))
+
+    module = model.module
+    with torch.no_grad():
+        scores = 0
+        for inputs, data_samples in zip(*data.values()):
+            inputs = torch.stack(inputs)
+            logits = module.inference_logits(
+                inputs, [data_sample.metainfo for data_sample in data_samples])
+            if data_samples[0].flip:
+                logits = logits.flip(dims=(3, ))
+            scores = scores + torch.cat(
+                [logits[:, :-1].softmax(dim=1), logits[:, -1:].sigmoid()],
+                dim=1)
+        scores = scores / len(data['inputs'])
+        labels = module.fuse_scores(scores[:, :-1], scores[:, -1:])
+    for i, result in enumerate(results):
+        assert result.pred_sem_seg.shape == (16, 16)
+        assert result.pred_sem_seg.data.dtype == torch.uint8
+        assert torch.allclose(result.seg_logits.data, scores[i], atol=1e-5)
+        assert torch.equal(result.pred_sem_seg.data, labels[i])
+
+    # fusing the scores of one view is the same as fusing its logits
+    with torch.no_grad():
+        logits = module.inference_logits(
+            inputs, [data_sample.metainfo for data_sample in data_samples])
+    assert torch.equal(
+        module.fuse_scores(logits[:, :-1], logits[:, -1:].sigmoid()),
+        module.fuse_labels(logits[:, :-1], logits[:, -1:]))
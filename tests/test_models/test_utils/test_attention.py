@@ -0,0 +1,59 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import pytest
+import torch
+import torch.nn as nn
+from mmcv.cnn.bricks.transformer import MultiheadAttention
+
+from mmseg.models.utils import (SDPAMultiheadAttention, check_attn_impl,
+                                sdpa_multihead_attention)
+
+
+def test_check_attn_impl():
+    check_attn_impl('math')
+    check_attn_impl('sdpa')
+    with pytest.raises(AssertionError):
+        check_attn_impl('flash')
+
+
+def test_sdpa_multihead_attention():
+    attn = nn.MultiheadAttention(64, 4, batch_first=True)
+    attn.eval()
+    query = torch.randn(2, 10, 64)
+    key = torch.randn(2, 7, 64)
+    value = torch.randn(2, 7, 64)
+    with torch.no_grad():
+        # self-attention with a fused input projection
+        assert torch.allclose(
+            sdpa_multihead_attention(attn, query, query, query),
+            attn(query, query, query)[0],
+            atol=1e-5)
+        # shared key and value
+        assert torch.allclose(
+            sdpa_multihead_attention(attn, query, key, key),
+            attn(query, key, key)[0],
+            atol=1e-5)
+        assert torch.allclose(
+            sdpa_multihead_attention(attn, query, key, value),
+            attn(query, key, value)[0],
+            atol=1e-5)
+
+
+@pytest.mark.parametrize('batch_first', [True, False])
+def test_sdpa_mmcv_multihead_attention(batch_first):
+    attn = MultiheadAttention(64, 4, batch_first=batch_first)
+    attn.eval()
+    sdpa_attn = SDPAMultiheadAttention(64, 4, batch_first=batch_first)
+    sdpa_attn.load_state_dict(attn.state_dict())
+    sdpa_attn.eval()
+    query = torch.randn(2, 10, 64)
+    key = torch.randn(2, 10, 64)
+    query_pos = torch.randn(2, 10, 64)
+    with torch.no_grad():
+        assert torch.allclose(attn(query), sdpa_attn(query), atol=1e-5)
+        assert torch.allclose(
+            attn(query, key), sdpa_attn(query, key), atol=1e-5)
+        # falls back to the mmcv implementation
+        assert torch.allclose(
+            attn(query, query_pos=query_pos),
+            sdpa_attn(query, query_pos=query_pos),
+            atol=1e-5)
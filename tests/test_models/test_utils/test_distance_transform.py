@@ -0,0 +1,42 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numpy as np
+import pytest
+import torch
+from scipy.ndimage import distance_transform_edt as scipy_edt
+
+from mmseg.models.utils import distance_transform_edt
+
+
+@pytest.mark.parametrize('shape,ratio', [((1, 1), 0.5), ((1, 9), 0.5),
+                                         ((9, 1), 0.5), ((13, 17), 0.9),
+                                         ((17, 13), 0.3), ((64, 48), 0.99),
+                                         ((5, 5), 1.0), ((5, 5), 0.0)])
+def test_distance_transform_edt(shape, ratio):
+    rng = np.random.default_rng(0)
+    masks = (rng.random((2, 3, *shape)) < ratio).astype(np.uint8)
+    expected = np.stack(
+        [scipy_edt(mask) for mask in masks.reshape(-1, *shape)])
+    out = distance_transform_edt(torch.from_numpy(masks))
+    assert out.shape == masks.shape and out.dtype == torch.float32
+    np.testing.assert_allclose(
+        out.numpy().reshape(-1, *shape), expected, rtol=1e-6, atol=1e-6)
+
+
+def test_distance_transform_edt_blobs():
+    # distances much longer than one step along both axes
+    yy, xx = np.mgrid[:96, :128]
+    masks = np.stack([
+        (yy - 40)**2 + (xx - 60)**2 < 35**2,
+        (yy > 20) & (xx < 100),
+        np.ones((96, 128), dtype=bool),
+        # the only background pixel is far away along both axes
+        (yy < 95) | (xx > 0),
+    ])
+    expected = np.stack([scipy_edt(mask) for mask in masks])
+    out = distance_transform_edt(torch.from_numpy(masks))
+    np.testing.assert_allclose(out.numpy(), expected, rtol=1e-6, atol=1e-5)
+
+
+def test_distance_transform_edt_empty():
+    out = distance_transform_edt(torch.zeros(0, 5, 7, dtype=torch.uint8))
+    assert out.shape == (0, 5, 7)
@@ -0,0 +1,38 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import mmcv
+import numpy as np
+import torch
+
+from mmseg.models.utils import PatchInputPreprocessor
+
+
+def test_patch_input_preprocessor():
+    mean = [123.675, 116.28, 103.53]
+    std = [58.395, 57.12, 57.375]
+    frames = [
+        np.random.randint(0, 256, (72, 128, 3), dtype=np.uint8),
+        np.random.randint(0, 256, (32, 64, 3), dtype=np.uint8)
+    ]
+    preprocessor = PatchInputPreprocessor((64, 32),
+                                          mean=mean,
+                                          std=std,
+                                          bgr_to_rgb=True)
+    inputs = preprocessor(frames)
+    assert inputs.shape == (2, 3, 32, 64)
+    assert inputs.dtype == np.float32
+
+    # same as resizing followed by the SegDataPreProcessor normalization
+    expected = torch.from_numpy(
+        np.stack([mmcv.imresize(f, (64, 32)) for f in frames]))
+    expected = expected.permute(0, 3, 1, 2).flip(1).float()
+    expected = (expected - torch.tensor(mean).view(1, 3, 1, 1)) / \
+        torch.tensor(std).view(1, 3, 1, 1)
+    np.testing.assert_allclose(inputs, expected.numpy(), rtol=0, atol=1e-5)
+
+    # without normalization and channel conversion, into a given buffer
+    preprocessor = PatchInputPreprocessor((64, 32), interpolation='area')
+    out = np.empty((2, 3, 32, 64), dtype=np.float32)
+    inputs = preprocessor(frames, out=out)
+    assert inputs is out
+    np.testing.assert_array_equal(
+        inputs[1], frames[1].transpose(2, 0, 1).astype(np.float32))
@@ -0,0 +1,56 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import torch
+import torch.nn as nn
+
+from mmseg.models.utils import TensorCache
+
+
+def test_tensor_cache():
+    cache = TensorCache(max_size=2)
+    param = nn.Parameter(torch.randn(4, 3))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return param * 2
+
+    # not cached while gradients flow into the parameter
+    out = cache.get('a', (param, ), compute)
+    assert out.requires_grad and len(cache) == 0
+    param.requires_grad_(False)
+    out = cache.get('a', (param, ), compute)
+    assert len(cache) == 1
+    param.requires_grad_(True)
+
+    with torch.no_grad():
+        out = cache.get('a', (param, ), compute)
+        assert cache.get('a', (param, ), compute) is out
+        assert len(calls) == 2
+
+        # in-place updates invalidate the entry
+        param.add_(1)
+        new_out = cache.get('a', (param, ), compute)
+        assert torch.allclose(new_out, out + 2)
+
+        # so does replacing the parameter
+        other = nn.Parameter(param.detach().clone())
+        assert cache.get('a', (other, ), compute) is not new_out
+
+        # least recently used entries are evicted
+        cache.get('b', (param, ), compute)
+        cache.get('c', (param, ), compute)
+        assert len(cache) == 2
+        num_calls = len(calls)
+        cache.get('c', (param, ), compute)
+        assert len(calls) == num_calls
+        cache.get('a', (param, ), compute)
+        assert len(calls) == num_calls + 1
+
+    # entries made in inference mode are kept apart
+    with torch.inference_mode():
+        assert cache.get('a', (param, ), compute).is_inference()
+    with torch.no_grad():
+        assert not cache.get('a', (param, ), compute).is_inference()
+
+    cache.clear()
+    assert len(cache) == 0
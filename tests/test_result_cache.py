@@ -0,0 +1,120 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os.path as osp
+
+import numpy as np
+
+from result_cache import VideoResultCache, file_fingerprint
+
+
+def _result(seed):
+    seg_map = np.random.RandomState(seed).randint(0, 7, (16, 16))
+    return {'seg_map': seg_map.astype(np.uint8)}
+
+
+def _make_files(tmp_path):
+    video = tmp_path / 'video.mp4'
+    video.write_bytes(b'video' * 100)
+    checkpoint = tmp_path / 'model.pth'
+    checkpoint.write_bytes(b'checkpoint' * 100)
+    return str(video), str(checkpoint)
+
+
+def test_file_fingerprint(tmp_path):
+    video, checkpoint = _make_files(tmp_path)
+    assert file_fingerprint(video) == file_fingerprint(video)
+    assert file_fingerprint(video) != file_fingerprint(checkpoint)
+    assert file_fingerprint(None) == 'none'
+    assert file_fingerprint(str(tmp_path / 'missing')) == 'none'
+
+
+def test_video_result_cache(tmp_path):
+    video, checkpoint = _make_files(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    signature = {'backend': 'pytorch', 'precision': 'fp32'}
+    cache = VideoResultCache(
+        video, checkpoint, 10, cache_dir=cache_dir, signature=signature)
+    assert cache.num_cached == 0
+    assert cache.get(3) is None
+    assert 3 not in cache
+
+    # round trip
+    result = _result(0)
+    cache.put(3, result)
+    cache.put(10, result)
+    cache.put(-1, result)
+    assert 3 in cache
+    assert cache.num_cached == 1
+    cached = cache.get(3)
+    unique, counts = np.unique(result['seg_map'], return_counts=True)
+    np.testing.assert_array_equal(cached['seg_map'], result['seg_map'])
+    np.testing.assert_array_equal(cached['unique_values'], unique)
+    np.testing.assert_array_equal(cached['counts'], counts)
+    assert cached['unique_values'].dtype == np.uint8
+    assert np.isclose(cached['contamination_level'],
+                      np.count_nonzero(result['seg_map']) / 256)
+    cache.close()
+
+    # reopened with the same files and settings, the results are reused
+    cache = VideoResultCache(
+        video, checkpoint, 10, cache_dir=cache_dir, signature=signature)
+    assert cache.num_cached == 1
+    np.testing.assert_array_equal(cache.get(3)['seg_map'], result['seg_map'])
+    cache.close()
+
+    # a different number of frames rebuilds the cache
+    cache = VideoResultCache(
+        video, checkpoint, 12, cache_dir=cache_dir, signature=signature)
+    assert cache.num_cached == 0
+    assert cache.get(3) is None
+    cache.close()
+
+
+def test_video_result_cache_key(tmp_path):
+    video, checkpoint = _make_files(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    signature = {
+        'backend': 'pytorch',
+        'precision': 'fp32',
+        'severity_thresholds': [0.33, 0.66]
+    }
+    cache = VideoResultCache(
+        video, checkpoint, 5, cache_dir=cache_dir, signature=signature)
+    cache.put(0, _result(0))
+    cache.close()
+    key = cache.key
+    assert osp.isfile(osp.join(cache_dir, key, 'meta.json'))
+
+    # the key does not depend on the order of the settings
+    cache = VideoResultCache(
+        video,
+        checkpoint,
+        5,
+        cache_dir=cache_dir,
+        signature=dict(reversed(list(signature.items()))))
+    assert cache.key == key
+    assert cache.num_cached == 1
+
+    # any setting that changes the results invalidates the cache
+    changes = dict(
+        precision='bf16',
+        backend='onnxruntime',
+        severity_thresholds=[0.3, 0.6],
+        config='another')
+    for name, value in changes.items():
+        changed = dict(signature, **{name: value})
+        cache = VideoResultCache(
+            video, checkpoint, 5, cache_dir=cache_dir, signature=changed)
+        assert cache.key != key
+        assert cache.num_cached == 0
+
+    # so do another checkpoint and another video
+    other = tmp_path / 'other.pth'
+    other.write_bytes(b'other' * 100)
+    cache = VideoResultCache(
+        video, str(other), 5, cache_dir=cache_dir, signature=signature)
+    assert cache.key != key
+    assert cache.num_cached == 0
+    cache = VideoResultCache(
+        str(other), checkpoint, 5, cache_dir=cache_dir, signature=signature)
+    assert cache.key != key
+    assert cache.num_cached == 0
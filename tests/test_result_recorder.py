@@ -0,0 +1,145 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import csv
+import json
+import os.path as osp
+import threading
+
+import numpy as np
+
+import result_recorder
+from result_recorder import ResultRecorder, export_json, format_time
+
+
+def _append(recorder, num_frames, start=0):
+    """Append frames, return them in the format of the old frame data."""
+    frames = []
+    for i in range(start, start + num_frames):
+        seg_map = np.random.RandomState(i).randint(0, 3, (16, 16))
+        # levels representable in float32 to compare them exactly
+        level = np.count_nonzero(seg_map) / seg_map.size
+        recorder.append(i / 30, i, level, seg_map)
+        unique, counts = np.unique(seg_map, return_counts=True)
+        frames.append({
+            'time': i / 30,
+            'contamination_level': level,
+            'patch_counts':
+            {str(val): int(count)
+             for val, count in zip(unique, counts)},
+            'patch_array': seg_map.tolist()
+        })
+    return frames
+
+
+def test_format_time():
+    assert format_time(0) == '00:00:00'
+    assert format_time(3723.9) == '01:02:03'
+
+
+def test_chunked_flush(tmp_path):
+    recorder = ResultRecorder(str(tmp_path), chunk_size=4)
+    time_file = osp.join(recorder.path, 'time.bin')
+    grid_file = osp.join(recorder.path, 'grid.bin')
+    frames = _append(recorder, 3)
+    # buffered in memory until a chunk is full
+    assert len(recorder) == 3
+    assert osp.getsize(time_file) == 0
+    frames += _append(recorder, 7, start=3)
+    assert len(recorder) == 10
+    assert osp.getsize(time_file) == 8 * 8
+    assert osp.getsize(grid_file) == 8 * 256
+
+    # reading flushes the pending records
+    data = recorder.read()
+    assert osp.getsize(time_file) == 10 * 8
+    assert len(recorder) == 10
+    np.testing.assert_allclose(data['time'], np.arange(10) / 30)
+    np.testing.assert_array_equal(data['frame'], np.arange(10))
+    np.testing.assert_array_equal(data['grid'],
+                                  [frame['patch_array'] for frame in frames])
+    for counts, frame in zip(data['counts'], frames):
+        assert {str(k): int(counts[k])
+                for k in np.flatnonzero(counts)} == frame['patch_counts']
+    assert recorder.time_range() == (0.0, 9 / 30)
+    recorder.close()
+    assert not osp.exists(recorder.path)
+    # close twice is fine
+    recorder.close()
+
+
+def test_read(tmp_path):
+    recorder = ResultRecorder(str(tmp_path), chunk_size=4)
+    assert recorder.time_range() is None
+    data = recorder.read()
+    assert data['grid'].shape == (0, 16, 16)
+    assert data['counts'].shape == (0, 7)
+
+    _append(recorder, 6)
+    data = recorder.read(['frame', 'level'], stop=5)
+    assert list(data) == ['frame', 'level']
+    np.testing.assert_array_equal(data['frame'], np.arange(5))
+    # stop is bounded by the number of records
+    assert len(recorder.read(stop=100)['time']) == 6
+    assert len(recorder.read(stop=0)['time']) == 0
+    recorder.close()
+
+
+def test_export_json_layout(tmp_path):
+    recorder = ResultRecorder(str(tmp_path), chunk_size=4)
+    frames = _append(recorder, 6)
+    json_file = str(tmp_path / 'result.json')
+    csv_file = str(tmp_path / 'result.csv')
+    txt_file = str(tmp_path / 'result.txt')
+    recorder.export(json_file=json_file, csv_file=csv_file, txt_file=txt_file)
+
+    # the same text as json.dump of the old frame data
+    expected = json.dumps(frames, ensure_ascii=False, indent=4)
+    with open(json_file, encoding='utf-8') as f:
+        assert f.read() == expected
+
+    with open(csv_file, encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['Time (s)', 'Contamination Level (%)', 'Frame Number']
+    assert rows[2] == [
+        f'{1 / 30:.2f}', f'{frames[1]["contamination_level"] * 100:.2f}', '1'
+    ]
+    assert len(rows) == 7
+    with open(txt_file, encoding='utf-8') as f:
+        assert f.read().count('Time: 00:00:00') == 6
+    recorder.close()
+
+    # no records
+    recorder = ResultRecorder(str(tmp_path))
+    recorder.export(json_file=json_file)
+    with open(json_file, encoding='utf-8') as f:
+        assert f.read() == json.dumps([], indent=4)
+    recorder.close()
+
+
+def test_export_async_with_close(tmp_path, monkeypatch):
+    recorder = ResultRecorder(str(tmp_path), chunk_size=4)
+    frames = _append(recorder, 6)
+
+    started, resume = threading.Event(), threading.Event()
+
+    def slow_export_json(data, json_file):
+        started.set()
+        assert resume.wait(5)
+        export_json(data, json_file)
+
+    monkeypatch.setattr(result_recorder, 'export_json', slow_export_json)
+    errors = []
+    json_file = str(tmp_path / 'result.json')
+    thread = recorder.export_async(errors.append, json_file=json_file)
+    # records appended after the call are not exported
+    _append(recorder, 2, start=6)
+    assert started.wait(5)
+
+    # the records are kept until the export is done
+    recorder.close()
+    assert osp.isdir(recorder.path)
+    resume.set()
+    thread.join(5)
+    assert errors == [None]
+    assert not osp.exists(recorder.path)
+    with open(json_file, encoding='utf-8') as f:
+        assert json.load(f) == json.loads(json.dumps(frames))
@@ -0,0 +1,159 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+
+from temporal_infer import FrameChangeGate, PatchScoreFilter, TemporalInference
+
+THRESHOLDS = (0.33, 0.66)
+NUM_TYPES = 4
+
+
+def _label_lut():
+    """The (severity, type) -> label table of Patch_EncoderDecoder."""
+    severity = np.arange(3).reshape(-1, 1)
+    seg_type = np.arange(NUM_TYPES).reshape(1, -1)
+    valid = (severity > 0) & (seg_type >= 1) & (seg_type <= 3)
+    return np.where(valid, 2 * (seg_type - 1) + severity, 0).ravel()
+
+
+def _type_probs(seg_type=1, shape=(16, 16)):
+    probs = np.full((NUM_TYPES, ) + shape, 0.1, dtype=np.float32)
+    probs[seg_type] = 0.7
+    return probs
+
+
+def _num_changes(labels):
+    return sum(not np.array_equal(a, b) for a, b in zip(labels, labels[1:]))
+
+
+class FakeWrapper:
+    """MMSegWrapper returning the scores in ``self.scores``."""
+
+    def __init__(self, backend='pytorch'):
+        self.backend = backend
+        self.model = SimpleNamespace(
+            label_lut=torch.from_numpy(_label_lut().astype(np.uint8)),
+            num_types=NUM_TYPES,
+            severity_thresholds=torch.tensor(THRESHOLDS))
+        self.scores = np.zeros((16, 16), dtype=np.float32)
+        self.num_calls = 0
+
+    def infer_scores(self, frame):
+        self.num_calls += 1
+        return _type_probs(), self.scores.copy()
+
+    def infer(self, frame):
+        self.num_calls += 1
+        return {'seg_map': np.full((16, 16), 3, dtype=np.uint8)}
+
+
+def test_patch_score_filter():
+    with pytest.raises(AssertionError):
+        PatchScoreFilter(_label_lut(), NUM_TYPES, THRESHOLDS, alpha=0)
+
+    # the first frame is not filtered
+    score_filter = PatchScoreFilter(_label_lut(), NUM_TYPES, THRESHOLDS)
+    labels = score_filter.update(_type_probs(2), np.full((16, 16), 0.9))
+    assert labels.dtype == np.uint8
+    assert (labels == 4).all()  # dust blockage
+
+    # scores jumping around a threshold flicker without filtering
+    scores = [np.full((16, 16), 0.1 if i % 2 else 0.6) for i in range(40)]
+    unfiltered = PatchScoreFilter(
+        _label_lut(), NUM_TYPES, THRESHOLDS, alpha=1, margin=0)
+    labels = [unfiltered.update(_type_probs(), s) for s in scores]
+    assert _num_changes(labels) == 39
+
+    # EMA only leaves them close to the threshold, hysteresis holds them
+    score_filter = PatchScoreFilter(_label_lut(), NUM_TYPES, THRESHOLDS)
+    labels = [score_filter.update(_type_probs(), s) for s in scores]
+    assert _num_changes(labels[5:]) == 0
+    assert (labels[-1] == 1).all()  # raindrop blur
+
+    # a score inside the hysteresis band keeps the severity in both ways
+    hysteresis = PatchScoreFilter(
+        _label_lut(), NUM_TYPES, THRESHOLDS, alpha=1, margin=0.05)
+    labels = [
+        hysteresis.update(_type_probs(), np.full((16, 16), s))
+        for s in (0.2, 0.36, 0.4, 0.3, 0.25)
+    ]
+    assert [int(label[0, 0]) for label in labels] == [0, 0, 1, 1, 0]
+
+    # a sustained change is followed
+    for _ in range(20):
+        labels = score_filter.update(_type_probs(), np.full((16, 16), 0.9))
+    assert (labels == 2).all()  # raindrop blockage
+
+    score_filter.reset()
+    assert score_filter.scores is None
+    labels = score_filter.update(_type_probs(), np.full((16, 16), 0.1))
+    assert (labels == 0).all()
+
+
+def test_frame_change_gate():
+    gate = FrameChangeGate(threshold=2.0, max_skip=3)
+    frame = np.random.RandomState(0).randint(0, 200, (64, 64, 3), np.uint8)
+    assert gate.should_infer(frame)
+    assert not gate.should_infer(frame)
+    # small noise is under the threshold
+    assert not gate.should_infer(frame + 1)
+    assert gate.num_skipped == 2
+    # a large change is inferred
+    assert gate.should_infer(frame + 50)
+    assert gate.num_skipped == 0
+
+    # at most max_skip frames in a row are skipped
+    assert [gate.should_infer(frame + 50) for _ in range(5)] == \
+        [False, False, False, True, False]
+
+    gate.reset()
+    assert gate.signature is None
+    assert gate.should_infer(frame + 50)
+
+
+def test_temporal_inference():
+    wrapper = FakeWrapper()
+    temporal = TemporalInference(wrapper, gate_threshold=2.0)
+    frame = np.random.RandomState(0).randint(0, 200, (64, 64, 3), np.uint8)
+    wrapper.scores[:] = 0.9
+    result = temporal.infer(frame)
+    assert not result['skipped']
+    assert (result['seg_map'] == 2).all()
+    np.testing.assert_array_equal(result['unique_values'], [2])
+    np.testing.assert_array_equal(result['counts'], [256])
+
+    # an unchanged frame returns the cached result without the model
+    wrapper.scores[:] = 0.1
+    skipped = temporal.infer(frame)
+    assert skipped['skipped']
+    assert wrapper.num_calls == 1
+    np.testing.assert_array_equal(skipped['seg_map'], result['seg_map'])
+    # a changed frame is inferred again
+    assert not temporal.infer(frame + 50)['skipped']
+    assert wrapper.num_calls == 2
+    assert temporal.num_inferred == 2
+    assert temporal.num_skipped == 1
+    assert '1 skipped' in temporal.summary()
+
+    # after reset the same frame is inferred and the scores are not filtered
+    temporal.reset()
+    result = temporal.infer(frame + 50)
+    assert not result['skipped']
+    assert wrapper.num_calls == 3
+    assert (result['seg_map'] == 0).all()
+
+
+def test_temporal_inference_exported():
+    # exported models have no scores, only the gate is used
+    wrapper = FakeWrapper(backend='onnxruntime')
+    temporal = TemporalInference(wrapper)
+    assert temporal.filter is None and temporal.gate is None
+    frame = np.zeros((64, 64, 3), np.uint8)
+    for _ in range(3):
+        result = temporal.infer(frame)
+        assert not result['skipped']
+        assert (result['seg_map'] == 3).all()
+    assert wrapper.num_calls == 3
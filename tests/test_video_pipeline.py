@@ -0,0 +1,172 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from video_pipeline import DropQueue, VideoPipeline
+
+
+class FakeCapture:
+    """A capture that yields ``num_frames`` frames, then ``ret=False``."""
+
+    def __init__(self, num_frames, delay=0.):
+        self.num_frames = num_frames
+        self.delay = delay
+        self.num_read = 0
+
+    def read(self):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.num_read >= self.num_frames:
+            return False, None
+        frame = np.full((4, 4, 3), self.num_read, dtype=np.uint8)
+        self.num_read += 1
+        return True, frame
+
+
+def test_drop_queue():
+    with pytest.raises(AssertionError):
+        DropQueue(0)
+    with pytest.raises(AssertionError):
+        DropQueue(2, 'latest')
+
+    # drop_oldest keeps the latest items
+    queue = DropQueue(2, 'drop_oldest')
+    for i in range(5):
+        assert queue.put(i)
+    assert len(queue) == 2
+    assert queue.dropped == 3
+    assert queue.get() == 3
+    assert queue.get() == 4
+    assert queue.get(timeout=0.01) is None
+
+    # drop_newest keeps the first items
+    queue = DropQueue(2, 'drop_newest')
+    assert [queue.put(i) for i in range(4)] == [True, True, False, False]
+    assert queue.dropped == 2
+    assert queue.get() == 0
+    assert queue.get() == 1
+
+    # block waits for a free slot and drops nothing
+    queue = DropQueue(1, 'block')
+    assert queue.put(0)
+    done = threading.Event()
+
+    def producer():
+        queue.put(1)
+        done.set()
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    assert not done.wait(0.05)
+    assert queue.get() == 0
+    assert done.wait(1)
+    thread.join()
+    assert queue.get() == 1
+    assert queue.dropped == 0
+
+    # close wakes a blocked producer and keeps the remaining items
+    queue = DropQueue(1, 'block')
+    queue.put(0)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(queue.put(1)))
+    thread.start()
+    time.sleep(0.02)
+    queue.close()
+    thread.join(1)
+    assert results == [False]
+    assert not queue.put(2)
+    assert queue.get() == 0
+    assert queue.get() is None
+
+    queue = DropQueue(2)
+    queue.put(0)
+    queue.clear()
+    assert len(queue) == 0
+
+
+def test_video_pipeline_finish():
+    results, rendered, finished = [], [], []
+    pipeline = VideoPipeline(
+        FakeCapture(10),
+        infer_fn=lambda index, frame: int(frame[0, 0, 0]) * 2,
+        render_fn=lambda frame, result: result + 1,
+        on_result=lambda index, result: results.append((index, result)),
+        on_render=lambda index, frame, out, result: rendered.append(out),
+        on_finished=finished.append,
+        start_frame=5,
+        render_queue_size=10)
+    pipeline.start()
+    pipeline.join(5)
+    assert not pipeline.is_running()
+    assert finished == [True]
+    # block decodes and infers every frame in order
+    assert results == [(5 + i, 2 * i) for i in range(10)]
+    assert rendered == [2 * i + 1 for i in range(10)]
+    assert pipeline.last_rendered == 14
+    assert pipeline.dropped == {'infer': 0, 'render': 0}
+    summary = pipeline.summary()
+    assert summary['decode']['count'] == 10
+    assert summary['infer']['count'] == 10
+    assert summary['render']['count'] == 10
+
+
+def test_video_pipeline_drop_policies():
+    # a slow infer stage with a latest-frame-wins infer queue drops frames
+    results = []
+
+    def slow_infer(index, frame):
+        time.sleep(0.01)
+        return index
+
+    pipeline = VideoPipeline(
+        FakeCapture(30),
+        infer_fn=slow_infer,
+        on_result=lambda index, result: results.append(index),
+        queue_size=1,
+        decode_policy='drop_oldest')
+    pipeline.start()
+    pipeline.join(5)
+    assert pipeline.dropped['infer'] > 0
+    assert len(results) + pipeline.dropped['infer'] == 30
+    assert results == sorted(results)
+    assert results[-1] == 29
+
+    # a slow render stage only draws the latest results
+    rendered, results = [], []
+
+    def slow_render(frame, result):
+        time.sleep(0.01)
+        return result
+
+    pipeline = VideoPipeline(
+        FakeCapture(20),
+        infer_fn=lambda index, frame: index,
+        render_fn=slow_render,
+        on_result=lambda index, result: results.append(index),
+        on_render=lambda index, frame, out, result: rendered.append(index))
+    pipeline.start()
+    pipeline.join(5)
+    # every frame is inferred, only the rendering is dropped
+    assert results == list(range(20))
+    assert pipeline.dropped['render'] > 0
+    assert len(rendered) + pipeline.dropped['render'] == 20
+    assert rendered[-1] == 19
+
+
+def test_video_pipeline_stop():
+    finished = []
+    pipeline = VideoPipeline(
+        FakeCapture(10000, delay=0.001),
+        infer_fn=lambda index, frame: index,
+        on_finished=finished.append)
+    pipeline.start()
+    time.sleep(0.05)
+    assert pipeline.is_running()
+    pipeline.stop(5)
+    assert not pipeline.is_running()
+    # stopped before the end of the video
+    assert finished == [False]
+    assert pipeline.capture.num_read < 10000
@@ -0,0 +1,45 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from mmseg.visualization import DisplayResizer
+
+
+class TestDisplayResizer(TestCase):
+
+    def test_fit_size(self):
+        self.assertEqual(
+            DisplayResizer.fit_size((1920, 1080), (640, 480)), (640, 360))
+        self.assertEqual(
+            DisplayResizer.fit_size((1080, 1920), (640, 480)), (270, 480))
+        self.assertEqual(DisplayResizer.fit_size((1000, 1), (10, 10)), (10, 1))
+
+    def test_resize(self):
+        resizer = DisplayResizer()
+        img = np.random.randint(0, 256, (1080, 1920, 3), dtype=np.uint8)
+        for size in [(640, 360), (480, 270), (1920, 1080), (2000, 1125)]:
+            out = resizer(img, size)
+            self.assertEqual(out.shape, (size[1], size[0], 3))
+            self.assertEqual(out.dtype, np.uint8)
+            expected = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+            if size[0] < img.shape[1]:
+                # halving averages blocks like an area resize
+                diff = np.abs(
+                    cv2.blur(out, (5, 5)).astype(int) -
+                    cv2.blur(expected, (5, 5)).astype(int))
+                self.assertLess(diff.mean(), 8)
+            elif size[0] == img.shape[1]:
+                np.testing.assert_array_equal(out, img)
+
+        # a 2x reduction is an exact area resize
+        out = resizer(img, (960, 540))
+        np.testing.assert_array_equal(
+            out, cv2.resize(img, (960, 540), interpolation=cv2.INTER_AREA))
+
+        # the output buffer is reused while the sizes do not change
+        gray = img[..., 0].copy()
+        first = resizer(gray, (640, 360))
+        self.assertEqual(first.shape, (360, 640))
+        self.assertIs(resizer(gray, (640, 360)), first)
@@ -0,0 +1,82 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from mmseg.visualization import PatchOverlayRenderer
+
+
+def _loop_overlay(img, seg_map, styles):
+    """Reference implementation blending every patch separately."""
+    vis_img = img.copy()
+    patch_h = img.shape[0] // seg_map.shape[0]
+    patch_w = img.shape[1] // seg_map.shape[1]
+    for i in range(seg_map.shape[0]):
+        for j in range(seg_map.shape[1]):
+            label = seg_map[i, j]
+            if label in styles:
+                color, alpha = styles[label]
+                y1, x1 = i * patch_h, j * patch_w
+                roi = vis_img[y1:y1 + patch_h, x1:x1 + patch_w]
+                overlay = roi.copy()
+                overlay[:, :, :3] = color
+                cv2.addWeighted(overlay, alpha, roi, 1 - alpha, 0, roi)
+    return vis_img
+
+
+class TestPatchOverlayRenderer(TestCase):
+
+    def test_render(self):
+        renderer = PatchOverlayRenderer()
+        # 1080 and 1920 are not multiples of 16, so the border stays clear
+        for h, w in [(64, 48), (1080, 1920), (8, 8)]:
+            img = np.random.randint(0, 256, (h, w, 3), dtype=np.uint8)
+            seg_map = np.random.randint(0, 4, (16, 16))
+            expected = _loop_overlay(img, seg_map, renderer.styles)
+            vis_img = renderer.render(img, seg_map)
+            self.assertEqual(vis_img.dtype, np.uint8)
+            self.assertEqual(vis_img.shape, img.shape)
+            diff = np.abs(vis_img.astype(int) - expected.astype(int))
+            self.assertLessEqual(diff.max(), 2)
+        # images smaller than the grid have no patch region to cache
+        self.assertEqual(
+            list(renderer._buffer_cache), [(64, 48), (1072, 1920)])
+
+        # the input image is not modified unless used as the output buffer
+        img = np.full((32, 32, 3), 100, dtype=np.uint8)
+        seg_map = np.full((16, 16), 2)
+        vis_img = renderer.render(img, seg_map)
+        self.assertTrue((img == 100).all())
+        renderer.render(img, seg_map, out=img)
+        np.testing.assert_array_equal(img, vis_img)
+
+        # nothing to draw
+        seg_map = np.zeros((16, 16), dtype=np.uint8)
+        vis_img = renderer.render(img, seg_map)
+        np.testing.assert_array_equal(vis_img, img)
+
+    def test_styles(self):
+        styles = {1: ((0, 0, 255), 0.5), 2: ((0, 0, 255), 1.0)}
+        renderer = PatchOverlayRenderer(styles=styles, grid_size=(2, 2))
+        img = np.zeros((4, 4, 3), dtype=np.uint8)
+        seg_map = np.array([[0, 1], [2, 7]])
+        vis_img = renderer.render(img, seg_map)
+        np.testing.assert_array_equal(vis_img[:2, :2], 0)
+        np.testing.assert_array_equal(vis_img[:2, 2:, 2], 128)
+        np.testing.assert_array_equal(vis_img[2:, :2, 2], 255)
+        np.testing.assert_array_equal(vis_img[2:, 2:], 0)
+
+        # float predictions, e.g. ``pred_sem_seg`` of Patch_EncoderDecoder
+        np.testing.assert_array_equal(
+            renderer.render(img, seg_map.astype(np.float32)), vis_img)
+
+        with self.assertRaises(AssertionError):
+            renderer.render(img, np.zeros((4, 4)))
+
+    def test_cache_size(self):
+        renderer = PatchOverlayRenderer(max_cache_size=2)
+        seg_map = np.ones((16, 16), dtype=np.uint8)
+        for size in [16, 32, 48]:
+            renderer.render(np.zeros((size, size, 3), np.uint8), seg_map)
+        self.assertEqual(list(renderer._buffer_cache), [(32, 32), (48, 48)])
@@ -0,0 +1,175 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Compare the ``math`` and ``sdpa`` attention of transformer backbones.
+
+Every backbone config is built twice, with ``attn_impl='math'`` and
+``attn_impl='sdpa'``, sharing the same weights. The forward latency, the
+peak memory and the largest difference of the outputs are reported. The
+peak memory is ``torch.cuda.max_memory_allocated`` on CUDA and the peak of
+the allocations recorded by the profiler on CPU.
+"""
+import argparse
+import copy
+import time
+
+import torch
+from mmengine import Config
+from mmengine.fileio import dump
+from mmengine.registry import init_default_scope
+from mmengine.utils import get_git_hash
+
+from mmseg.registry import MODELS
+
+# small variants of the supported backbones
+BACKBONES = dict(
+    mit=dict(
+        type='MixVisionTransformer',
+        embed_dims=32,
+        num_heads=[1, 2, 5, 8],
+        num_layers=[2, 2, 2, 2]),
+    vit=dict(
+        type='VisionTransformer',
+        img_size=(512, 512),
+        embed_dims=384,
+        num_layers=12,
+        num_heads=6),
+    beit=dict(
+        type='BEiT',
+        img_size=(512, 512),
+        embed_dims=384,
+        num_layers=12,
+        num_heads=6),
+    pcpvt=dict(
+        type='PCPVT', embed_dims=[64, 128, 320, 512], depths=[3, 4, 6, 3]),
+    svt=dict(
+        type='SVT',
+        embed_dims=[64, 128, 256, 512],
+        num_heads=[2, 4, 8, 16],
+        mlp_ratios=[4, 4, 4, 4],
+        depths=[2, 2, 10, 4],
+        sr_ratios=[8, 4, 2, 1],
+        windiow_sizes=[7, 7, 7, 7]),
+    swin=dict(type='SwinTransformer'))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the attention implementations of backbones')
+    parser.add_argument(
+        '--backbones',
+        nargs='+',
+        default=list(BACKBONES),
+        choices=list(BACKBONES),
+        help='backbones to benchmark')
+    parser.add_argument(
+        '--config',
+        help='benchmark the backbone of this config instead of the built-in '
+        'variants')
+    parser.add_argument(
+        '--shape',
+        type=int,
+        nargs=2,
+        default=[512, 512],
+        help='(h, w) of the input')
+    parser.add_argument('--batch-size', type=int, default=1, help='batch size')
+    parser.add_argument('--device', default='cpu', help='device used')
+    parser.add_argument(
+        '--num-iters', type=int, default=10, help='number of timed forwards')
+    parser.add_argument(
+        '--warmup', type=int, default=2, help='number of warmup forwards')
+    parser.add_argument(
+        '--out', help='dump the results into this json file if specified')
+    return parser.parse_args()
+
+
+def peak_memory(model, inputs):
+    """Peak memory in MiB allocated by one forward."""
+    if inputs.is_cuda:
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        base = torch.cuda.memory_allocated()
+        model(inputs)
+        torch.cuda.synchronize()
+        return (torch.cuda.max_memory_allocated() - base) / 2**20
+    with torch.profiler.profile(
+            activities=[torch.profiler.ProfilerActivity.CPU],
+            profile_memory=True) as prof:
+        model(inputs)
+    # replay the allocations and frees in the order they happened
+    events = sorted((e for e in prof.events() if e.cpu_memory_usage != 0),
+                    key=lambda e: e.time_range.start)
+    current = peak = 0
+    for event in events:
+        current += event.cpu_memory_usage
+        peak = max(peak, current)
+    return peak / 2**20
+
+
+def latency(model, inputs, num_iters, warmup):
+    """Mean forward time in ms."""
+    sync = torch.cuda.synchronize if inputs.is_cuda else (lambda: None)
+    for _ in range(warmup):
+        model(inputs)
+    sync()
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        model(inputs)
+    sync()
+    return (time.perf_counter() - start) / num_iters * 1000
+
+
+def main():
+    args = parse_args()
+    init_default_scope('mmseg')
+    if args.config:
+        cfgs = dict(config=Config.fromfile(args.config).model.backbone)
+    else:
+        cfgs = {name: BACKBONES[name] for name in args.backbones}
+    inputs = torch.randn(args.batch_size, 3, *args.shape, device=args.device)
+
+    results = []
+    for name, cfg in cfgs.items():
+        outs, result = {}, dict(backbone=name)
+        state_dict = None
+        for attn_impl in ('math', 'sdpa'):
+            cfg = copy.deepcopy(cfg)
+            cfg['attn_impl'] = attn_impl
+            model = MODELS.build(cfg).to(args.device)
+            if state_dict is None:
+                model.init_weights()
+                state_dict = model.state_dict()
+            else:
+                model.load_state_dict(state_dict)
+            model.eval()
+            with torch.inference_mode():
+                result[attn_impl] = dict(
+                    latency=round(
+                        latency(model, inputs, args.num_iters, args.warmup),
+                        2),
+                    memory=round(peak_memory(model, inputs), 1))
+                outs[attn_impl] = model(inputs)
+        result['max_diff'] = max((a - b).abs().max().item()
+                                 for a, b in zip(outs['math'], outs['sdpa']))
+        results.append(result)
+        print(f'{name}: math {result["math"]["latency"]:.1f} ms '
+              f'{result["math"]["memory"]:.0f} MiB, '
+              f'sdpa {result["sdpa"]["latency"]:.1f} ms '
+              f'{result["sdpa"]["memory"]:.0f} MiB, '
+              f'max diff {result["max_diff"]:.2e}')
+
+    if args.out:
+        dump(
+            dict(
+                device=args.device,
+                shape=args.shape,
+                batch_size=args.batch_size,
+                threads=torch.get_num_threads(),
+                git_hash=get_git_hash(),
+                torch=torch.__version__,
+                unit=dict(latency='ms', memory='MiB'),
+                results=results),
+            args.out,
+            indent=4)
+
+
+if __name__ == '__main__':
+    main()
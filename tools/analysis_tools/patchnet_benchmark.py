@@ -0,0 +1,230 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Time every stage of PatchNet video inference separately.
+
+Unlike ``benchmark.py``, which measures end-to-end img/s of the test
+dataloader at batch size 1 on CUDA, this runs on CPU as well and splits a
+frame into the stages of the application:
+
+- ``decode``: ``cv2.imdecode`` of a JPEG encoded frame
+- ``resize``: ``mmcv.imresize`` to the network input
+- ``normalize``: the normalized input tensor on the device
+- ``backbone``: ``extract_feat``
+- ``head``: ``decode_head.forward``
+- ``fusion``: ``fuse_labels`` of the type and corruption logits
+- ``render``: :class:`PatchOverlayRenderer` on the full frame
+- ``display``: :class:`DisplayResizer` to the display size
+
+Batch sizes, input sizes, thread counts and precisions are swept and the
+results are dumped with the git hash of the tree, so that files of
+different commits can be compared.
+"""
+import argparse
+import itertools
+import time
+
+import cv2
+import mmcv
+import numpy as np
+import torch
+from mmengine.fileio import dump
+from mmengine.model.utils import revert_sync_batchnorm
+from mmengine.utils import get_git_hash
+
+from mmseg.apis import inference_context, init_model
+from mmseg.visualization import DisplayResizer, PatchOverlayRenderer
+
+STAGES = ('decode', 'resize', 'normalize', 'backbone', 'head', 'fusion',
+          'render', 'display')
+
+
+def parse_size(size):
+    w, h = size.lower().split('x')
+    return int(w), int(h)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the stages of PatchNet inference')
+    parser.add_argument('config', help='config file path')
+    parser.add_argument('--checkpoint', help='checkpoint file')
+    parser.add_argument(
+        '--video', help='video to read frames from, random frames if unset')
+    parser.add_argument(
+        '--shape',
+        type=int,
+        nargs=2,
+        default=[1080, 1920],
+        help='(h, w) of the random frames')
+    parser.add_argument(
+        '--batch-sizes', type=int, nargs='+', default=[1], help='batch sizes')
+    parser.add_argument(
+        '--input-sizes',
+        type=parse_size,
+        nargs='+',
+        default=[(512, 512)],
+        help='network input sizes as WxH, e.g. 512x512')
+    parser.add_argument(
+        '--threads',
+        type=int,
+        nargs='+',
+        default=[torch.get_num_threads()],
+        help='numbers of torch and OpenCV threads')
+    parser.add_argument(
+        '--precisions',
+        nargs='+',
+        default=['fp32'],
+        choices=['fp32', 'bf16', 'fp16'],
+        help='inference precisions')
+    parser.add_argument('--device', default='cpu', help='device used')
+    parser.add_argument(
+        '--channels-last',
+        action='store_true',
+        help='use the channels_last memory format')
+    parser.add_argument(
+        '--display-size',
+        type=parse_size,
+        default=(640, 360),
+        help='display box as WxH')
+    parser.add_argument(
+        '--num-iters', type=int, default=20, help='number of timed batches')
+    parser.add_argument(
+        '--warmup', type=int, default=3, help='number of warmup batches')
+    parser.add_argument(
+        '--out', help='dump the results into this json file if specified')
+    return parser.parse_args()
+
+
+def load_frames(args, num_frames):
+    if args.video is None:
+        return [
+            np.random.randint(0, 256, (*args.shape, 3), dtype=np.uint8)
+            for _ in range(num_frames)
+        ]
+    capture = cv2.VideoCapture(args.video)
+    frames = []
+    while len(frames) < num_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    assert frames, f'failed to read frames from {args.video}'
+    # loop short videos
+    return [frames[i % len(frames)] for i in range(num_frames)]
+
+
+class StageTimer:
+    """Accumulate the time of each stage, synchronizing CUDA."""
+
+    def __init__(self, device):
+        self.sync = torch.cuda.synchronize if str(device).startswith(
+            'cuda') else (lambda: None)
+        self.times = dict.fromkeys(STAGES, 0.)
+        self.enabled = True
+
+    def __call__(self, stage, fn, *args):
+        self.sync()
+        start = time.perf_counter()
+        out = fn(*args)
+        self.sync()
+        if self.enabled:
+            self.times[stage] += time.perf_counter() - start
+        return out
+
+
+def run_batch(model, timer, encoded, input_size, channels_last, renderer,
+              resizer, display_size):
+    frames = [
+        timer('decode', cv2.imdecode, buffer, cv2.IMREAD_COLOR)
+        for buffer in encoded
+    ]
+    resized = [
+        timer('resize', mmcv.imresize, frame, input_size) for frame in frames
+    ]
+    inputs = timer('normalize', model._frames_to_inputs, resized, input_size)
+    inputs = inputs.to(model.data_preprocessor.device)
+    if channels_last:
+        inputs = inputs.contiguous(memory_format=torch.channels_last)
+    feats = timer('backbone', model.extract_feat, inputs)
+    seg_out, corruption_outs = timer('head', model.decode_head.forward, feats)
+    labels = timer(
+        'fusion', lambda: model.fuse_labels(seg_out, corruption_outs).squeeze(
+            1).cpu().numpy())
+    for frame, seg_map in zip(frames, labels):
+        vis = timer('render', renderer.render, frame, seg_map)
+        size = DisplayResizer.fit_size(vis.shape[1::-1], display_size)
+        timer('display', resizer, vis, size)
+
+
+def main():
+    args = parse_args()
+    assert 'fp16' not in args.precisions or args.device.startswith('cuda'), \
+        'fp16 is only supported on CUDA, use bf16 on CPU'
+    model = init_model(
+        args.config,
+        args.checkpoint,
+        device=args.device,
+        channels_last=args.channels_last)
+    if args.device == 'cpu':
+        model = revert_sync_batchnorm(model)
+    renderer = PatchOverlayRenderer()
+    resizer = DisplayResizer()
+    frames = load_frames(args, max(args.batch_sizes))
+    encoded = [cv2.imencode('.jpg', frame)[1] for frame in frames]
+
+    results = []
+    for batch_size, input_size, threads, precision in itertools.product(
+            args.batch_sizes, args.input_sizes, args.threads, args.precisions):
+        torch.set_num_threads(threads)
+        cv2.setNumThreads(threads)
+        timer = StageTimer(args.device)
+        batch = encoded[:batch_size]
+        with inference_context(model, precision):
+            timer.enabled = False
+            for _ in range(args.warmup):
+                run_batch(model, timer, batch, input_size, args.channels_last,
+                          renderer, resizer, args.display_size)
+            timer.enabled = True
+            for _ in range(args.num_iters):
+                run_batch(model, timer, batch, input_size, args.channels_last,
+                          renderer, resizer, args.display_size)
+        num_frames = batch_size * args.num_iters
+        stages = {
+            stage: round(t / num_frames * 1000, 3)
+            for stage, t in timer.times.items()
+        }
+        total = sum(stages.values())
+        results.append(
+            dict(
+                batch_size=batch_size,
+                input_size=list(input_size),
+                threads=threads,
+                precision=precision,
+                stages=stages,
+                total=round(total, 3),
+                fps=round(1000 / total, 2)))
+        print(f'batch {batch_size}, input {input_size[0]}x{input_size[1]}, '
+              f'{threads} threads, {precision}: {total:.2f} ms / frame '
+              f'({1000 / total:.1f} fps)')
+        print('    ' + ', '.join(f'{stage} {ms:.2f}'
+                                 for stage, ms in stages.items()))
+
+    if args.out:
+        dump(
+            dict(
+                config=args.config,
+                checkpoint=args.checkpoint,
+                device=args.device,
+                channels_last=args.channels_last,
+                git_hash=get_git_hash(),
+                torch=torch.__version__,
+                frame_shape=list(frames[0].shape[:2]),
+                num_iters=args.num_iters,
+                unit='ms / frame',
+                results=results),
+            args.out,
+            indent=4)
+
+
+if __name__ == '__main__':
+    main()
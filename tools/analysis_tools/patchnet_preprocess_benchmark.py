@@ -0,0 +1,141 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Compare the per-frame preprocessing cost of PatchNet inference.
+
+``pipeline`` is the default inference path: the test pipeline of the config
+(``Resize`` to (2048, 1024)) followed by ``SegDataPreProcessor``.
+``direct`` resizes straight to the network input and normalizes in the same
+step with :class:`PatchInputPreprocessor`, as selected by
+``model.test_cfg.preprocess``.
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+import torch
+from mmengine import Config
+from mmengine.dataset import Compose
+from mmengine.fileio import dump
+from mmengine.registry import init_default_scope
+
+from mmseg.models.utils import PatchInputPreprocessor
+from mmseg.registry import MODELS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the PatchNet preprocessing')
+    parser.add_argument('config', help='config file path')
+    parser.add_argument(
+        '--video', help='video to read frames from, random frames if unset')
+    parser.add_argument(
+        '--shape',
+        type=int,
+        nargs=2,
+        default=[1080, 1920],
+        help='(h, w) of the random frames')
+    parser.add_argument(
+        '--input-size',
+        type=int,
+        nargs=2,
+        default=None,
+        help='network input size (w, h) of the direct path, defaults to '
+        '`model.test_cfg.preprocess.size` or (512, 512)')
+    parser.add_argument(
+        '--interpolation',
+        default=None,
+        help='interpolation of the direct path, defaults to '
+        '`model.test_cfg.preprocess.interpolation` or bilinear')
+    parser.add_argument(
+        '--num-frames', type=int, default=50, help='number of frames')
+    parser.add_argument(
+        '--out', help='dump the results into this json file if specified')
+    return parser.parse_args()
+
+
+def load_frames(args):
+    if args.video is None:
+        return [
+            np.random.randint(0, 256, (*args.shape, 3), dtype=np.uint8)
+            for _ in range(args.num_frames)
+        ]
+    capture = cv2.VideoCapture(args.video)
+    frames = []
+    while len(frames) < args.num_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    assert frames, f'failed to read frames from {args.video}'
+    return frames
+
+
+def time_per_frame(fn, frames, num_warmup=3):
+    for frame in frames[:num_warmup]:
+        fn(frame)
+    start = time.perf_counter()
+    for frame in frames:
+        out = fn(frame)
+    return (time.perf_counter() - start) / len(frames) * 1000, out
+
+
+def main():
+    args = parse_args()
+    cfg = Config.fromfile(args.config)
+    init_default_scope(cfg.get('default_scope', 'mmseg'))
+    frames = load_frames(args)
+
+    data_preprocessor = MODELS.build(cfg.model.data_preprocessor)
+    test_pipeline = [
+        t for t in cfg.test_pipeline if t.get('type') != 'LoadAnnotations'
+    ]
+    test_pipeline[0] = dict(type='LoadImageFromNDArray')
+    pipeline = Compose(test_pipeline)
+
+    def pipeline_preprocess(frame):
+        data = pipeline(dict(img=frame))
+        data = dict(
+            inputs=[data['inputs']], data_samples=[data['data_samples']])
+        return data_preprocessor(data, False)['inputs']
+
+    preprocess_cfg = cfg.model.get('test_cfg', dict()).get('preprocess', {})
+    size = tuple(args.input_size or preprocess_cfg.get('size', (512, 512)))
+    interpolation = args.interpolation or preprocess_cfg.get(
+        'interpolation', 'bilinear')
+    mean = std = None
+    if data_preprocessor._enable_normalize:
+        mean = data_preprocessor.mean.view(-1).tolist()
+        std = data_preprocessor.std.view(-1).tolist()
+    patch_input = PatchInputPreprocessor(
+        size,
+        mean=mean,
+        std=std,
+        bgr_to_rgb=data_preprocessor.channel_conversion,
+        interpolation=interpolation)
+
+    def direct_preprocess(frame):
+        return torch.from_numpy(patch_input([frame]))
+
+    results = dict(
+        config=args.config,
+        frame_shape=list(frames[0].shape[:2]),
+        num_frames=len(frames),
+        unit='ms / frame')
+    for name, fn in [('pipeline', pipeline_preprocess),
+                     ('direct', direct_preprocess)]:
+        with torch.no_grad():
+            ms, inputs = time_per_frame(fn, frames)
+        results[name] = dict(
+            time=round(ms, 3), input_shape=list(inputs.shape[2:]))
+        print(f'{name:>8}: {ms:.2f} ms / frame, network input '
+              f'{tuple(inputs.shape[2:])}')
+    speedup = results['pipeline']['time'] / results['direct']['time']
+    results['speedup'] = round(speedup, 2)
+    print(f'speedup: {speedup:.2f}x')
+    if args.out:
+        dump(results, args.out, indent=4)
+
+
+if __name__ == '__main__':
+    main()
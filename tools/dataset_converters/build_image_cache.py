@@ -0,0 +1,124 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Build a decoded and resized image cache for ``LoadImageFromCache``.
+
+Every split gets a directory of memory mapped ``uint8[n, h, w, 3]`` shards
+and an ``index.json`` keyed by image path. Replace ``LoadImageFromFile`` in
+the train pipeline with ``dict(type='LoadImageFromCache', cache_dir=...)``,
+see ``configs/patchnet/patchnet_hyundae_512x512_image-cache.py``.
+
+With ``--benchmark N`` the train pipeline of the config is timed on ``N``
+images as configured and with ``LoadImageFromCache`` as its loading step,
+and the throughput of both is reported in img/s.
+"""
+import argparse
+import copy
+import os.path as osp
+import time
+
+from mmengine import Config, DictAction
+from mmengine.dataset import Compose
+from mmengine.registry import init_default_scope
+
+from mmseg.datasets.image_cache import build_image_cache
+from mmseg.registry import DATASETS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Build a decoded and resized image cache')
+    parser.add_argument('config', help='config file path')
+    parser.add_argument(
+        '--splits',
+        nargs='+',
+        default=['train'],
+        help='dataloaders to cache, e.g. train val')
+    parser.add_argument(
+        '-o',
+        '--out-dir',
+        help='output root, one sub directory per split. Defaults to '
+        '`<data_root>/img_cache`')
+    parser.add_argument(
+        '--scale',
+        type=int,
+        nargs=2,
+        default=[512, 512],
+        help='training resolution (w, h)')
+    parser.add_argument(
+        '--interpolation',
+        default='area',
+        help='interpolation method of the resize')
+    parser.add_argument(
+        '--shard-size', type=int, default=2048, help='images per shard')
+    parser.add_argument(
+        '--nproc', default=1, type=int, help='number of process')
+    parser.add_argument(
+        '--benchmark',
+        type=int,
+        default=0,
+        help='time the train pipeline with and without the cache on this '
+        'many images')
+    parser.add_argument(
+        '--cfg-options',
+        nargs='+',
+        action=DictAction,
+        help='override some settings in the used config, the key-value pair '
+        'in xxx=yyy format will be merged into config file.')
+    return parser.parse_args()
+
+
+def images_per_second(pipeline, data_list):
+    start = time.perf_counter()
+    for data_info in data_list:
+        pipeline(copy.deepcopy(data_info))
+    return len(data_list) / (time.perf_counter() - start)
+
+
+def benchmark(dataset, data_list, cache_dir, num_images):
+    data_list = data_list[:num_images]
+    transforms = dataset.pipeline.transforms
+    file_pipeline = Compose(transforms)
+    # the first transform of the pipeline is expected to load the image
+    cached_pipeline = Compose(
+        [dict(type='LoadImageFromCache', cache_dir=cache_dir)] +
+        transforms[1:])
+    # warm up the page cache and the index for both
+    images_per_second(file_pipeline, data_list[:2])
+    images_per_second(cached_pipeline, data_list[:2])
+    file_ips = images_per_second(file_pipeline, data_list)
+    cached_ips = images_per_second(cached_pipeline, data_list)
+    print(f'{type(transforms[0]).__name__}: {file_ips:.1f} img/s, '
+          f'LoadImageFromCache: {cached_ips:.1f} img/s '
+          f'({cached_ips / file_ips:.2f}x) over {len(data_list)} images')
+
+
+def main():
+    args = parse_args()
+    cfg = Config.fromfile(args.config)
+    if args.cfg_options is not None:
+        cfg.merge_from_dict(args.cfg_options)
+    init_default_scope(cfg.get('default_scope', 'mmseg'))
+
+    for split in args.splits:
+        dataset_cfg = cfg[f'{split}_dataloader'].dataset.copy()
+        dataset_cfg['lazy_init'] = True
+        dataset = DATASETS.build(dataset_cfg)
+        data_list = dataset.load_data_list()
+        out_root = args.out_dir or osp.join(
+            dataset_cfg.get('data_root') or '', 'img_cache')
+        cache_dir = osp.join(out_root, split)
+        print(f'Caching {len(data_list)} {split} images at '
+              f'{tuple(args.scale)} into {cache_dir}')
+        build_image_cache(
+            data_list,
+            cache_dir,
+            scale=tuple(args.scale),
+            interpolation=args.interpolation,
+            shard_size=args.shard_size,
+            nproc=args.nproc,
+            backend_args=dataset_cfg.get('backend_args'))
+        if args.benchmark > 0:
+            benchmark(dataset, data_list, cache_dir, args.benchmark)
+
+
+if __name__ == '__main__':
+    main()
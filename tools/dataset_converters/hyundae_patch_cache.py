@@ -0,0 +1,80 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Pack the ``.json`` patch annotations of HyundaeDataset into a label cache.
+
+Every split gets a directory with ``labels.npy`` (``uint8[N, 16, 16]``) and
+``index.json`` (row, annotation size, mtime and crc32 keyed by image path).
+Point the dataset to it with ``ann_cache``, e.g.::
+
+    python tools/dataset_converters/hyundae_patch_cache.py \\
+        configs/patchnet/patchnet_hyundae_512x512.py --nproc 8
+    # then set train_dataloader.dataset.ann_cache=data/hyundae/ann_cache/train
+"""
+import argparse
+import os.path as osp
+
+from mmengine import Config, DictAction
+from mmengine.registry import init_default_scope
+
+from mmseg.datasets.patch_label_cache import build_patch_label_cache
+from mmseg.registry import DATASETS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Pack HyundaeDataset patch annotations into a cache')
+    parser.add_argument('config', help='config file path')
+    parser.add_argument(
+        '--splits',
+        nargs='+',
+        default=['train', 'val'],
+        help='dataloaders to pack, e.g. train val test')
+    parser.add_argument(
+        '-o',
+        '--out-dir',
+        help='output root, one sub directory per split. Defaults to '
+        '`<data_root>/ann_cache`')
+    parser.add_argument(
+        '--grid-size',
+        type=int,
+        nargs=2,
+        default=[16, 16],
+        help='size (h, w) of the patch label grid')
+    parser.add_argument(
+        '--nproc', default=1, type=int, help='number of process')
+    parser.add_argument(
+        '--cfg-options',
+        nargs='+',
+        action=DictAction,
+        help='override some settings in the used config, the key-value pair '
+        'in xxx=yyy format will be merged into config file.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    cfg = Config.fromfile(args.config)
+    if args.cfg_options is not None:
+        cfg.merge_from_dict(args.cfg_options)
+    init_default_scope(cfg.get('default_scope', 'mmseg'))
+
+    for split in args.splits:
+        dataset_cfg = cfg[f'{split}_dataloader'].dataset.copy()
+        # list the annotations themselves, not an existing cache
+        dataset_cfg.pop('ann_cache', None)
+        dataset_cfg['lazy_init'] = True
+        dataset = DATASETS.build(dataset_cfg)
+        data_list = dataset.load_data_list()
+        out_root = args.out_dir or osp.join(
+            dataset_cfg.get('data_root') or '', 'ann_cache')
+        cache_dir = osp.join(out_root, split)
+        print(f'Packing {len(data_list)} {split} annotations into '
+              f'{cache_dir}')
+        build_patch_label_cache(
+            data_list,
+            cache_dir,
+            grid_size=tuple(args.grid_size),
+            nproc=args.nproc)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Export PatchNet to TorchScript or ONNX for CPU deployment.
+
+The exported graph takes normalized images of shape (N, 3, H, W) and returns
+the fused patch labels (N, 16, 16) uint8 and the ratio of contaminated
+patches (N, ). ``SyncBatchNorm`` layers are converted and BatchNorm layers
+are folded into the preceding convolutions before tracing.
+
+A ``<output-file>.json`` file with the input size and normalization is
+written next to the model; ``MMSegWrapper`` reads it to preprocess frames.
+"""
+import argparse
+import json
+import os.path as osp
+
+import numpy as np
+import torch
+from mmcv.cnn import fuse_conv_bn
+from mmengine.model.utils import revert_sync_batchnorm
+
+from mmseg.apis import init_model
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Export PatchNet to TorchScript or ONNX')
+    parser.add_argument('config', help='config file path')
+    parser.add_argument('checkpoint', help='checkpoint file')
+    parser.add_argument(
+        '--format',
+        choices=['torchscript', 'onnx'],
+        default='torchscript',
+        help='export format')
+    parser.add_argument(
+        '--output-file',
+        default=None,
+        help='output file, defaults to patchnet.pt or patchnet.onnx')
+    parser.add_argument(
+        '--shape',
+        type=int,
+        nargs=2,
+        default=[512, 512],
+        help='input image size (height, width)')
+    parser.add_argument(
+        '--opset-version', type=int, default=11, help='ONNX opset version')
+    parser.add_argument(
+        '--no-fuse-bn',
+        action='store_true',
+        help='keep BatchNorm layers instead of folding them into convs')
+    parser.add_argument(
+        '--verify',
+        action='store_true',
+        help='compare the outputs of the exported and the PyTorch model')
+    return parser.parse_args()
+
+
+def build_export_model(config, checkpoint, fuse_bn=True):
+    """Build a PatchNet on CPU that forwards normalized images to labels."""
+    model = init_model(config, checkpoint, device='cpu')
+    assert hasattr(model, 'forward_labels'), \
+        f'{type(model).__name__} is not a Patch_EncoderDecoder'
+    model = revert_sync_batchnorm(model)
+    if fuse_bn:
+        model = fuse_conv_bn(model)
+    model.eval()
+    # trace the metadata-free forward instead of the data sample interface
+    model.forward = model.forward_labels
+    return model
+
+
+def export_meta(model, input_shape):
+    """Preprocessing needed by the exported graph."""
+    preprocessor = model.data_preprocessor
+    dataset_meta = getattr(model, 'dataset_meta', None) or {}
+    meta = dict(
+        input_size=[input_shape[1], input_shape[0]],
+        bgr_to_rgb=bool(getattr(preprocessor, 'channel_conversion', False)),
+        mean=None,
+        std=None,
+        classes=list(dataset_meta.get('classes', [])))
+    if getattr(preprocessor, '_enable_normalize', False):
+        meta['mean'] = preprocessor.mean.view(-1).tolist()
+        meta['std'] = preprocessor.std.view(-1).tolist()
+    return meta
+
+
+def verify(model, output_file, fmt, inputs):
+    with torch.no_grad():
+        labels, scores = model(inputs)
+    if fmt == 'torchscript':
+        exported = torch.jit.load(output_file, map_location='cpu')
+        with torch.no_grad():
+            exp_labels, exp_scores = exported(inputs)
+        exp_labels, exp_scores = exp_labels.numpy(), exp_scores.numpy()
+    else:
+        import onnxruntime as ort
+        session = ort.InferenceSession(
+            output_file, providers=['CPUExecutionProvider'])
+        exp_labels, exp_scores = session.run(None, {'input': inputs.numpy()})
+    # labels near the severity thresholds may flip with BN folding
+    agreement = (exp_labels == labels.numpy()).mean()
+    print(f'Label agreement with PyTorch: {agreement:.2%}, max score '
+          f'difference: {np.abs(exp_scores - scores.numpy()).max():.4f}')
+
+
+def main():
+    args = parse_args()
+    output_file = args.output_file
+    if output_file is None:
+        output_file = 'patchnet.pt' if args.format == 'torchscript' \
+            else 'patchnet.onnx'
+    model = build_export_model(
+        args.config, args.checkpoint, fuse_bn=not args.no_fuse_bn)
+    inputs = torch.randn(1, 3, *args.shape)
+
+    with torch.no_grad():
+        if args.format == 'torchscript':
+            traced = torch.jit.trace(model, inputs)
+            traced = torch.jit.freeze(traced)
+            traced.save(output_file)
+        else:
+            torch.onnx.export(
+                model,
+                inputs,
+                output_file,
+                input_names=['input'],
+                output_names=['labels', 'scores'],
+                dynamic_axes={
+                    'input': {
+                        0: 'batch'
+                    },
+                    'labels': {
+                        0: 'batch'
+                    },
+                    'scores': {
+                        0: 'batch'
+                    }
+                },
+                opset_version=args.opset_version)
+
+    meta = export_meta(model, args.shape)
+    meta.update(format=args.format, config=args.config)
+    with open(osp.splitext(output_file)[0] + '.json', 'w') as f:
+        json.dump(meta, f, indent=4)
+    print(f'Successfully exported {args.format} model: {output_file}')
+
+    if args.verify:
+        verify(model, output_file, args.format, torch.randn(2, 3, *args.shape))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,397 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Score images and videos with PatchNet without the GUI.
+
+Frames are decoded and resized in a process pool, scored in batches with
+``Patch_EncoderDecoder.predict_batch`` and streamed to per-source JSONL, CSV
+and NPZ files laid out like the results saved by the GUI.
+
+Example:
+    python tools/patchnet_batch_infer.py \\
+        configs/patchnet/patchnet_hyundae_512x512.py out_downlr.pth \\
+        /data/videos /data/images --out-dir work_dirs/scores --resume
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import os.path as osp
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+from mmengine.model.utils import revert_sync_batchnorm
+from mmengine.utils import mkdir_or_exist
+
+from mmseg.apis import init_model
+
+IMG_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+NUM_CLASSES = 7
+CSV_HEADER = ['Time (s)', 'Contamination Level (%)', 'Frame Number']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Score images and videos with PatchNet in batches')
+    parser.add_argument('config', help='config file path')
+    parser.add_argument('checkpoint', help='checkpoint file')
+    parser.add_argument(
+        'inputs',
+        nargs='+',
+        help='video files, image files or directories. Images of the same '
+        'directory are scored as one sequence')
+    parser.add_argument(
+        '--out-dir', default='work_dirs/patchnet_scores', help='output dir')
+    parser.add_argument(
+        '--formats',
+        nargs='+',
+        choices=['jsonl', 'csv', 'npz'],
+        default=['jsonl', 'csv', 'npz'],
+        help='output formats')
+    parser.add_argument(
+        '--device', default='cpu', help='device used for inference')
+    parser.add_argument(
+        '--batch-size', type=int, default=16, help='inference batch size')
+    parser.add_argument(
+        '--num-workers',
+        type=int,
+        default=4,
+        help='number of decoding processes')
+    parser.add_argument(
+        '--segment-length',
+        type=int,
+        default=256,
+        help='number of frames decoded by a worker at once')
+    parser.add_argument(
+        '--input-size',
+        type=int,
+        nargs=2,
+        default=[512, 512],
+        help='network input size (w, h)')
+    parser.add_argument(
+        '--frame-stride',
+        type=int,
+        default=1,
+        help='score every n-th frame of the videos')
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='skip finished sources and continue partially scored ones')
+    parser.add_argument(
+        '--log-interval', type=int, default=20, help='interval of logging')
+    return parser.parse_args()
+
+
+def collect_sources(inputs):
+    """Collect videos and image sequences from the input paths."""
+    sources = []
+    loose_images = []
+    for path in inputs:
+        if osp.isdir(path):
+            files = sorted(osp.join(path, name) for name in os.listdir(path))
+            images = [f for f in files if f.lower().endswith(IMG_EXTENSIONS)]
+            if images:
+                sources.append(
+                    dict(type='images', path=path, images=images, fps=None))
+            files = [f for f in files if f.lower().endswith(VIDEO_EXTENSIONS)]
+        else:
+            files = [path]
+        for file in files:
+            if file.lower().endswith(VIDEO_EXTENSIONS):
+                capture = cv2.VideoCapture(file)
+                num_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+                fps = capture.get(cv2.CAP_PROP_FPS)
+                capture.release()
+                sources.append(
+                    dict(
+                        type='video',
+                        path=file,
+                        num_frames=num_frames,
+                        fps=fps if fps > 0 else None))
+            elif file.lower().endswith(IMG_EXTENSIONS):
+                loose_images.append(file)
+    if loose_images:
+        sources.append(
+            dict(type='images', path='images', images=loose_images, fps=None))
+
+    names = set()
+    for source in sources:
+        if source['type'] == 'images':
+            source['num_frames'] = len(source['images'])
+        name = osp.splitext(osp.basename(osp.normpath(source['path'])))[0]
+        # keep the output names of sources with the same basename apart
+        unique_name, i = name, 1
+        while unique_name in names:
+            unique_name, i = f'{name}_{i}', i + 1
+        names.add(unique_name)
+        source['name'] = unique_name
+    return sources
+
+
+def _init_worker():
+    # every process decodes on its own, avoid oversubscribing the cores
+    cv2.setNumThreads(1)
+
+
+def decode_segment(task):
+    """Decode and resize the frames of one segment in a worker process.
+
+    Returns:
+        tuple: ``(source_idx, frame_indices, frames, image_paths)`` where
+        ``frames`` is a uint8 array of shape (N, h, w, 3).
+    """
+    source_idx, source, frame_indices, size = task
+    frames, decoded, paths = [], [], []
+    if source['type'] == 'video':
+        capture = cv2.VideoCapture(source['path'])
+        capture.set(cv2.CAP_PROP_POS_FRAMES, frame_indices[0])
+        position = frame_indices[0]
+        for index in frame_indices:
+            while position < index:
+                capture.grab()
+                position += 1
+            ret, frame = capture.read()
+            position += 1
+            if not ret:
+                break
+            frames.append(cv2.resize(frame, size))
+            decoded.append(index)
+        capture.release()
+    else:
+        for index in frame_indices:
+            path = source['images'][index]
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is None:
+                print(f'Failed to read {path}, skipped')
+                continue
+            frames.append(cv2.resize(frame, size))
+            decoded.append(index)
+            paths.append(path)
+    if frames:
+        frames = np.stack(frames)
+    else:
+        frames = np.zeros((0, size[1], size[0], 3), dtype=np.uint8)
+    return source_idx, decoded, frames, paths
+
+
+def make_record(frame_index, time_sec, seg_map, image_path=None):
+    """Build a result record in the format of the GUI JSON results."""
+    unique, counts = np.unique(seg_map, return_counts=True)
+    record = {
+        'frame': int(frame_index),
+        'time': float(time_sec),
+        'contamination_level': float(np.count_nonzero(seg_map) / seg_map.size),
+        'patch_counts': {str(k): int(v)
+                         for k, v in zip(unique, counts)},
+        'patch_array': seg_map.tolist()
+    }
+    if image_path is not None:
+        record['image_path'] = image_path
+    return record
+
+
+class SourceWriter:
+    """Stream the records of one source to its result files.
+
+    JSONL records are the source of truth for resuming: the valid records of
+    an interrupted run are loaded back, the CSV is rewritten from them and
+    scoring continues after the last scored frame. The NPZ file is written
+    once the source is finished.
+    """
+
+    def __init__(self, out_dir, name, formats, resume=False):
+        self.formats = formats
+        self.jsonl_file = osp.join(out_dir, f'{name}.jsonl')
+        self.csv_file = osp.join(out_dir, f'{name}.csv')
+        self.npz_file = osp.join(out_dir, f'{name}.npz')
+        self.records = []
+        if resume and osp.isfile(self.jsonl_file):
+            with open(self.jsonl_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # truncated last line of an interrupted run
+                        break
+
+        self._jsonl = open(self.jsonl_file, 'w', encoding='utf-8')
+        self._csv_f = None
+        if 'csv' in formats:
+            self._csv_f = open(
+                self.csv_file, 'w', newline='', encoding='utf-8')
+            self._csv = csv.writer(self._csv_f)
+            self._csv.writerow(CSV_HEADER)
+        for record in self.records:
+            self._write(record)
+        self.flush()
+
+    @property
+    def last_frame(self):
+        return self.records[-1]['frame'] if self.records else -1
+
+    def _write(self, record):
+        self._jsonl.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if self._csv_f is not None:
+            self._csv.writerow([
+                f"{record['time']:.2f}",
+                f"{record['contamination_level'] * 100:.2f}", record['frame']
+            ])
+
+    def write(self, record):
+        self.records.append(record)
+        self._write(record)
+
+    def flush(self):
+        self._jsonl.flush()
+        if self._csv_f is not None:
+            self._csv_f.flush()
+
+    def close(self):
+        self._jsonl.close()
+        if self._csv_f is not None:
+            self._csv_f.close()
+        if 'jsonl' not in self.formats:
+            os.remove(self.jsonl_file)
+        if 'npz' in self.formats:
+            patch_array = np.array([r['patch_array'] for r in self.records],
+                                   dtype=np.uint8).reshape(-1, 16, 16)
+            counts = np.zeros((len(self.records), NUM_CLASSES), np.int32)
+            for i, record in enumerate(self.records):
+                for label, count in record['patch_counts'].items():
+                    counts[i, int(label)] = count
+            tmp_file = self.npz_file + '.tmp.npz'
+            np.savez_compressed(
+                tmp_file,
+                frame_number=np.array([r['frame'] for r in self.records],
+                                      dtype=np.int64),
+                time=np.array([r['time'] for r in self.records], np.float64),
+                contamination_level=np.array(
+                    [r['contamination_level'] for r in self.records],
+                    np.float32),
+                patch_counts=counts,
+                patch_array=patch_array)
+            os.replace(tmp_file, self.npz_file)
+
+
+def split_segments(source, first_frame, args):
+    """Split the frames left to score into decoding segments."""
+    stride = args.frame_stride if source['type'] == 'video' else 1
+    first_frame += (-first_frame) % stride
+    frame_indices = list(range(first_frame, source['num_frames'], stride))
+    return [
+        frame_indices[i:i + args.segment_length]
+        for i in range(0, len(frame_indices), args.segment_length)
+    ]
+
+
+def main():
+    args = parse_args()
+    mkdir_or_exist(args.out_dir)
+    progress_file = osp.join(args.out_dir, 'progress.json')
+    completed = []
+    if args.resume and osp.isfile(progress_file):
+        with open(progress_file, 'r', encoding='utf-8') as f:
+            completed = json.load(f)['completed']
+
+    sources = collect_sources(args.inputs)
+    writers = {}
+    for source_idx, source in enumerate(sources):
+        if source['path'] in completed:
+            print(f"{source['path']} already scored, skipped")
+            continue
+        writers[source_idx] = SourceWriter(args.out_dir, source['name'],
+                                           args.formats, args.resume)
+    segments = {
+        source_idx: split_segments(sources[source_idx], writer.last_frame + 1,
+                                   args)
+        for source_idx, writer in writers.items()
+    }
+    remaining = {i: len(segs) for i, segs in segments.items()}
+
+    # fork the decoding processes before the model spawns its own threads
+    pool = multiprocessing.Pool(args.num_workers, initializer=_init_worker)
+    model = init_model(args.config, args.checkpoint, device=args.device)
+    if args.device == 'cpu':
+        model = revert_sync_batchnorm(model)
+
+    def finish(source_idx):
+        writers.pop(source_idx).close()
+        completed.append(sources[source_idx]['path'])
+        with open(progress_file, 'w', encoding='utf-8') as f:
+            json.dump({'completed': completed}, f, indent=4)
+        print(f"Finished {sources[source_idx]['path']}")
+
+    for source_idx in [i for i, n in remaining.items() if n == 0]:
+        finish(source_idx)
+
+    size = tuple(args.input_size)
+    tasks = ((source_idx, sources[source_idx], frame_indices, size)
+             for source_idx, segs in segments.items()
+             for frame_indices in segs)
+    pending = deque()
+    num_frames, num_segments, decode_wait, infer_time = 0, 0, 0., 0.
+    start_time = time.perf_counter()
+    try:
+        while True:
+            # keep a bounded number of segments in flight
+            while len(pending) < 2 * args.num_workers:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                pending.append(pool.apply_async(decode_segment, (task, )))
+            if not pending:
+                break
+
+            tic = time.perf_counter()
+            source_idx, frame_indices, frames, paths = pending.popleft().get()
+            decode_wait += time.perf_counter() - tic
+
+            tic = time.perf_counter()
+            labels = model.predict_batch(frames, batch_size=args.batch_size)
+            infer_time += time.perf_counter() - tic
+
+            source = sources[source_idx]
+            writer = writers[source_idx]
+            fps = source['fps'] or 1.
+            results = zip(frame_indices, labels)
+            for i, (frame_index, seg_map) in enumerate(results):
+                writer.write(
+                    make_record(frame_index, frame_index / fps, seg_map,
+                                paths[i] if paths else None))
+            writer.flush()
+            remaining[source_idx] -= 1
+            if remaining[source_idx] == 0:
+                finish(source_idx)
+
+            num_frames += len(frame_indices)
+            num_segments += 1
+            if num_segments % args.log_interval == 0:
+                elapsed = time.perf_counter() - start_time
+                print(f'Scored {num_frames} frames, '
+                      f'{num_frames / elapsed:.2f} img / s '
+                      f'(decode wait {decode_wait:.1f} s, '
+                      f'inference {infer_time:.1f} s)')
+    finally:
+        pool.terminate()
+        for writer in writers.values():
+            writer.flush()
+
+    elapsed = time.perf_counter() - start_time
+    summary = dict(
+        frames=num_frames,
+        elapsed_s=round(elapsed, 2),
+        fps=round(num_frames / elapsed, 2) if elapsed else 0.,
+        decode_wait_s=round(decode_wait, 2),
+        inference_s=round(infer_time, 2),
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        device=args.device)
+    print(f"Overall: {summary['frames']} frames, {summary['fps']} img / s")
+    with open(osp.join(args.out_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+import threading
+import time
+from collections import deque
+
+
+class DropQueue:
+    """프레임 드롭 정책을 지원하는 크기 제한 큐.
+
+    policy:
+        'block': 큐가 가득 차면 자리가 날 때까지 기다립니다. (모든 프레임 처리)
+        'drop_oldest': 가장 오래된 항목을 버립니다. (latest-frame-wins)
+        'drop_newest': 새로 들어온 항목을 버립니다.
+    """
+    POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+    def __init__(self, maxsize=4, policy='block'):
+        assert maxsize > 0, 'maxsize must be positive'
+        assert policy in self.POLICIES, f'Unsupported drop policy: {policy}'
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self.__items = deque()
+        self.__cond = threading.Condition()
+        self.__closed = False
+
+    def put(self, item):
+        """항목을 추가합니다. 버려지거나 큐가 닫혔으면 False 반환"""
+        with self.__cond:
+            if self.__closed:
+                return False
+            if len(self.__items) >= self.maxsize:
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                elif self.policy == 'drop_oldest':
+                    self.__items.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self.__items) >= self.maxsize and not self.__closed:
+                        self.__cond.wait()
+                    if self.__closed:
+                        return False
+            self.__items.append(item)
+            self.__cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """항목을 꺼냅니다. 큐가 닫히고 비어 있거나 timeout이면 None 반환"""
+        with self.__cond:
+            if not self.__cond.wait_for(lambda: self.__items or self.__closed, timeout):
+                return None
+            if not self.__items:
+                return None
+            item = self.__items.popleft()
+            self.__cond.notify_all()
+            return item
+
+    def close(self):
+        """더 이상 항목을 받지 않습니다. 남은 항목은 get으로 꺼낼 수 있습니다."""
+        with self.__cond:
+            self.__closed = True
+            self.__cond.notify_all()
+
+    def clear(self):
+        with self.__cond:
+            self.__items.clear()
+            self.__cond.notify_all()
+
+    def __len__(self):
+        with self.__cond:
+            return len(self.__items)
+
+
+class StageStats:
+    """단계별 처리 시간(latency) 카운터"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self.__lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.__lock:
+            self.count += 1
+            self.total += seconds
+            self.last = seconds
+            self.max = max(self.max, seconds)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.mean * 1000,
+            'last_ms': self.last * 1000,
+            'max_ms': self.max * 1000
+        }
+
+    def __repr__(self):
+        return (f'{self.name}: {self.count} frames, mean {self.mean * 1000:.1f} ms, '
+                f'max {self.max * 1000:.1f} ms')
+
+
+class VideoPipeline:
+    """decode -> infer -> render 3단계 비디오 처리 파이프라인.
+
+    각 단계는 별도의 스레드에서 실행되며 크기 제한 큐(DropQueue)로 연결됩니다.
+
+    - decode: capture.read()로 프레임을 읽어 infer 큐에 넣습니다.
+    - infer: infer_fn(index, frame)으로 결과를 계산하고 모든 프레임에 대해
+      on_result(index, result)를 호출한 뒤 render 큐에 넣습니다.
+    - render: render_fn(frame, result)로 오버레이를 그리고
+      on_render(index, frame, rendered, result)를 호출합니다.
+
+    콜백은 워커 스레드에서 호출되므로 GUI에서는 Qt Signal을 emit하는 용도로만
+    사용해야 합니다. render 큐는 기본적으로 'drop_oldest' 정책이라
+    화면 갱신이 밀리면 가장 최근 프레임만 그립니다.
+
+    Args:
+        capture: read() -> (ret, frame)를 제공하는 객체 (cv2.VideoCapture 등)
+        infer_fn: (index, frame) -> result. 프레임 번호로 캐시된 결과를 재사용할 수 있습니다.
+        render_fn: (frame, result) -> rendered. None이면 render 단계는 frame을 그대로 넘깁니다.
+        on_result: (index, result) 콜백. 모든 추론 결과에 대해 호출됩니다.
+        on_render: (index, frame, rendered, result) 콜백
+        on_finished: (completed) 콜백. 영상 끝까지 처리했으면 completed=True
+        start_frame: 첫 프레임 번호
+        queue_size: infer 큐 크기
+        decode_policy: infer 큐의 드롭 정책 ('block'이면 모든 프레임을 추론)
+        render_policy: render 큐의 드롭 정책
+        render_queue_size: render 큐 크기
+    """
+
+    def __init__(self, capture, infer_fn, render_fn=None, on_result=None,
+                 on_render=None, on_finished=None, start_frame=0, queue_size=4,
+                 decode_policy='block', render_policy='drop_oldest',
+                 render_queue_size=1):
+        self.capture = capture
+        self.infer_fn = infer_fn
+        self.render_fn = render_fn
+        self.on_result = on_result
+        self.on_render = on_render
+        self.on_finished = on_finished
+        self.start_frame = start_frame
+        self.infer_queue = DropQueue(queue_size, decode_policy)
+        self.render_queue = DropQueue(render_queue_size, render_policy)
+        self.stats = {name: StageStats(name) for name in ('decode', 'infer', 'render')}
+        self.last_rendered = None
+        self.__stop_event = threading.Event()
+        self.__completed = False
+        self.__threads = []
+
+    def start(self):
+        self.__stop_event.clear()
+        self.__threads = [
+            threading.Thread(target=target, name=f'VideoPipeline-{name}', daemon=True)
+            for name, target in (('decode', self.__decode_worker),
+                                 ('infer', self.__infer_worker),
+                                 ('render', self.__render_worker))
+        ]
+        for thread in self.__threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        """파이프라인을 중단하고 스레드가 끝날 때까지 기다립니다."""
+        self.__stop_event.set()
+        self.infer_queue.close()
+        self.render_queue.close()
+        self.join(timeout)
+
+    def join(self, timeout=None):
+        for thread in self.__threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self.__threads)
+
+    @property
+    def dropped(self):
+        return {'infer': self.infer_queue.dropped, 'render': self.render_queue.dropped}
+
+    def summary(self):
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+    def __decode_worker(self):
+        index = self.start_frame
+        try:
+            while not self.__stop_event.is_set():
+                start = time.perf_counter()
+                ret, frame = self.capture.read()
+                if not ret:
+                    self.__completed = True
+                    break
+                self.stats['decode'].add(time.perf_counter() - start)
+                self.infer_queue.put((index, frame))
+                index += 1
+        finally:
+            self.infer_queue.close()
+
+    def __infer_worker(self):
+        try:
+            while True:
+                item = self.infer_queue.get()
+                if item is None or self.__stop_event.is_set():
+                    break
+                index, frame = item
+                start = time.perf_counter()
+                result = self.infer_fn(index, frame)
+                self.stats['infer'].add(time.perf_counter() - start)
+                if self.on_result is not None:
+                    self.on_result(index, result)
+                self.render_queue.put((index, frame, result))
+        finally:
+            # 추론이 중단되면 decode 단계도 더 이상 기다리지 않도록 닫습니다.
+            self.infer_queue.close()
+            self.render_queue.close()
+
+    def __render_worker(self):
+        try:
+            while True:
+                item = self.render_queue.get()
+                if item is None or self.__stop_event.is_set():
+                    break
+                index, frame, result = item
+                start = time.perf_counter()
+                rendered = frame if self.render_fn is None else self.render_fn(frame, result)
+                self.stats['render'].add(time.perf_counter() - start)
+                self.last_rendered = index
+                if self.on_render is not None:
+                    self.on_render(index, frame, rendered, result)
+        finally:
+            if self.on_finished is not None:
+                self.on_finished(self.__completed and not self.__stop_event.is_set())